@@ -0,0 +1,188 @@
+"""Synthetic KB fixtures shared by the benchmark scripts (no network needed)."""
+import os
+import time
+from contextlib import contextmanager
+from typing import List, Optional, Tuple
+import numpy as np
+import pandas as pd
+
+LANGS = ["en", "en_sg", "ms", "id", "ta", "zh"]
+
+
+def synthetic_vectors(n: int, dim: int, seed: int = 0, n_clusters: int = 0, decay: float = 0.0) -> np.ndarray:
+    """
+    Unit vectors; with n_clusters > 0 they are drawn around random topic
+    centres. decay > 0 scales component j by (j + 1) ** -decay, front-loading
+    the signal the way Matryoshka-trained embeddings do.
+    """
+    rng = np.random.default_rng(seed)
+    X = rng.standard_normal((n, dim), dtype=np.float32)
+    if n_clusters:
+        centres = np.random.default_rng(12345).standard_normal((n_clusters, dim), dtype=np.float32)
+        X = centres[rng.integers(0, n_clusters, size=n)] + 0.35 * X
+    if decay:
+        X *= (np.arange(1, dim + 1, dtype=np.float32) ** -decay)
+    X /= (np.linalg.norm(X, axis=1, keepdims=True) + 1e-12)
+    return X
+
+
+def synthetic_meta(n: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    langs = rng.choice(LANGS, size=n)
+    return pd.DataFrame({
+        "doc_id": [f"doc_{i // 3}_{l}" for i, l in enumerate(langs)],
+        "base_id": [f"doc_{i // 3}" for i in range(n)],
+        "lang": langs,
+        "region": rng.choice(["SG", "MY", "ID"], size=n),
+        "chunk_text": [f"chunk {i}" for i in range(n)],
+    })
+
+
+_WORDS = {
+    "en": "please reset your password before the billing cycle ends refund invoice account".split(),
+    "en_sg": "can lah the refund need to wait one week then see how ok".split(),
+    "ms": "sila tetapkan semula kata laluan anda sebelum kitaran bil tamat".split(),
+    "id": "silakan atur ulang kata sandi anda sebelum siklus tagihan berakhir".split(),
+    "ta": "தயவுசெய்து உங்கள் கடவுச்சொல்லை மீட்டமைக்கவும் கட்டணம் திருப்பி".split(),
+    "zh": list("请在账单周期结束前重置您的密码退款发票账户"),
+}
+
+
+def _pseudo_words(lang: str, vocab_size: int) -> list:
+    """`vocab_size` distinct words built from the language's script (single characters for zh)."""
+    if lang == "zh":
+        return [chr(0x4E00 + i) for i in range(vocab_size)]
+    letters = sorted(set("".join(_WORDS[lang])))
+    rng = np.random.default_rng(len(letters))
+    words = set()
+    while len(words) < vocab_size:
+        words.add("".join(rng.choice(letters, size=int(rng.integers(3, 9)))))
+    return sorted(words)
+
+
+def synthetic_kb(n_docs: int, seed: int = 0, vocab_size: int = 0) -> pd.DataFrame:
+    """
+    Multilingual KB rows shaped like load_kb_data() output. By default each
+    language draws from a dozen real words; vocab_size > 0 draws from that
+    many pseudo-words instead, giving documents distinctive terms.
+    """
+    rng = np.random.default_rng(seed)
+    vocab = {lang: _pseudo_words(lang, vocab_size) if vocab_size else _WORDS[lang] for lang in LANGS}
+    rows = []
+    for i in range(n_docs):
+        lang = LANGS[i % len(LANGS)]
+        words = vocab[lang]
+        joiner, stop = ("", "。") if lang == "zh" else (" ", ". ")
+        sents = [
+            joiner.join(rng.choice(words, size=int(rng.integers(4, 30)))) for _ in range(int(rng.integers(2, 40)))
+        ]
+        rows.append({
+            "doc_id": f"doc_{i}", "base_id": f"base_{i // len(LANGS)}", "lang": lang,
+            "region": ["SG", "MY", "ID"][i % 3], "kb_text": f"Title {i}\n\n" + stop.join(sents) + stop.strip(),
+        })
+    return pd.DataFrame(rows)
+
+
+def synthetic_eval(kb_df: pd.DataFrame, n_queries: int, seed: int = 0) -> pd.DataFrame:
+    """Eval rows whose query is one sentence of a KB document, with that document as gold."""
+    from src.config.settings import EVAL_QUERY_COLUMN, EVAL_LANG_COLUMN, EVAL_GOLD_COLUMN
+    rng = np.random.default_rng(seed)
+    rows = []
+    for i in rng.integers(0, len(kb_df), size=n_queries):
+        doc = kb_df.iloc[int(i)]
+        sents = [s for s in doc["kb_text"].split("\n\n", 1)[-1].replace("。", ". ").split(". ") if s.strip()]
+        rows.append({
+            EVAL_QUERY_COLUMN: sents[int(rng.integers(0, len(sents)))].strip(),
+            EVAL_LANG_COLUMN: doc["lang"],
+            EVAL_GOLD_COLUMN: doc["doc_id"],
+        })
+    return pd.DataFrame(rows)
+
+
+def load_eval_frame(kb_df: Optional[pd.DataFrame] = None, eval_path: Optional[str] = None,
+                    limit: Optional[int] = None, n_queries: int = 0) -> pd.DataFrame:
+    """
+    Eval rows for a benchmark run: `n_queries` synthetic queries over
+    `kb_df` (default one per document) when it is given, else the
+    `eval_path` Parquet or the Hugging Face eval set. At most `limit` rows.
+    """
+    if kb_df is not None:
+        ev_df = synthetic_eval(kb_df, limit or n_queries or len(kb_df))
+    elif eval_path:
+        ev_df = pd.read_parquet(eval_path)
+    else:
+        from src.ingestion.loader import load_eval_data
+        ev_df = load_eval_data()
+    return ev_df.iloc[:limit] if limit else ev_df
+
+
+def eval_columns(ev_df: pd.DataFrame, query_col: Optional[str] = None, lang_col: Optional[str] = None,
+                 gold_col: Optional[str] = None) -> Tuple[List[str], List[str], Optional[List[Optional[str]]]]:
+    """(queries, langs, gold) of an eval frame; gold is None without a gold column and None per row it leaves empty."""
+    from src.config.settings import EVAL_QUERY_COLUMN, EVAL_LANG_COLUMN, EVAL_GOLD_COLUMN
+    gold_col = gold_col or EVAL_GOLD_COLUMN
+    gold = [None if pd.isna(g) else str(g) for g in ev_df[gold_col]] if gold_col in ev_df.columns else None
+    queries = ev_df[query_col or EVAL_QUERY_COLUMN].astype(str).tolist()
+    return queries, ev_df[lang_col or EVAL_LANG_COLUMN].astype(str).tolist(), gold
+
+
+@contextmanager
+def built_index(workdir: str, kb_df: Optional[pd.DataFrame] = None, kb_path: Optional[str] = None,
+                api_key: str = "", **build_kwargs):
+    """
+    Runs build_index() inside `workdir` over `kb_df` (written there as
+    kb.parquet), else `kb_path` or the Hugging Face KB, and keeps `workdir`
+    as the working directory until the block exits. Yields the build time
+    in seconds.
+    """
+    from src.ingestion.indexer import build_index
+    cwd, workdir = os.getcwd(), os.path.abspath(workdir)
+    source = os.path.abspath(kb_path) if kb_path else None
+    os.chdir(workdir)
+    try:
+        if kb_df is not None:
+            source = os.path.join(workdir, "kb.parquet")
+            kb_df.to_parquet(source)
+        t0 = time.perf_counter()
+        build_index(api_key, source=source, **build_kwargs)
+        yield time.perf_counter() - t0
+    finally:
+        os.chdir(cwd)
+
+
+def write_artifacts(workdir: str, n: int, dim: int, seed: int = 0, n_clusters: int = 0, decay: float = 0.0) -> None:
+    """Writes the chunk store the retriever loads into `workdir`."""
+    from src.config.settings import CHUNK_STORE_PATH
+    from src.ingestion.chunk_store import write_chunk_store, chunk_ids
+    from src.retrieval.embedders import HashEmbedder
+    meta = synthetic_meta(n, seed)
+    meta["prechunk_id"] = 0
+    meta["chunk_hash"] = [f"{i:040x}" for i in range(n)]
+    meta["chunk_id"] = chunk_ids(meta["chunk_hash"])
+    meta["deleted"] = False
+    path = os.path.join(workdir, CHUNK_STORE_PATH)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    signature = dict(HashEmbedder(dim).signature(), version=1)
+    write_chunk_store(meta, synthetic_vectors(n, dim, seed, n_clusters, decay), signature, path=path)
+
+
+def load_retriever(workdir: str, **kwargs):
+    """Builds a RiskAwareRetriever over the artifacts in `workdir` (hash embedder, no network)."""
+    from src.retrieval.search import RiskAwareRetriever
+    from src.retrieval.embedders import HashEmbedder
+    from src.retrieval.embedding import EmbeddingCache
+    from src.ingestion.chunk_store import read_manifest
+    from src.config.settings import CHUNK_STORE_PATH
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    try:
+        kwargs.setdefault("embedder", HashEmbedder(read_manifest(CHUNK_STORE_PATH)["dim"]))
+        kwargs.setdefault("query_cache", EmbeddingCache(None))
+        return RiskAwareRetriever(api_key="", **kwargs)
+    finally:
+        os.chdir(cwd)
+
+
+def percentiles_ms(samples_s, qs=(50, 99)) -> dict:
+    arr = np.asarray(samples_s, dtype=np.float64) * 1e3
+    return {f"p{q}_ms": float(np.percentile(arr, q)) for q in qs}
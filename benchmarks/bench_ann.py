@@ -0,0 +1,64 @@
+"""
+Approximate index modes against exact search: recall@k versus the flat
+index, p50/p99 single-query latency and index memory per language scope. "built" lists the index kinds the
+scope's partitions actually got: IVF types fall back to ivf_flat or flat
+when a partition is too small to train them (see build_ann_index()).
+
+    python -m benchmarks.bench_ann --n 200000 --dim 768 --nprobe 16 --ef-search 128
+"""
+import argparse
+import tempfile
+import time
+
+import numpy as np
+
+from benchmarks._synthetic import LANGS, synthetic_vectors, write_artifacts, load_retriever, percentiles_ms
+from src.retrieval.ann import INDEX_TYPES, index_kind, index_memory_bytes
+
+
+def recall_at_k(approx_ids: np.ndarray, exact_ids: np.ndarray) -> float:
+    hits = [len(set(a[a >= 0]) & set(e[e >= 0])) / max(1, (e >= 0).sum()) for a, e in zip(approx_ids, exact_ids)]
+    return float(np.mean(hits))
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--n", type=int, default=60000)
+    ap.add_argument("--dim", type=int, default=256)
+    ap.add_argument("--queries", type=int, default=200)
+    ap.add_argument("--top-k", type=int, default=5)
+    ap.add_argument("--clusters", type=int, default=256)
+    ap.add_argument("--nprobe", type=int, default=None)
+    ap.add_argument("--ef-search", type=int, default=None)
+    ap.add_argument("--types", nargs="+", default=list(INDEX_TYPES))
+    args = ap.parse_args()
+
+    queries = synthetic_vectors(args.queries, args.dim, seed=1, n_clusters=args.clusters)
+    with tempfile.TemporaryDirectory() as tmp:
+        write_artifacts(tmp, args.n, args.dim, n_clusters=args.clusters)
+        exact = load_retriever(tmp, index_type="flat")
+        truth = {lang: exact._search_scope(queries, exact._resolve_scope(lang), args.top_k)[1] for lang in LANGS}
+
+        print(f"corpus: n={args.n} dim={args.dim} k={args.top_k}")
+        print(f"{'type':<10}{'built':<15}{'lang':<8}{'build_s':>9}{'recall@k':>10}{'p50_ms':>9}{'p99_ms':>9}{'scope_MiB':>11}")
+        for kind in args.types:
+            t0 = time.perf_counter()
+            retriever = exact if kind == "flat" else load_retriever(tmp, index_type=kind)
+            build_s = time.perf_counter() - t0 if kind != "flat" else 0.0
+            retriever.set_search_params(nprobe=args.nprobe, ef_search=args.ef_search)
+            for lang in LANGS:
+                scope = retriever._resolve_scope(lang)
+                ids, lat = [], []
+                for q in queries:
+                    t0 = time.perf_counter()
+                    ids.append(retriever._search_scope(q.reshape(1, -1), scope, args.top_k)[1][0])
+                    lat.append(time.perf_counter() - t0)
+                mem = sum(index_memory_bytes(retriever.partitions[p]) for p in scope)
+                built = "/".join(sorted({index_kind(retriever.partitions[p]) for p in scope}))
+                pct = percentiles_ms(lat)
+                print(f"{kind:<10}{built:<15}{lang:<8}{build_s:>9.2f}{recall_at_k(np.array(ids), truth[lang]):>10.3f}"
+                      f"{pct['p50_ms']:>9.3f}{pct['p99_ms']:>9.3f}{mem / 2**20:>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
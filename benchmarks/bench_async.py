@@ -0,0 +1,123 @@
+"""
+Concurrent serving: a thread per request calling run() (one embedding
+round trip each) against arun() with micro-batching, under the same
+client concurrency. The embedder adds a fixed round-trip delay per call and
+allows at most --max-connections calls at once, standing in for the
+remote embedding API and its connection / concurrency limit.
+
+    python -m benchmarks.bench_async --requests 2000 --concurrency 64 --rtt-ms 40 --max-connections 4
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks._synthetic import LANGS, write_artifacts, percentiles_ms
+from src.batching import MicroBatcher
+from src.retrieval.embedders import HashEmbedder
+from src.retrieval.embedding import EmbeddingCache
+
+
+class RemoteLikeEmbedder(HashEmbedder):
+    """Hash embedder where each call holds one of `max_connections` slots for `rtt_ms`."""
+
+    def __init__(self, dim: int, rtt_ms: float, max_connections: int):
+        super().__init__(dim)
+        self.rtt_s = rtt_ms / 1000.0
+        self.slots = threading.Semaphore(max_connections)
+        self.calls = 0
+
+    def embed(self, texts):
+        with self.slots:
+            self.calls += 1
+            time.sleep(self.rtt_s)
+        return super().embed(texts)
+
+
+def build_pipeline(workdir: str, embedder, **kwargs):
+    from src.pipeline import SingAIRAGPipeline
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    try:
+        pipeline = SingAIRAGPipeline("", embedder=embedder, **kwargs)
+    finally:
+        os.chdir(cwd)
+    # Memory-only cache; queries are unique, so every request embeds
+    pipeline.retriever.query_cache = EmbeddingCache(None)
+    return pipeline
+
+
+def bench_threads(pipeline, requests, concurrency):
+    latencies = []
+
+    def one(req):
+        t0 = time.perf_counter()
+        pipeline.run(*req)
+        latencies.append(time.perf_counter() - t0)
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, requests))
+    return time.perf_counter() - t0, latencies
+
+
+async def bench_arun(pipeline, requests, concurrency):
+    latencies = []
+    gate = asyncio.Semaphore(concurrency)
+
+    async def one(req):
+        async with gate:
+            t0 = time.perf_counter()
+            await pipeline.arun(*req)
+            latencies.append(time.perf_counter() - t0)
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(one(r) for r in requests))
+    return time.perf_counter() - t0, latencies
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--n", type=int, default=20000, help="chunks in the synthetic store")
+    ap.add_argument("--dim", type=int, default=256)
+    ap.add_argument("--requests", type=int, default=1000)
+    ap.add_argument("--concurrency", type=int, default=64)
+    ap.add_argument("--rtt-ms", type=float, default=40.0)
+    ap.add_argument("--max-connections", type=int, default=4)
+    ap.add_argument("--max-batch", type=int, default=64)
+    ap.add_argument("--max-wait-ms", type=float, default=5.0)
+    ap.add_argument("--max-concurrent-batches", type=int, default=None)
+    args = ap.parse_args()
+
+    requests = [(f"how do I reset my password ticket {i}", LANGS[i % len(LANGS)]) for i in range(args.requests)]
+    with tempfile.TemporaryDirectory() as tmp:
+        write_artifacts(tmp, args.n, args.dim)
+
+        embedder = RemoteLikeEmbedder(args.dim, args.rtt_ms, args.max_connections)
+        pipeline = build_pipeline(tmp, embedder)
+        wall, lat = bench_threads(pipeline, requests, args.concurrency)
+        rows = [("threads+run", wall, lat, embedder.calls, 1.0)]
+
+        embedder = RemoteLikeEmbedder(args.dim, args.rtt_ms, args.max_connections)
+        pipeline = build_pipeline(tmp, embedder, max_batch_size=args.max_batch, max_wait_ms=args.max_wait_ms)
+        if args.max_concurrent_batches:
+            pipeline.batcher = MicroBatcher(pipeline._run_items, args.max_batch, args.max_wait_ms,
+                                            args.max_concurrent_batches)
+        wall, lat = asyncio.run(bench_arun(pipeline, requests, args.concurrency))
+        rows.append(("arun", wall, lat, embedder.calls, pipeline.batcher.stats()["mean_batch_size"]))
+        pipeline.batcher.close()
+
+    print(f"requests={args.requests} concurrency={args.concurrency} rtt={args.rtt_ms}ms "
+          f"connections={args.max_connections} "
+          f"max_batch={args.max_batch} max_wait={args.max_wait_ms}ms")
+    print(f"{'mode':<13}{'req/s':>9}{'p50_ms':>9}{'p99_ms':>9}{'embed_calls':>13}{'mean_batch':>12}")
+    for mode, wall, lat, calls, mean_batch in rows:
+        pct = percentiles_ms(lat)
+        print(f"{mode:<13}{len(requests) / wall:>9.1f}{pct['p50_ms']:>9.2f}{pct['p99_ms']:>9.2f}{calls:>13}{mean_batch:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
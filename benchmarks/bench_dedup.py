@@ -0,0 +1,121 @@
+"""
+Ingestion with and without near-duplicate elimination
+(build_index(dedup_threshold=...), src/ingestion/dedup.py). The synthetic
+KB gets near-copies of some documents: an en_sg variant of en articles and
+same-language republications, each with a few words changed. Reports
+chunks embedded and stored, store and snapshot size, search latency and
+recall@k per language, counting a hit on any document a kept chunk
+stands for.
+
+    python -m benchmarks.bench_dedup --synthetic 3000 --dup 0.4 --threshold 0.8
+    python -m benchmarks.bench_dedup --kb kb.parquet --eval eval.parquet
+
+Without --kb / --eval the Hugging Face datasets are loaded.
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from benchmarks._synthetic import built_index, eval_columns, load_eval_frame, percentiles_ms, synthetic_kb
+from benchmarks.bench_e2e import recall_by_lang
+from src.config.settings import TOP_K_SEARCH, EVAL_GOLD_FIELD
+from src.retrieval.embedders import HashEmbedder
+
+
+class CountingEmbedder(HashEmbedder):
+    """Hash embedder counting the corpus texts it embeds."""
+
+    def __init__(self, dim: int):
+        super().__init__(dim)
+        self.corpus_texts = 0
+
+    def embed_corpus(self, texts):
+        self.corpus_texts += len(texts)
+        return super().embed_corpus(texts)
+
+
+def with_near_copies(kb_df: pd.DataFrame, share: float, edit: float = 0.02, seed: int = 0) -> pd.DataFrame:
+    """Adds a near-copy of `share` of the documents (en -> en_sg, others same language), `edit` of words changed."""
+    rng = np.random.default_rng(seed)
+    picked = kb_df.iloc[rng.permutation(len(kb_df))[:int(len(kb_df) * share)]]
+    copies = []
+    for row in picked.to_dict("records"):
+        words = row["kb_text"].split(" ")
+        for i in rng.choice(len(words), size=max(1, int(len(words) * edit)), replace=False):
+            words[i] = words[i][::-1]
+        copies.append(dict(row, doc_id=row["doc_id"] + "_copy", lang="en_sg" if row["lang"] == "en" else row["lang"],
+                           kb_text=" ".join(words)))
+    return pd.concat([kb_df, pd.DataFrame(copies)], ignore_index=True)
+
+
+def _dir_mib(path: str) -> float:
+    total = 0
+    for root, _, files in os.walk(path):
+        total += sum(os.path.getsize(os.path.join(root, f)) for f in files)
+    return total / 2**20
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--kb", help="local KB (Parquet/Arrow/save_to_disk); default: Hugging Face")
+    ap.add_argument("--eval", help="local eval Parquet; default: Hugging Face")
+    ap.add_argument("--synthetic", type=int, default=0, help="generate a KB of this many docs plus eval queries")
+    ap.add_argument("--vocab", type=int, default=3000, help="pseudo-words per language in the synthetic KB")
+    ap.add_argument("--dup", type=float, default=0.4, help="synthetic: share of documents given a near-copy")
+    ap.add_argument("--threshold", type=float, default=0.8, help="near-duplicate Jaccard threshold")
+    ap.add_argument("--limit", type=int, default=None, help="evaluate at most this many eval queries")
+    ap.add_argument("--dim", type=int, default=256, help="hash embedder width")
+    ap.add_argument("--top-k", type=int, default=TOP_K_SEARCH)
+    args = ap.parse_args()
+
+    from src.retrieval.embedding import EmbeddingCache
+    from src.retrieval.search import RiskAwareRetriever
+
+    kb_df = with_near_copies(synthetic_kb(args.synthetic, vocab_size=args.vocab), args.dup) if args.synthetic else None
+    queries, langs, gold = eval_columns(load_eval_frame(kb_df, args.eval, args.limit, n_queries=args.synthetic))
+
+    rows = {}
+    for name, threshold in (("off", None), (f"dedup@{args.threshold}", args.threshold)):
+        embedder = CountingEmbedder(args.dim)
+        with tempfile.TemporaryDirectory() as tmp, \
+                built_index(tmp, kb_df, args.kb, embedder=embedder, dedup_threshold=threshold) as build_s:
+            retriever = RiskAwareRetriever("", query_cache=EmbeddingCache(None), embedder=embedder)
+            retriever.warm()
+            retriever.search(queries, langs)  # embed once, so the timed pass is search only
+            latencies = []
+            for q, lang in zip(queries, langs):
+                t0 = time.perf_counter()
+                retriever.search([q], [lang])
+                latencies.append(time.perf_counter() - t0)
+            deleted = retriever.chunk_meta.column("deleted").to_numpy(zero_copy_only=False)
+            recall = recall_by_lang(retriever, queries, langs, gold, args.top_k, EVAL_GOLD_FIELD) if gold else None
+            rows[name] = {
+                "build_s": build_s, "embedded": embedder.corpus_texts, "stored": int(np.count_nonzero(~deleted)),
+                "store_mib": os.path.getsize("chunk_store.arrow") / 2**20,
+                "snapshot_mib": _dir_mib("index_snapshots"),
+                "search_ms": float(np.mean(latencies) * 1e3), **percentiles_ms(latencies),
+                "recall": recall,
+            }
+
+    print(f"queries={len(queries)} k={args.top_k}")
+    print(f"{'build':<12}{'build_s':>9}{'embedded':>10}{'stored':>8}{'store_MiB':>11}{'snap_MiB':>10}"
+          f"{'search_ms':>11}{'p99_ms':>8}")
+    for name, r in rows.items():
+        print(f"{name:<12}{r['build_s']:>9.2f}{r['embedded']:>10}{r['stored']:>8}{r['store_mib']:>11.2f}"
+              f"{r['snapshot_mib']:>10.2f}{r['search_ms']:>11.3f}{r['p99_ms']:>8.3f}")
+    off, on = rows.values()
+    print(f"chunks removed: {off['stored'] - on['stored']} ({1 - on['stored'] / max(off['stored'], 1):.1%}), "
+          f"chunks not embedded: {off['embedded'] - on['embedded']}")
+    if gold:
+        names = list(rows)
+        print(f"{'lang':<8}{'n':>6}" + "".join(f"{n:>14}" for n in names))
+        for lang, r in off["recall"].items():
+            print(f"{lang:<8}{r['n']:>6}" + "".join(f"{rows[n]['recall'][lang]['recall']:>14.3f}" for n in names))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""
+End-to-end harness: builds an index over the KB, replays the eval queries
+through SingAIRAGPipeline.run and reports throughput, per-stage latency
+(guard, embed, search, gate, materialize) and recall@k per language.
+Stage timings come from the pipeline's Metrics hooks (src/telemetry.py).
+Queries are embedded with the deterministic hash embedder by default, so
+runs need no API key; results are also written as JSON for comparing
+commits.
+
+    python -m benchmarks.bench_e2e --synthetic 600 --out e2e.json
+    python -m benchmarks.bench_e2e --kb kb.parquet --eval eval.parquet --out e2e.json
+
+Without --kb / --eval the Hugging Face datasets are loaded. Eval column
+names come from EVAL_* in src/config/settings.py (or the flags below).
+"""
+import argparse
+import json
+import os
+import subprocess
+import tempfile
+import time
+from collections import defaultdict
+
+import numpy as np
+
+from benchmarks._synthetic import built_index, eval_columns, load_eval_frame, percentiles_ms, synthetic_kb
+from src.config.settings import (
+    TOP_K_SEARCH, EVAL_QUERY_COLUMN, EVAL_LANG_COLUMN, EVAL_GOLD_COLUMN, EVAL_GOLD_FIELD,
+)
+from src.telemetry import Metrics
+
+STAGES = ("guard", "embed", "search", "gate", "materialize", "total")
+
+
+def _git_commit():
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                             cwd=os.path.dirname(os.path.abspath(__file__)), check=True)
+        return out.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def recall_by_lang(retriever, queries, langs, gold, top_k: int, field: str) -> dict:
+    scores, ids = retriever.search(queries, langs, top_k)
+    hits = retriever.materialize(scores, ids, with_text=False)
+    per_lang = defaultdict(list)
+    for lang, g, results in zip(langs, gold, hits):
+        # Chunks folded from near-duplicates also list the documents they stand for
+        found = float(any(g == r[field] or g in r.get(field + "s", ()) for r in results))
+        per_lang[lang].append(found)
+        per_lang["all"].append(found)
+    return {lang: {"n": len(v), "recall": float(np.mean(v))} for lang, v in sorted(per_lang.items())}
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--kb", help="local KB (Parquet/Arrow/save_to_disk); default: Hugging Face")
+    ap.add_argument("--eval", help="local eval Parquet; default: Hugging Face")
+    ap.add_argument("--synthetic", type=int, default=0, help="generate a KB of this many docs plus eval queries")
+    ap.add_argument("--limit", type=int, default=None, help="replay at most this many eval queries")
+    ap.add_argument("--top-k", type=int, default=TOP_K_SEARCH)
+    ap.add_argument("--batch-size", type=int, default=64, help="run_batch size for the batched throughput figure")
+    ap.add_argument("--embedder", default="hash", help="embedding backend (hash = offline stub)")
+    ap.add_argument("--cache", action="store_true", help="keep the in-memory query cache enabled")
+    ap.add_argument("--query-col", default=EVAL_QUERY_COLUMN)
+    ap.add_argument("--lang-col", default=EVAL_LANG_COLUMN)
+    ap.add_argument("--gold-col", default=EVAL_GOLD_COLUMN)
+    ap.add_argument("--gold-field", default=EVAL_GOLD_FIELD, choices=["doc_id", "base_id"])
+    ap.add_argument("--out", help="write results as JSON to this path")
+    args = ap.parse_args()
+
+    from src.pipeline import SingAIRAGPipeline
+    from src.retrieval.embedders import get_embedder
+    from src.retrieval.embedding import EmbeddingCache
+
+    api_key = os.getenv("OPENAI_API_KEY", "")
+    kb_df = synthetic_kb(args.synthetic) if args.synthetic else None
+    ev_df = load_eval_frame(kb_df, args.eval, args.limit)
+    if args.synthetic:
+        ev_df = ev_df.rename(columns={EVAL_QUERY_COLUMN: args.query_col, EVAL_LANG_COLUMN: args.lang_col,
+                                      EVAL_GOLD_COLUMN: args.gold_col})
+    queries, langs, gold = eval_columns(ev_df, args.query_col, args.lang_col, args.gold_col)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        embedder = get_embedder(args.embedder, api_key=api_key)
+        with built_index(tmp, kb_df, args.kb, api_key, embedder=embedder) as build_s:
+            # Per-request stage timings come from the pipeline's own tracing hooks
+            traces = []
+            metrics = Metrics(sinks=[traces.append])
+            pipeline = SingAIRAGPipeline(api_key, embedder=embedder, metrics=metrics)
+            pipeline.retriever.query_cache = EmbeddingCache(None, max_items=10_000 if args.cache else 0)
+
+            t_start = time.perf_counter()
+            for q, lang in zip(queries, langs):
+                pipeline.run(q, lang)
+            run_s = time.perf_counter() - t_start
+            run_traces = [t for t in traces if t["op"] == "run"]
+            decisions = defaultdict(int)
+            for t in run_traces:
+                decisions[t["results"][0]["reason"].split(" ")[0]] += 1
+
+            pipeline.metrics = pipeline.retriever.metrics = None
+            pipeline.retriever.query_cache = EmbeddingCache(None, max_items=10_000 if args.cache else 0)
+            t_start = time.perf_counter()
+            for i in range(0, len(queries), args.batch_size):
+                pipeline.run_batch(queries[i:i + args.batch_size], langs[i:i + args.batch_size])
+            batch_s = time.perf_counter() - t_start
+
+            recall = None
+            if gold is not None:
+                recall = recall_by_lang(pipeline.retriever, queries, langs, gold, args.top_k, args.gold_field)
+
+    results = {
+        "commit": _git_commit(),
+        "config": {k: v for k, v in vars(args).items() if k != "out"},
+        "n_queries": len(queries),
+        "index_build_s": build_s,
+        "throughput_qps": {"run": len(queries) / run_s, "run_batch": len(queries) / batch_s},
+        "latency_ms": {
+            stage: dict(percentiles_ms(samples, qs=(50, 95, 99)), mean_ms=float(np.mean(samples) * 1e3))
+            for stage in STAGES
+            for samples in [[t["stages"].get(stage, 0.0) for t in run_traces]]
+        },
+        "recall_at_k": recall,
+        "decisions": dict(decisions),
+    }
+
+    print(f"commit={results['commit']} queries={len(queries)} k={args.top_k} embedder={args.embedder}")
+    print(f"throughput: run {results['throughput_qps']['run']:.1f} q/s, "
+          f"run_batch {results['throughput_qps']['run_batch']:.1f} q/s")
+    print(f"{'stage':<12}{'p50_ms':>9}{'p95_ms':>9}{'p99_ms':>9}")
+    for stage, pct in results["latency_ms"].items():
+        print(f"{stage:<12}{pct['p50_ms']:>9.3f}{pct['p95_ms']:>9.3f}{pct['p99_ms']:>9.3f}")
+    if recall:
+        print(f"{'lang':<8}{'n':>6}{'recall@k':>10}")
+        for lang, r in recall.items():
+            print(f"{lang:<8}{r['n']:>6}{r['recall']:>10.3f}")
+    print("decisions:", dict(decisions))
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"results -> {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Dense-only retrieval against lexical_mode="hybrid" (BM25 fast path plus
+reciprocal rank fusion), replaying eval queries through
+SingAIRAGPipeline.run. The embedder adds a fixed round-trip delay per call
+to stand in for the remote embedding API. Reports per-query latency,
+embedding calls, the fast-path share and recall@k per language.
+
+    python -m benchmarks.bench_lexical --synthetic 600 --rtt-ms 40
+    python -m benchmarks.bench_lexical --kb kb.parquet --eval eval.parquet
+
+Without --kb / --eval the Hugging Face datasets are loaded.
+"""
+import argparse
+import tempfile
+import time
+
+import numpy as np
+
+from benchmarks._synthetic import built_index, eval_columns, load_eval_frame, percentiles_ms, synthetic_kb
+from benchmarks.bench_async import RemoteLikeEmbedder
+from benchmarks.bench_e2e import recall_by_lang
+from src.config.settings import TOP_K_SEARCH, EVAL_GOLD_FIELD
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--kb", help="local KB (Parquet/Arrow/save_to_disk); default: Hugging Face")
+    ap.add_argument("--eval", help="local eval Parquet; default: Hugging Face")
+    ap.add_argument("--synthetic", type=int, default=0, help="generate a KB of this many docs plus eval queries")
+    ap.add_argument("--vocab", type=int, default=3000, help="pseudo-words per language in the synthetic KB")
+    ap.add_argument("--limit", type=int, default=None, help="replay at most this many eval queries")
+    ap.add_argument("--dim", type=int, default=256, help="hash embedder width")
+    ap.add_argument("--rtt-ms", type=float, default=40.0, help="simulated embedding round trip")
+    ap.add_argument("--top-k", type=int, default=TOP_K_SEARCH)
+    args = ap.parse_args()
+
+    from src.pipeline import SingAIRAGPipeline
+    from src.retrieval.embedders import HashEmbedder
+    from src.retrieval.embedding import EmbeddingCache
+    from src.retrieval.search import RiskAwareRetriever
+
+    kb_df = synthetic_kb(args.synthetic, vocab_size=args.vocab) if args.synthetic else None
+    queries, langs, gold = eval_columns(load_eval_frame(kb_df, args.eval, args.limit))
+
+    rows = {}
+    with tempfile.TemporaryDirectory() as tmp, built_index(tmp, kb_df, args.kb, embedder=HashEmbedder(args.dim)):
+        for mode in ("off", "hybrid"):
+            embedder = RemoteLikeEmbedder(args.dim, args.rtt_ms, max_connections=1)
+            t0 = time.perf_counter()
+            retriever = RiskAwareRetriever("", query_cache=EmbeddingCache(None, max_items=0),
+                                           embedder=embedder, lexical_mode=mode)
+            retriever.warm()
+            startup = time.perf_counter() - t0
+            pipeline = SingAIRAGPipeline("", embedder=embedder, retriever=retriever)
+
+            latencies = []
+            for q, lang in zip(queries, langs):
+                t0 = time.perf_counter()
+                pipeline.run(q, lang)
+                latencies.append(time.perf_counter() - t0)
+            calls, fast_path = embedder.calls, retriever.lexical_stats["fast_path"]
+            recall = recall_by_lang(retriever, queries, langs, gold, args.top_k, EVAL_GOLD_FIELD) if gold else None
+            rows[mode] = {
+                "startup_s": startup, "mean_ms": float(np.mean(latencies) * 1e3), **percentiles_ms(latencies),
+                "embed_calls": calls, "fast_path": fast_path, "recall": recall,
+            }
+
+    print(f"queries={len(queries)} k={args.top_k} rtt={args.rtt_ms}ms")
+    print(f"{'mode':<8}{'startup_s':>10}{'mean_ms':>9}{'p50_ms':>9}{'p99_ms':>9}{'embed_calls':>13}{'fast_path':>11}")
+    for mode, r in rows.items():
+        print(f"{mode:<8}{r['startup_s']:>10.2f}{r['mean_ms']:>9.2f}{r['p50_ms']:>9.2f}{r['p99_ms']:>9.2f}"
+              f"{r['embed_calls']:>13}{r['fast_path']:>11}")
+    print(f"latency saved per query: {rows['off']['mean_ms'] - rows['hybrid']['mean_ms']:.2f} ms (mean)")
+    if gold:
+        print(f"{'lang':<8}{'n':>6}{'dense':>9}{'hybrid':>9}")
+        for lang, r in rows["off"]["recall"].items():
+            print(f"{lang:<8}{r['n']:>6}{r['recall']:>9.3f}{rows['hybrid']['recall'][lang]['recall']:>9.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Sharded retrieval over a snapshot published with shard_by="lang_region".
+Compares searching every shard in-process with fanning out to N local
+shard processes (ProcessPoolTransport), checking that the merged top-k
+is identical, then compares unrestricted searches with searches kept to
+the caller's region: latency and the store rows each query scans.
+
+    python -m benchmarks.bench_shards --n 200000 --dim 256 --workers 2 4
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from benchmarks._synthetic import LANGS, percentiles_ms, write_artifacts
+
+REGIONS = ["SG", "MY", "ID"]
+
+
+def _timed_batches(retriever, queries, langs, regions, batch_size):
+    latencies = []
+    t0 = time.perf_counter()
+    for i in range(0, len(queries), batch_size):
+        b = slice(i, i + batch_size)
+        t1 = time.perf_counter()
+        retriever.search(queries[b], langs[b], regions=None if regions is None else regions[b])
+        latencies.append(time.perf_counter() - t1)
+    return len(queries) / (time.perf_counter() - t0), latencies
+
+
+def _rows_scanned(retriever, langs, regions):
+    parts = retriever._snapshot_parts
+    return float(np.mean([
+        sum(parts[key]["rows"] for key in retriever._resolve_scope(lang, region))
+        for lang, region in zip(langs, regions)
+    ]))
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--n", type=int, default=200000, help="chunks in the synthetic store")
+    ap.add_argument("--dim", type=int, default=256)
+    ap.add_argument("--index-type", default="flat")
+    ap.add_argument("--workers", type=int, nargs="+", default=[2, 4])
+    ap.add_argument("--queries", type=int, default=512)
+    ap.add_argument("--batch-size", type=int, default=32)
+    args = ap.parse_args()
+
+    from src.retrieval.embedders import HashEmbedder
+    from src.retrieval.embedding import EmbeddingCache
+    from src.retrieval.search import RiskAwareRetriever
+    from src.retrieval.shards import ProcessPoolTransport
+    from src.serving import publish
+
+    rng = np.random.default_rng(0)
+    queries = [f"reset password ticket {i}" for i in range(args.queries)]
+    langs = [LANGS[i] for i in rng.integers(0, len(LANGS), size=args.queries)]
+    regions = [REGIONS[i] for i in rng.integers(0, len(REGIONS), size=args.queries)]
+
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        write_artifacts(tmp, args.n, args.dim)
+        os.chdir(tmp)
+        try:
+            embedder = HashEmbedder(args.dim)
+            publish(embedder=embedder, index_type=args.index_type, shard_by="lang_region")
+            retriever = RiskAwareRetriever("", query_cache=EmbeddingCache(None), embedder=embedder,
+                                           index_type=args.index_type, shard_by="lang_region", attach_only=True)
+            retriever.warm()
+            # Embed once up front, so every pass times search alone
+            retriever.search(queries, langs)
+            print(f"store: n={args.n} dim={args.dim} index={args.index_type} "
+                  f"shards={len(retriever.partition_exact)}, {os.cpu_count()} CPUs")
+
+            base_scores, base_ids = retriever.search(queries, langs)
+            qps, lat = _timed_batches(retriever, queries, langs, None, args.batch_size)
+            print(f"{'transport':<14}{'qps':>9}{'p50_ms':>9}{'p99_ms':>9}{'same_top_k':>12}")
+            print(f"{'in-process':<14}{qps:>9.1f}{percentiles_ms(lat)['p50_ms']:>9.2f}"
+                  f"{percentiles_ms(lat)['p99_ms']:>9.2f}{'-':>12}")
+            for n_workers in args.workers:
+                retriever.transport = ProcessPoolTransport(retriever, n_workers)
+                try:
+                    scores, ids = retriever.search(queries, langs)
+                    same = bool(np.array_equal(ids, base_ids) and np.allclose(scores, base_scores, atol=1e-5))
+                    qps, lat = _timed_batches(retriever, queries, langs, None, args.batch_size)
+                finally:
+                    retriever.transport.close()
+                    retriever.transport = None
+                p = percentiles_ms(lat)
+                print(f"{f'{n_workers} workers':<14}{qps:>9.1f}{p['p50_ms']:>9.2f}{p['p99_ms']:>9.2f}{str(same):>12}")
+
+            print(f"{'scope':<14}{'qps':>9}{'p50_ms':>9}{'p99_ms':>9}{'rows/query':>12}")
+            for name, scope_regions in (("all regions", [None] * len(queries)), ("own region", regions)):
+                qps, lat = _timed_batches(retriever, queries, langs, scope_regions, args.batch_size)
+                p = percentiles_ms(lat)
+                print(f"{name:<14}{qps:>9.1f}{p['p50_ms']:>9.2f}{p['p99_ms']:>9.2f}"
+                      f"{_rows_scanned(retriever, langs, scope_regions):>12.0f}")
+        finally:
+            os.chdir(cwd)
+
+
+if __name__ == "__main__":
+    main()
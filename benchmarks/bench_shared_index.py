@@ -0,0 +1,83 @@
+"""
+Memory/latency comparison: per-query-language FAISS copies (legacy layout)
+versus the language-partitioned store used by RiskAwareRetriever.
+
+    python -m benchmarks.bench_shared_index --n 20000 --dim 3072
+"""
+import argparse
+import tempfile
+import time
+
+import faiss
+import numpy as np
+
+from benchmarks._synthetic import LANGS, synthetic_vectors, write_artifacts, load_retriever, percentiles_ms
+from src.config.settings import LANG_SCOPE_MAP
+
+
+def build_legacy(vecs: np.ndarray, chunk_langs: np.ndarray):
+    """The previous layout: one IndexFlatIP per query language over its whole scope."""
+    indices, scopes = {}, {}
+    unique_langs = set(LANG_SCOPE_MAP.keys())
+    unique_langs.update(chunk_langs)
+    for q_lang in unique_langs:
+        scope_langs = LANG_SCOPE_MAP.get(q_lang, [q_lang])
+        global_idxs = np.where(np.isin(chunk_langs, scope_langs))[0].astype(np.int64)
+        if len(global_idxs) == 0:
+            continue
+        idx = faiss.IndexFlatIP(vecs.shape[1])
+        idx.add(vecs[global_idxs])
+        indices[q_lang] = idx
+        scopes[q_lang] = global_idxs
+    return indices, scopes
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--n", type=int, default=20000)
+    ap.add_argument("--dim", type=int, default=3072)
+    ap.add_argument("--queries", type=int, default=200)
+    ap.add_argument("--top-k", type=int, default=5)
+    args = ap.parse_args()
+
+    queries = synthetic_vectors(args.queries, args.dim, seed=1)
+    with tempfile.TemporaryDirectory() as tmp:
+        write_artifacts(tmp, args.n, args.dim)
+        t0 = time.perf_counter()
+        retriever = load_retriever(tmp, index_type="flat")
+        shared_build = time.perf_counter() - t0
+
+        vecs = np.asarray(retriever.chunk_vecs)
+        chunk_langs = retriever.chunk_meta.column("lang").to_numpy().astype(str)
+        t0 = time.perf_counter()
+        legacy, legacy_scopes = build_legacy(vecs, chunk_langs)
+        legacy_build = time.perf_counter() - t0
+        legacy_bytes = sum(idx.ntotal * idx.code_size for idx in legacy.values())
+
+        print(f"corpus: n={args.n} dim={args.dim} raw={vecs.nbytes / 2**20:.1f} MiB")
+        print(f"{'layout':<12}{'build_s':>10}{'index_MiB':>12}")
+        print(f"{'legacy':<12}{legacy_build:>10.2f}{legacy_bytes / 2**20:>12.1f}")
+        print(f"{'shared':<12}{shared_build:>10.2f}{retriever.memory_bytes() / 2**20:>12.1f}")
+
+        print(f"\n{'lang':<8}{'legacy_p50':>12}{'legacy_p99':>12}{'shared_p50':>12}{'shared_p99':>12}{'agree':>8}")
+        for lang in LANGS:
+            legacy_t, shared_t, agree = [], [], 0
+            scope = retriever._resolve_scope(lang)
+            for q in queries:
+                q = q.reshape(1, -1)
+                t0 = time.perf_counter()
+                _, local = legacy[lang].search(q, args.top_k)
+                ids_legacy = legacy_scopes[lang][local[0]]
+                legacy_t.append(time.perf_counter() - t0)
+
+                t0 = time.perf_counter()
+                _, ids_shared = retriever._search_scope(q, scope, args.top_k)
+                shared_t.append(time.perf_counter() - t0)
+                agree += int(np.array_equal(ids_legacy, ids_shared[0]))
+            lp, sp = percentiles_ms(legacy_t), percentiles_ms(shared_t)
+            print(f"{lang:<8}{lp['p50_ms']:>12.3f}{lp['p99_ms']:>12.3f}"
+                  f"{sp['p50_ms']:>12.3f}{sp['p99_ms']:>12.3f}{agree / len(queries):>8.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""
+Offline Gate-A threshold sweep. Gate-B and retrieval run once over the
+eval set (src/evaluation.py); coverage, risk and AURC for every threshold
+and language are then computed from the cached scores, with Gate-B
+("guarded") and without it ("gate_a"). Pass --scores to keep the scores
+as .npz: later runs with the same path skip indexing and embedding.
+
+    python -m benchmarks.bench_threshold --synthetic 2000 --ood 0.3 --verify
+    python -m benchmarks.bench_threshold --kb kb.parquet --eval eval.parquet --scores eval_scores.npz
+
+Without --kb / --eval the Hugging Face datasets are loaded. An eval query
+is answerable when it has a gold document, or per --answerable-col.
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from benchmarks._synthetic import built_index, eval_columns, load_eval_frame, synthetic_kb
+from src.config.settings import (
+    TOP_K_SEARCH, SIMILARITY_THRESHOLD, EVAL_QUERY_COLUMN, EVAL_LANG_COLUMN, EVAL_GOLD_COLUMN, EVAL_GOLD_FIELD,
+    EVAL_SWEEP_THRESHOLDS,
+)
+
+
+def _with_ood(ev_df: pd.DataFrame, share: float, seed: int = 0) -> pd.DataFrame:
+    """Appends out-of-KB queries (no gold document) so the sweep has something to refuse."""
+    rng = np.random.default_rng(seed)
+    n = int(len(ev_df) * share)
+    vocab = [f"zx{i:04d}" for i in range(2000)]
+    ood = pd.DataFrame({
+        EVAL_QUERY_COLUMN: [" ".join(rng.choice(vocab, size=8)) for _ in range(n)],
+        EVAL_LANG_COLUMN: rng.choice(ev_df[EVAL_LANG_COLUMN].unique(), size=n),
+        EVAL_GOLD_COLUMN: None,
+    })
+    return pd.concat([ev_df, ood], ignore_index=True)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--kb", help="local KB (Parquet/Arrow/save_to_disk); default: Hugging Face")
+    ap.add_argument("--eval", help="local eval Parquet; default: Hugging Face")
+    ap.add_argument("--synthetic", type=int, default=0, help="generate a KB of this many docs plus eval queries")
+    ap.add_argument("--vocab", type=int, default=3000, help="pseudo-words per language in the synthetic KB")
+    ap.add_argument("--ood", type=float, default=0.0, help="synthetic: add this share of out-of-KB queries")
+    ap.add_argument("--limit", type=int, default=None, help="score at most this many eval queries")
+    ap.add_argument("--top-k", type=int, default=TOP_K_SEARCH)
+    ap.add_argument("--embedder", default="hash", help="embedding backend (hash = offline stub)")
+    ap.add_argument("--gold-field", default=EVAL_GOLD_FIELD, choices=["doc_id", "base_id"])
+    ap.add_argument("--answerable-col", help="boolean eval column: the query should be answered")
+    ap.add_argument("--scores", help="cached EvalScores (.npz): loaded if present, else written")
+    ap.add_argument("--thresholds", type=float, nargs=3, default=EVAL_SWEEP_THRESHOLDS, metavar=("START", "STOP", "STEP"))
+    ap.add_argument("--verify", action="store_true", help="replay run_batch at SIMILARITY_THRESHOLD and compare")
+    ap.add_argument("--out", help="write the sweep as CSV to this path")
+    args = ap.parse_args()
+
+    from src.evaluation import EvalScores, aurc_by_lang, score_eval_set, sweep, sweep_thresholds
+
+    score_s = None
+    if args.scores and os.path.exists(args.scores):
+        ev = EvalScores.load(args.scores)
+        print(f"loaded {len(ev)} scored queries from {args.scores}")
+    else:
+        from src.pipeline import SingAIRAGPipeline
+        from src.retrieval.embedders import get_embedder
+
+        api_key = os.getenv("OPENAI_API_KEY", "")
+        kb_df = synthetic_kb(args.synthetic, vocab_size=args.vocab) if args.synthetic else None
+        ev_df = load_eval_frame(kb_df, args.eval, args.limit)
+        if args.synthetic:
+            # Added after --limit, so the limit never cuts the out-of-KB queries
+            ev_df = _with_ood(ev_df, args.ood)
+        queries, langs, gold = eval_columns(ev_df)
+        answerable = ev_df[args.answerable_col].astype(bool).tolist() if args.answerable_col else None
+
+        scores_path = os.path.abspath(args.scores) if args.scores else None
+        with tempfile.TemporaryDirectory() as tmp:
+            embedder = get_embedder(args.embedder, api_key=api_key)
+            with built_index(tmp, kb_df, args.kb, api_key, embedder=embedder):
+                pipeline = SingAIRAGPipeline(api_key, embedder=embedder)
+
+                t0 = time.perf_counter()
+                ev = score_eval_set(pipeline.retriever, queries, langs, gold, answerable, args.top_k, args.gold_field)
+                score_s = time.perf_counter() - t0
+                if scores_path:
+                    ev.save(scores_path)
+
+                if args.verify:
+                    t0 = time.perf_counter()
+                    outputs = pipeline.run_batch(queries, langs)
+                    replay_s = time.perf_counter() - t0
+                    replayed = np.array([o["decision"] == "ANSWER" for o in outputs])
+                    swept = ev.eligible() & (ev.top_score >= SIMILARITY_THRESHOLD)
+                    print(f"verify: sweep matches run_batch at threshold {SIMILARITY_THRESHOLD}: "
+                          f"{bool(np.array_equal(replayed, swept))} (one pipeline pass {replay_s:.2f}s)")
+
+    thresholds = sweep_thresholds(tuple(args.thresholds))
+    t0 = time.perf_counter()
+    curves = {mode: sweep(ev, thresholds, guards=mode == "guarded") for mode in ("gate_a", "guarded")}
+    aurcs = {mode: aurc_by_lang(ev, guards=mode == "guarded") for mode in ("gate_a", "guarded")}
+    sweep_s = time.perf_counter() - t0
+
+    timing = f"scoring pass {score_s:.2f}s, " if score_s is not None else ""
+    print(f"queries={len(ev)} thresholds={len(thresholds)} {timing}sweep {sweep_s * 1e3:.1f} ms")
+    at = curves["guarded"][np.isclose(curves["guarded"]["threshold"], SIMILARITY_THRESHOLD)].set_index("lang")
+    print(f"{'lang':<8}{'n':>6}{'aurc_gate_a':>13}{'aurc_guarded':>14}"
+          f"{f'cov@{SIMILARITY_THRESHOLD}':>11}{f'risk@{SIMILARITY_THRESHOLD}':>12}")
+    for lang, value in aurcs["guarded"].items():
+        cov, risk = (at.loc[lang, "coverage"], at.loc[lang, "risk"]) if lang in at.index else (np.nan, np.nan)
+        n = int(curves["guarded"].loc[curves["guarded"]["lang"] == lang, "n"].iloc[0])
+        print(f"{lang:<8}{n:>6}{aurcs['gate_a'][lang]:>13.3f}{value:>14.3f}{cov:>11.3f}{risk:>12.3f}")
+
+    if args.out:
+        pd.concat([df.assign(mode=mode) for mode, df in curves.items()], ignore_index=True).to_csv(args.out, index=False)
+        print(f"sweep -> {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+Multi-process serving: N worker processes each building their own
+partitions ("private") against N workers attaching read-only to one
+published snapshot ("shared", src/serving.py). Reports worker startup,
+aggregate run() throughput and node memory as the sum of worker PSS
+(shared pages split across the processes mapping them) plus private
+anonymous memory per worker. Memory figures need Linux /proc.
+
+    python -m benchmarks.bench_workers --n 100000 --dim 256 --workers 1 2 4
+"""
+import argparse
+import multiprocessing as mp
+import os
+import tempfile
+import time
+
+from benchmarks._synthetic import LANGS, write_artifacts
+
+
+def _memory_kib():
+    mem = {}
+    try:
+        with open("/proc/self/smaps_rollup", encoding="ascii") as f:
+            for line in f:
+                key, _, rest = line.partition(":")
+                if key in ("Pss", "Rss"):
+                    mem[key] = int(rest.split()[0])
+        with open("/proc/self/status", encoding="ascii") as f:
+            for line in f:
+                if line.startswith("RssAnon:"):
+                    mem["Anon"] = int(line.split()[1])
+    except OSError:
+        pass
+    return mem
+
+
+def _worker(workdir, mode, dim, index_type, n_queries, seed, barrier, results):
+    os.chdir(workdir)
+    from src.pipeline import SingAIRAGPipeline
+    from src.retrieval.embedders import HashEmbedder
+    from src.retrieval.embedding import EmbeddingCache
+    from src.retrieval.search import RiskAwareRetriever
+    from src.serving import attach
+
+    t0 = time.perf_counter()
+    embedder = HashEmbedder(dim)
+    if mode == "shared":
+        pipeline = attach(embedder=embedder, index_type=index_type)
+    else:
+        retriever = RiskAwareRetriever("", query_cache=EmbeddingCache(None), index_type=index_type,
+                                       embedder=embedder, snapshot_root=None)
+        pipeline = SingAIRAGPipeline("", embedder=embedder, retriever=retriever)
+    startup = time.perf_counter() - t0
+
+    requests = [(f"reset password ticket {seed}-{i}", LANGS[i % len(LANGS)]) for i in range(n_queries)]
+    barrier.wait()
+    start = time.time()
+    for query, lang in requests:
+        pipeline.run(query, lang)
+    results.put({"startup": startup, "start": start, "end": time.time(), "n": n_queries, **_memory_kib()})
+    # Hold the mappings until every worker has measured its memory
+    barrier.wait()
+
+
+def run_mode(workdir, mode, n_workers, args):
+    ctx = mp.get_context("spawn")
+    barrier = ctx.Barrier(n_workers)
+    results = ctx.Queue()
+    procs = [
+        ctx.Process(target=_worker, args=(workdir, mode, args.dim, args.index_type, args.queries, w, barrier, results))
+        for w in range(n_workers)
+    ]
+    for p in procs:
+        p.start()
+    rows = [results.get() for _ in procs]
+    for p in procs:
+        p.join()
+    wall = max(r["end"] for r in rows) - min(r["start"] for r in rows)
+    return {
+        "startup_s": max(r["startup"] for r in rows),
+        "qps": sum(r["n"] for r in rows) / wall,
+        "pss_mib": sum(r.get("Pss", 0) for r in rows) / 1024,
+        "anon_mib": sum(r.get("Anon", 0) for r in rows) / 1024 / n_workers,
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--n", type=int, default=100000, help="chunks in the synthetic store")
+    ap.add_argument("--dim", type=int, default=256)
+    ap.add_argument("--index-type", default="flat")
+    ap.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    ap.add_argument("--queries", type=int, default=500, help="run() calls per worker")
+    args = ap.parse_args()
+
+    from src.retrieval.embedders import HashEmbedder
+    from src.serving import publish
+
+    with tempfile.TemporaryDirectory() as tmp:
+        write_artifacts(tmp, args.n, args.dim)
+        cwd = os.getcwd()
+        os.chdir(tmp)
+        try:
+            publish(embedder=HashEmbedder(args.dim), index_type=args.index_type)
+        finally:
+            os.chdir(cwd)
+
+        print(f"store: n={args.n} dim={args.dim} index={args.index_type} "
+              f"vectors={args.n * args.dim * 4 / 2**20:.1f} MiB, {os.cpu_count()} CPUs")
+        print(f"{'mode':<9}{'workers':>8}{'startup_s':>11}{'qps':>9}{'node_pss_MiB':>14}{'anon/worker_MiB':>17}")
+        for n_workers in args.workers:
+            for mode in ("private", "shared"):
+                r = run_mode(tmp, mode, n_workers, args)
+                print(f"{mode:<9}{n_workers:>8}{r['startup_s']:>11.2f}{r['qps']:>9.1f}"
+                      f"{r['pss_mib']:>14.1f}{r['anon_mib']:>17.1f}")
+
+
+if __name__ == "__main__":
+    main()
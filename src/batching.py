@@ -0,0 +1,86 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+from src.config.settings import ASYNC_MAX_BATCH_SIZE, ASYNC_MAX_WAIT_MS, ASYNC_MAX_CONCURRENT_BATCHES
+
+class MicroBatcher:
+    """
+    Dynamic micro-batching for asyncio callers.
+
+    submit() parks each request on a future. Pending requests are flushed
+    as one call to `process_batch` when `max_batch_size` have arrived or
+    `max_wait_ms` after the first one, whichever comes first. The batch
+    runs on a worker thread so the event loop keeps accepting requests,
+    and results are fanned back out in order. Under load, batches grow on
+    their own while the previous one is still running. If the batch
+    raises, every request in it gets that exception.
+
+    `process_batch` must return one result per item. Up to
+    `max_concurrent_batches` batches run at once, so it must be
+    thread-safe; with 1, batches never overlap.
+    """
+
+    def __init__(
+        self,
+        process_batch: Callable[[List[Any]], Sequence[Any]],
+        max_batch_size: int = ASYNC_MAX_BATCH_SIZE,
+        max_wait_ms: float = ASYNC_MAX_WAIT_MS,
+        max_concurrent_batches: int = ASYNC_MAX_CONCURRENT_BATCHES,
+    ):
+        self.process_batch = process_batch
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait_s = max_wait_ms / 1000.0
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrent_batches, thread_name_prefix="microbatch")
+        self._pending: List[Tuple[Any, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self.batches = 0
+        self.items = 0
+
+    async def submit(self, item: Any) -> Any:
+        loop = asyncio.get_running_loop()
+        fut = loop.create_future()
+        self._pending.append((item, fut))
+        if len(self._pending) >= self.max_batch_size:
+            self._flush(loop)
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait_s, self._flush, loop)
+        return await fut
+
+    def _flush(self, loop: asyncio.AbstractEventLoop):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+        self.batches += 1
+        self.items += len(batch)
+        task = loop.run_in_executor(self._executor, self.process_batch, [item for item, _ in batch])
+        task.add_done_callback(lambda t: self._resolve(batch, t))
+
+    @staticmethod
+    def _resolve(batch: List[Tuple[Any, asyncio.Future]], task: asyncio.Future):
+        if task.cancelled():
+            for _, fut in batch:
+                fut.cancel()
+            return
+        exc = task.exception()
+        results = task.result() if exc is None else [None] * len(batch)
+        for (_, fut), result in zip(batch, results):
+            # Callers that gave up (cancelled) are skipped
+            if fut.done():
+                continue
+            if exc is not None:
+                fut.set_exception(exc)
+            else:
+                fut.set_result(result)
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "batches": self.batches,
+            "items": self.items,
+            "mean_batch_size": self.items / self.batches if self.batches else 0.0,
+        }
+
+    def close(self):
+        self._executor.shutdown(wait=True)
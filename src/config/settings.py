@@ -1,18 +1,112 @@
+import os
 import re
 
 # HuggingFace Repos
 HF_KB_REPO = "praveengovi/multilingual-smb-sales-care-kb"
 HF_EVAL_REPO = "praveengovi/multilingual-smb-sales-care-eval-dataset"
 
+# Evaluation dataset columns (benchmarks/bench_e2e.py)
+EVAL_QUERY_COLUMN = "query"
+EVAL_LANG_COLUMN = "lang"
+EVAL_GOLD_COLUMN = "doc_id"   # expected KB document per query
+EVAL_GOLD_FIELD = "doc_id"    # retrieved field it is compared with: "doc_id" | "base_id"
+EVAL_SWEEP_THRESHOLDS = (0.0, 1.0, 0.005)  # Gate-A threshold sweep: start, stop, step
+
 # Model Config
+EMBED_BACKEND = "openai"      # "openai" | "local" (in-process CPU model) | "hash" (offline tests)
 EMBED_MODEL = "text-embedding-3-large"
+LOCAL_EMBED_MODEL = "intfloat/multilingual-e5-small"
+LOCAL_EMBED_BATCH_SIZE = 64
+LOCAL_EMBED_QUERY_PREFIX = "query: "
+LOCAL_EMBED_PASSAGE_PREFIX = "passage: "
+HASH_EMBED_DIM = 256
 TOP_K_SEARCH = 5
 
+# Gate-A: top cosine below this is refused as out-of-domain (paper section 3.3;
+# tune with benchmarks/bench_threshold.py)
+SIMILARITY_THRESHOLD = 0.25
+
+# Vector Index (per language partition)
+# "auto" | "flat" | "ivf_flat" | "ivf_pq" | "hnsw"
+INDEX_TYPE = "auto"
+AUTO_FLAT_MAX = 50_000        # auto: partitions up to this size stay exact
+AUTO_HNSW_MAX = 1_000_000     # auto: HNSW up to this size, IVF-PQ beyond
+IVF_NLIST = None              # None -> ~4*sqrt(n), capped by training size
+IVF_NPROBE = 16
+PQ_M = 64                     # sub-quantizers; must divide the embedding dim
+PQ_NBITS = 8
+HNSW_M = 32
+HNSW_EF_CONSTRUCTION = 200
+HNSW_EF_SEARCH = 128
+# Partition vector encoding: "float32" | "float16" | "int8" (scalar quantized).
+# Full float32 vectors stay in the chunk store and re-score lossy candidates.
+VECTOR_STORAGE = "float32"
+VECTOR_DIM = None             # Matryoshka truncation (e.g. 256/512/1024); None = full dim
+RESCORE_FACTOR = 4            # lossy partitions fetch top_k * this candidates to re-score
+
+# Shards: one partition per chunk language ("lang") or per language and
+# region ("lang_region"). Searches kept to the caller's region work with both;
+# "lang_region" skips other regions' shards instead of filtering their rows.
+# SHARD_WORKERS > 0 serves the shards from that many local processes.
+SHARD_BY = "lang"
+SHARD_WORKERS = 0
+
+# Lexical retrieval: per-language BM25 next to the dense partitions.
+# "off" = dense only; "hybrid" = lexical fast path, otherwise BM25 + dense
+# fused by reciprocal rank. Fused hits keep exact cosines; fast-path answers
+# skip embedding and Gate-A, and their scores are NaN (no cosine exists).
+LEXICAL_MODE = "off"
+LEXICAL_CHAR_NGRAMS = {"zh": 2, "ta": 3}   # char n-grams instead of words
+BM25_K1 = 1.2
+BM25_B = 0.75
+LEXICAL_CANDIDATES = 20       # per-scope candidates from each of BM25 and dense before fusion
+RRF_K = 60                    # reciprocal rank fusion constant
+# Fast path: answer from the lexical match alone (no embedding call) when the
+# top chunk covers this IDF share of a query of at least MIN_TERMS distinct
+# terms and outscores the runner-up by MARGIN x.
+LEXICAL_FASTPATH_COVERAGE = 0.95
+LEXICAL_FASTPATH_MIN_TERMS = 4
+LEXICAL_FASTPATH_MARGIN = 1.2
+
 # Paths
-INDEX_PATH = "singai_kb.index"
-META_PATH = "phoenix_chunk_meta.parquet"
 CHUNK_VEC_DIR = "."
 QUERY_VEC_DIR = "."
+# Single aligned artifact: chunk_id, metadata, text and vectors (Arrow IPC)
+CHUNK_STORE_PATH = os.path.join(CHUNK_VEC_DIR, "chunk_store.arrow")
+
+# Serialized partition indexes written at ingestion; pods map these instead
+# of rebuilding. Only the newest INDEX_SNAPSHOT_KEEP snapshots are kept,
+# plus older ones a running retriever still holds a lease on.
+INDEX_SNAPSHOT_DIR = os.path.join(CHUNK_VEC_DIR, "index_snapshots")
+INDEX_SNAPSHOT_KEEP = 2
+
+# Near-duplicate chunks (MinHash/LSH over token shingles, before embedding):
+# chunks at or above this estimated Jaccard similarity share one stored
+# vector that lists every source doc_id. None = off.
+DEDUP_THRESHOLD = None
+DEDUP_NUM_PERM = 128
+DEDUP_BANDS = 16              # LSH bands of DEDUP_NUM_PERM / DEDUP_BANDS rows each
+DEDUP_SHINGLE = 3             # tokens per shingle
+
+# Incremental indexing: compact once this fraction of rows are tombstones
+INDEX_COMPACT_RATIO = 0.2
+
+# Query Embedding Cache (in-memory LRU over an on-disk store; None path = memory only)
+EMBED_CACHE_SIZE = 10_000
+EMBED_CACHE_PATH = os.path.join(QUERY_VEC_DIR, "query_embed_cache")
+
+# Decision cache in front of SingAIRAGPipeline (opt-in, see src/decision_cache.py)
+DECISION_CACHE_SIZE = 50_000
+DECISION_CACHE_TTL_S = 3600.0
+
+# Ingestion Embedding Engine
+EMBED_BASE_URL = None          # point at a local fake server for offline runs
+EMBED_BATCH_SIZE = 128
+EMBED_MAX_IN_FLIGHT = 4
+EMBED_TPM_LIMIT = 1_000_000    # tokens per minute budget for the account/tier
+EMBED_MAX_RETRIES = 6
+EMBED_BACKOFF_S = 1.0
+EMBED_CHECKPOINT_DIR = os.path.join(CHUNK_VEC_DIR, "embed_checkpoints")
 
 # Chunking Specifications
 CHUNK_SPEC_BY_LANG = {
@@ -25,6 +119,18 @@ CHUNK_SPEC_BY_LANG = {
 }
 DEFAULT_SPEC = {"max_chars": 900, "overlap_chars": 120}
 
+# Async serving (SingAIRAGPipeline.arun): concurrent requests are micro-batched
+ASYNC_MAX_BATCH_SIZE = 64      # flush as soon as this many requests are waiting
+ASYNC_MAX_WAIT_MS = 5.0        # ... or this long after the first one arrived
+ASYNC_MAX_CONCURRENT_BATCHES = 4  # batches in flight at once (like EMBED_MAX_IN_FLIGHT)
+
+# Streaming ingestion: KB documents per batch (bounds peak memory)
+KB_STREAM_BATCH_ROWS = 1000
+
+# Parallel chunking (process pool over document batches)
+CHUNK_WORKERS = os.cpu_count() or 1
+CHUNK_BATCH_DOCS = 512
+
 # Sentence Splitters
 _SENT_SPLIT = {
     "zh": re.compile(r"(?<=[。！？\n])"),
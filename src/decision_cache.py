@@ -0,0 +1,131 @@
+import copy
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+from src.config.settings import DECISION_CACHE_SIZE, DECISION_CACHE_TTL_S
+from src.retrieval.embedding import normalize_text
+
+class LocalBackend:
+    """
+    In-process LRU with per-entry expiry; the stand-in for a shared
+    backend. Values are deep-copied in and out, so callers may mutate what
+    they get back. Thread-safe.
+    """
+
+    shared = False
+
+    def __init__(self, max_items: int = DECISION_CACHE_SIZE):
+        self.max_items = max_items
+        self._items: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.expired = 0
+        self.evictions = 0
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                return None
+            expires, value = item
+            if expires <= time.monotonic():
+                del self._items[key]
+                self.expired += 1
+                return None
+            self._items.move_to_end(key)
+        return copy.deepcopy(value)
+
+    def set(self, key: str, value: Any, ttl_s: float):
+        value = copy.deepcopy(value)
+        with self._lock:
+            self._items[key] = (time.monotonic() + ttl_s, value)
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_items:
+                self._items.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+    def stats(self) -> Dict[str, float]:
+        return {"size": len(self._items), "expired": self.expired, "evictions": self.evictions}
+
+class RedisBackend:
+    """
+    Shared backend over a redis-py compatible client (get / set with ex=),
+    so every worker and node sees the same decisions. Values are stored as
+    JSON under `prefix`; expiry and eviction are left to the server.
+    """
+
+    shared = True
+
+    def __init__(self, client, prefix: str = "singai:decision:"):
+        self.client = client
+        self.prefix = prefix
+
+    def get(self, key: str) -> Optional[Any]:
+        raw = self.client.get(self.prefix + key)
+        return None if raw is None else json.loads(raw)
+
+    def set(self, key: str, value: Any, ttl_s: float):
+        self.client.set(self.prefix + key, json.dumps(value, ensure_ascii=False), ex=max(1, int(ttl_s)))
+
+    def clear(self):
+        pass
+
+class DecisionCache:
+    """
+    Caches pipeline outputs keyed on normalized query text, language (and
+    region, when retrieval is restricted to one) and the retriever's index
+    version. A new index version changes every key, so stale decisions are
+    never served. The local backend is also cleared as soon as a new
+    version is seen; a shared backend lets old keys expire
+    by TTL, since other workers may still be serving the old index.
+    """
+
+    def __init__(self, backend=None, ttl_s: float = DECISION_CACHE_TTL_S, max_items: int = DECISION_CACHE_SIZE):
+        self.backend = backend if backend is not None else LocalBackend(max_items)
+        self.ttl_s = ttl_s
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._version: Optional[str] = None
+        self._lock = threading.Lock()
+
+    def key(self, query: str, lang: str, index_version: str, region: Optional[str] = None) -> str:
+        if index_version != self._version:
+            with self._lock:
+                if index_version != self._version:
+                    if self._version is not None and not self.backend.shared:
+                        self.backend.clear()
+                        self.invalidations += 1
+                    self._version = index_version
+        scope = lang if region is None else f"{lang}\x00{region}"
+        return hashlib.sha1(f"{index_version}\x00{scope}\x00{normalize_text(query)}".encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        value = self.backend.get(key)
+        with self._lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return value
+
+    def put(self, key: str, output: Dict[str, Any]):
+        self.backend.set(key, output, self.ttl_s)
+
+    def stats(self) -> Dict[str, float]:
+        lookups = self.hits + self.misses
+        stats = {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "invalidations": self.invalidations,
+        }
+        if hasattr(self.backend, "stats"):
+            stats.update(self.backend.stats())
+        return stats
@@ -0,0 +1,155 @@
+from typing import Dict, List, Optional, Sequence, Tuple
+import numpy as np
+import pandas as pd
+from src.config.settings import TOP_K_SEARCH, EVAL_GOLD_FIELD, EVAL_SWEEP_THRESHOLDS
+from src.guardrails.domain_guard import domain_guard
+
+class EvalScores:
+    """
+    One Gate-B and retrieval pass over an eval set: per query the ranked
+    top-k scores, the rank of the gold document among them (-1 if missed),
+    whether Gate-B blocks it and whether it should be answered at all.
+    Everything a Gate-A threshold sweep needs, so sweeps never embed or
+    search again. save() / load() keep it as .npz. Queries answered by the
+    lexical fast path keep their NaN scores (see search.lexical_matches()).
+    """
+
+    _FIELDS = ("langs", "scores", "gold_rank", "blocked", "answerable")
+
+    def __init__(self, langs, scores, gold_rank, blocked, answerable):
+        self.langs = np.asarray(langs, dtype=str)
+        self.scores = np.asarray(scores, dtype=np.float32)
+        self.gold_rank = np.asarray(gold_rank, dtype=np.int64)
+        self.blocked = np.asarray(blocked, dtype=bool)
+        self.answerable = np.asarray(answerable, dtype=bool)
+
+    def __len__(self) -> int:
+        return len(self.langs)
+
+    @property
+    def top_score(self) -> np.ndarray:
+        """
+        Gate-A's input per query; -inf where retrieval found nothing and
+        +inf for lexical fast-path answers, which pass at any threshold.
+        """
+        return np.where(np.isnan(self.scores[:, 0]), np.inf, self.scores[:, 0])
+
+    def eligible(self, guards: bool = True) -> np.ndarray:
+        """Queries Gate-A gets to decide: a hit was found and (with `guards`) Gate-B let them through."""
+        mask = self.top_score > -np.inf
+        return mask & ~self.blocked if guards else mask
+
+    def correct(self, top_k: Optional[int] = None) -> np.ndarray:
+        """Answering is correct: the query is answerable and its gold document is in the top-k context."""
+        top_k = self.scores.shape[1] if top_k is None else top_k
+        return self.answerable & (self.gold_rank >= 0) & (self.gold_rank < top_k)
+
+    def save(self, path: str):
+        np.savez(path, **{f: getattr(self, f) for f in self._FIELDS})
+
+    @classmethod
+    def load(cls, path: str) -> "EvalScores":
+        with np.load(path) as data:
+            return cls(*(data[f] for f in cls._FIELDS))
+
+def score_eval_set(
+    retriever,
+    queries: List[str],
+    langs: List[str],
+    gold: Optional[Sequence[Optional[str]]] = None,
+    answerable: Optional[Sequence[bool]] = None,
+    top_k: int = TOP_K_SEARCH,
+    field: str = EVAL_GOLD_FIELD,
+    batch_size: int = 1024,
+) -> EvalScores:
+    """
+    Runs Gate-B and retrieval once over the eval set. Every query is
+    retrieved, blocked ones included, so sweeps can also score Gate-A on
+    its own. A query is answerable if it has a gold document unless
+    `answerable` says otherwise.
+    """
+    n = len(queries)
+    gold = [None] * n if gold is None else list(gold)
+    if answerable is None:
+        answerable = [g is not None and not pd.isna(g) and str(g) != "" for g in gold]
+    blocked = [is_blocked for is_blocked, _ in domain_guard.domain_guard_action_batch(queries)]
+
+    scores = np.full((n, top_k), -np.inf, dtype=np.float32)
+    gold_rank = np.full(n, -1, dtype=np.int64)
+    for start in range(0, n, batch_size):
+        end = min(start + batch_size, n)
+        s, g = retriever.search(queries[start:end], langs[start:end], top_k)
+        scores[start:end] = s
+        for i, hits in enumerate(retriever.materialize(s, g, with_text=False), start):
+            found = [j for j, hit in enumerate(hits) if hit[field] == gold[i] or gold[i] in hit.get(field + "s", ())]
+            if found:
+                gold_rank[i] = found[0]
+    return EvalScores(langs, scores, gold_rank, blocked, answerable)
+
+def risk_coverage(top_score: np.ndarray, eligible: np.ndarray, correct: np.ndarray,
+                  thresholds: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    (answered, coverage, risk) per threshold. A query is answered when it
+    is eligible and its top score is >= the threshold, as in Gate-A;
+    coverage is answered / all queries and risk is the wrong share of the
+    answered ones. One sort plus a searchsorted for all thresholds.
+    """
+    thresholds = np.asarray(thresholds, dtype=np.float64)
+    order = np.argsort(top_score[eligible], kind="stable")
+    ranked = top_score[eligible][order]
+    wrong = ~correct[eligible][order]
+    # Wrong answers among scores[i:] for every i
+    wrong_from = np.concatenate([np.cumsum(wrong[::-1])[::-1], [0]])
+    first = np.searchsorted(ranked, thresholds, side="left")
+    answered = len(ranked) - first
+    errors = wrong_from[first]
+    coverage = answered / max(len(top_score), 1)
+    risk = np.divide(errors, answered, out=np.zeros(len(thresholds)), where=answered > 0)
+    return answered, coverage, risk
+
+def aurc(top_score: np.ndarray, eligible: np.ndarray, correct: np.ndarray) -> float:
+    """
+    Area under the risk-coverage curve over every threshold Gate-A could
+    use, with coverage measured over all queries (queries never answered
+    add no area). Tied scores are answered together, so the points inside
+    a tie take the risk at its end.
+    """
+    n = len(top_score)
+    if not n:
+        return 0.0
+    order = np.argsort(-top_score[eligible], kind="stable")
+    ranked = top_score[eligible][order]
+    wrong = np.cumsum(~correct[eligible][order])
+    # Answered count once the threshold reaches each point's score
+    upto = np.searchsorted(-ranked, -ranked, side="right")
+    return float(np.sum(wrong[upto - 1] / upto) / n) if len(ranked) else 0.0
+
+def sweep_thresholds(spec: Tuple[float, float, float] = EVAL_SWEEP_THRESHOLDS) -> np.ndarray:
+    start, stop, step = spec
+    return np.round(np.arange(start, stop + step / 2, step), 6)
+
+def sweep(ev: EvalScores, thresholds: Optional[np.ndarray] = None, guards: bool = True,
+          top_k: Optional[int] = None) -> pd.DataFrame:
+    """
+    Coverage and risk of every threshold, overall ("all") and per language:
+    one row per (lang, threshold). `guards=False` scores Gate-A alone.
+    """
+    thresholds = sweep_thresholds() if thresholds is None else np.asarray(thresholds, dtype=np.float64)
+    eligible, correct = ev.eligible(guards), ev.correct(top_k)
+    frames = []
+    for lang in ["all"] + sorted(set(ev.langs.tolist())):
+        mask = np.ones(len(ev), dtype=bool) if lang == "all" else ev.langs == lang
+        answered, coverage, risk = risk_coverage(ev.top_score[mask], eligible[mask], correct[mask], thresholds)
+        frames.append(pd.DataFrame({
+            "lang": lang, "threshold": thresholds, "n": int(mask.sum()),
+            "answered": answered, "coverage": coverage, "risk": risk,
+        }))
+    return pd.concat(frames, ignore_index=True)
+
+def aurc_by_lang(ev: EvalScores, guards: bool = True, top_k: Optional[int] = None) -> Dict[str, float]:
+    eligible, correct = ev.eligible(guards), ev.correct(top_k)
+    out = {"all": aurc(ev.top_score, eligible, correct)}
+    for lang in sorted(set(ev.langs.tolist())):
+        mask = ev.langs == lang
+        out[lang] = aurc(ev.top_score[mask], eligible[mask], correct[mask])
+    return out
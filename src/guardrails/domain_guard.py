@@ -1,5 +1,6 @@
 import re
-from typing import Tuple, Optional
+from typing import List, Sequence, Tuple, Optional
+from src.guardrails.rule_engine import Rule, GuardRuleEngine
 
 # --- Guardrail Patterns ---
 INJECTION_PATTERNS = [
@@ -18,10 +19,45 @@ SECRET_NOUNS = [
     re.compile(r"\b(system\s+prompt)\b", re.I),
 ]
 
+REFUND_TERMS = [re.compile(re.escape("refund"), re.I)]
+REFUND_OUT_OF_WINDOW = [
+    re.compile(re.escape("last month"), re.I),
+    re.compile(re.escape("3 months"), re.I),
+]
+
+# --- Gate-B rule set (evaluated in order; first hit decides the reason) ---
+# Each pattern is paired with the literals any match must contain, which
+# the engine uses to prefilter the query in a single scan.
+GATE_B_RULES = [
+    # 1. Prompt Injection
+    Rule("injection", "BLOCKED_INJECTION", [[
+        (INJECTION_PATTERNS[0], ("ignore", "disregard", "override")),
+        (INJECTION_PATTERNS[1], ("system", "developer", "hidden")),
+        (INJECTION_PATTERNS[2], ("jailbreak", "dan mode")),
+    ]]),
+    # 2. Credential Disclosure: a secret noun together with a disclosure verb
+    Rule("credential_disclosure", "BLOCKED_CREDENTIAL_DISCLOSURE", [
+        [
+            (SECRET_NOUNS[0], ("password", "credential", "key", "token", "secret", "private")),
+            (SECRET_NOUNS[1], ("system",)),
+        ],
+        [
+            (DISCLOSE_VERBS[0], ("show", "give", "display", "reveal", "list")),
+            (DISCLOSE_VERBS[1], ("what", "where")),
+        ],
+    ]),
+    # 3. Policy Constraints: "refund" + "last month" / "3 months" > 7 days
+    Rule("refund_window", "BLOCKED_POLICY_REFUND_WINDOW", [
+        [(REFUND_TERMS[0], ("refund",))],
+        [(REFUND_OUT_OF_WINDOW[0], ("last month",)), (REFUND_OUT_OF_WINDOW[1], ("3 months",))],
+    ]),
+]
+
 class DomainGuard:
-    def __init__(self):
+    def __init__(self, rules: Optional[Sequence[Rule]] = None):
         self.injection_patterns = INJECTION_PATTERNS
         # Add others if needed based on paper details
+        self.engine = GuardRuleEngine(GATE_B_RULES if rules is None else rules)
 
     def check_injection(self, query: str) -> bool:
         for p in self.injection_patterns:
@@ -29,33 +65,18 @@ class DomainGuard:
                 return True
         return False
 
-    def domain_guard_action(self, query: str, refund_window_days: int = 7, refund_duplicate_only: bool = True) -> Tuple[bool, str]:
+    def domain_guard_action(self, query: str, refund_window_days: int = 7, refund_duplicate_only: bool = True,
+                            timed: bool = False) -> Tuple[bool, str]:
         """
         Gate-B: Deterministic Symbolic Guardrails.
-        Returns (is_blocked, reason).
+        Returns (is_blocked, reason). With `timed`, per-rule time is recorded in engine.stats().
         """
-        # 1. Prompt Injection
-        if self.check_injection(query):
-            return True, "BLOCKED_INJECTION"
-
-        # 2. Credential Disclosure (Heuristic reconstruction)
-        # Detailed logic implied from abstract: check patterns for secrets
-        for noun_re in SECRET_NOUNS:
-            if noun_re.search(query):
-                 for verb_re in DISCLOSE_VERBS:
-                     if verb_re.search(query):
-                         return True, "BLOCKED_CREDENTIAL_DISCLOSURE"
-        
-        # 3. Policy Constraints (simple keyword checks for demonstration)
-        # Example: "refund" + "last month" > 7 days
-        # This part requires more sophisticated parsing or the exact Colab logic.
-        # Implemented as a basic keyword check for now.
-        q_lower = query.lower()
-        if "refund" in q_lower:
-             if "last month" in q_lower or "3 months" in q_lower:
-                return True, "BLOCKED_POLICY_REFUND_WINDOW"
-
-        return False, ""
+        # All rules are evaluated by the compiled engine in one scan
+        return self.engine.evaluate(query, timed)
+
+    def domain_guard_action_batch(self, queries: Sequence[str], timed: bool = False) -> List[Tuple[bool, str]]:
+        """Gate-B over a batch; element i equals domain_guard_action(queries[i])."""
+        return self.engine.evaluate_batch(queries, timed)
 
 # Singleton instance
 domain_guard = DomainGuard()
@@ -0,0 +1,205 @@
+import re
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+# A pattern plus the lowercase literals that every match of it contains.
+# The literals feed the shared prefilter; an empty tuple means "always verify".
+KeywordPattern = Tuple["re.Pattern", Tuple[str, ...]]
+
+# Up to this many distinct keywords, the prefilter is one substring test per
+# keyword on the case-folded query; past it, one scan with the trie regex.
+_SUBSTRING_MAX_KEYWORDS = 128
+# casefold() leaves these apart from "i" although re.I matches them to it
+_FOLD_FIXES = {0x131: "i", 0x307: None}
+
+def _fold(text: str) -> str:
+    """Case-folds so that text re.I matches to a keyword contains the folded keyword."""
+    return text.casefold().translate(_FOLD_FIXES)
+
+def _trie_pattern(words: Sequence[str]) -> str:
+    """
+    Regex alternation shaped like a trie (shared prefixes factored out), so
+    the engine rejects most positions after one character instead of trying
+    every keyword. Longer continuations are tried before a word ends, which
+    keeps the longest keyword at each position.
+    """
+    trie: Dict = {}
+    for w in words:
+        node = trie
+        for ch in w:
+            node = node.setdefault(ch, {})
+        node[""] = {}
+
+    def emit(node: Dict) -> str:
+        alts = [re.escape(ch) + emit(child) for ch, child in sorted(node.items()) if ch]
+        if not alts:
+            return ""
+        if "" in node:
+            return "(?:" + "|".join(alts) + ")?"
+        return alts[0] if len(alts) == 1 else "(?:" + "|".join(alts) + ")"
+
+    return emit(trie)
+
+class Rule:
+    """
+    An auditable Gate-B rule. It fires when every clause in `all_of` has at
+    least one matching pattern, and then reports `code` as the reason.
+    """
+
+    def __init__(self, name: str, code: str, all_of: Sequence[Sequence[KeywordPattern]]):
+        self.name = name
+        self.code = code
+        self.all_of = [list(clause) for clause in all_of]
+
+class GuardRuleEngine:
+    """
+    Evaluates an ordered rule set with one scan of the query.
+
+    All rule keywords are compiled into a single case-insensitive,
+    trie-shaped alternation (wrapped in a lookahead so overlapping keywords
+    are all seen). Only patterns whose keyword occurs are then verified with their
+    full regex, so a benign query costs one pass no matter how many rules
+    there are. Small keyword sets (up to _SUBSTRING_MAX_KEYWORDS) skip the
+    regex and test each case-folded keyword as a substring instead, which is
+    cheaper than scanning every position. The first rule that fires, in
+    rule order, decides the reason code.
+
+    Per-rule hits and verifications are counted; scan and verify times only
+    for calls made with `timed=True` (the pipeline passes it when metrics
+    are on). Counts are merged under a lock once per call, so concurrent
+    callers never lose updates.
+    """
+
+    def __init__(self, rules: Iterable[Rule]):
+        self.rules: List[Rule] = list(rules)
+        self._patterns: List["re.Pattern"] = []
+        self._clauses: List[List[List[int]]] = []
+        self._always: set = set()
+        kw_pids: Dict[str, set] = {}
+
+        for rule in self.rules:
+            clauses = []
+            for clause in rule.all_of:
+                pids = []
+                for rx, keywords in clause:
+                    pid = len(self._patterns)
+                    self._patterns.append(rx)
+                    pids.append(pid)
+                    if not keywords:
+                        self._always.add(pid)
+                    for kw in keywords:
+                        kw_pids.setdefault(kw.lower(), set()).add(pid)
+                clauses.append(pids)
+            self._clauses.append(clauses)
+
+        # The prefilter captures the longest keyword at each position, so a
+        # match also implies every keyword it starts with.
+        keywords = sorted(kw_pids)
+        self._kw_pids = {
+            kw: set().union(*(pids for k, pids in kw_pids.items() if kw.startswith(k))) for kw in keywords
+        }
+        self._all_pids = set(range(len(self._patterns)))
+        self._prefilter = (
+            re.compile("(?=(" + _trie_pattern(keywords) + "))", re.I) if keywords else None
+        )
+        folded: Dict[str, set] = {}
+        for kw, pids in kw_pids.items():
+            folded.setdefault(_fold(kw), set()).update(pids)
+        self._substrings = list(folded.items()) if len(folded) <= _SUBSTRING_MAX_KEYWORDS else None
+        self._lock = threading.Lock()
+        self.reset_stats()
+
+    def reset_stats(self):
+        with self._lock:
+            self.queries = 0
+            self.scan_time_s = 0.0
+            self.hits = {r.name: 0 for r in self.rules}
+            self.verifications = {r.name: 0 for r in self.rules}
+            self.verify_time_s = {r.name: 0.0 for r in self.rules}
+
+    def _candidates(self, query: str) -> set:
+        found = set(self._always)
+        if self._substrings is not None:
+            folded = _fold(query)
+            for kw, pids in self._substrings:
+                if kw in folded:
+                    found |= pids
+        elif self._prefilter is not None:
+            for m in self._prefilter.finditer(query):
+                # Unmapped case-folds (rare Unicode) fall back to verifying everything
+                found |= self._kw_pids.get(m.group(1).lower(), self._all_pids)
+        return found
+
+    def _fires(self, query: str, clauses: List[List[int]], found: set, matched: Dict[int, bool]) -> bool:
+        for clause in clauses:
+            for pid in clause:
+                if pid not in found:
+                    continue
+                if pid not in matched:
+                    matched[pid] = self._patterns[pid].search(query) is not None
+                if matched[pid]:
+                    break
+            else:
+                return False
+        return True
+
+    def evaluate(self, query: str, timed: bool = False) -> Tuple[bool, str]:
+        """Returns (is_blocked, reason_code) for one query."""
+        return self.evaluate_batch([query], timed)[0]
+
+    def evaluate_batch(self, queries: Sequence[str], timed: bool = False) -> List[Tuple[bool, str]]:
+        out: List[Tuple[bool, str]] = []
+        # Counts are gathered per call (by rule position) and merged once
+        verified: Dict[int, int] = {}
+        fired: Dict[int, int] = {}
+        verify_s: Dict[int, float] = {}
+        scan_s = 0.0
+        for query in queries:
+            t0 = time.perf_counter() if timed else 0.0
+            found = self._candidates(query)
+            if timed:
+                scan_s += time.perf_counter() - t0
+            decision = (False, "")
+            matched: Dict[int, bool] = {}
+            for r, clauses in enumerate(self._clauses if found else ()):
+                # Skip without verifying unless every clause has a candidate
+                if not all(any(pid in found for pid in clause) for clause in clauses):
+                    continue
+                t0 = time.perf_counter() if timed else 0.0
+                hit = self._fires(query, clauses, found, matched)
+                verified[r] = verified.get(r, 0) + 1
+                if timed:
+                    verify_s[r] = verify_s.get(r, 0.0) + time.perf_counter() - t0
+                if hit:
+                    fired[r] = fired.get(r, 0) + 1
+                    decision = (True, self.rules[r].code)
+                    break
+            out.append(decision)
+
+        with self._lock:
+            self.queries += len(queries)
+            self.scan_time_s += scan_s
+            for r, n in verified.items():
+                self.verifications[self.rules[r].name] += n
+            for r, n in fired.items():
+                self.hits[self.rules[r].name] += n
+            for r, seconds in verify_s.items():
+                self.verify_time_s[self.rules[r].name] += seconds
+        return out
+
+    def stats(self, rule: Optional[str] = None) -> Dict:
+        with self._lock:
+            per_rule = {
+                r.name: {
+                    "code": r.code,
+                    "hits": self.hits[r.name],
+                    "verifications": self.verifications[r.name],
+                    "verify_time_s": self.verify_time_s[r.name],
+                }
+                for r in self.rules
+            }
+            queries, scan_time_s = self.queries, self.scan_time_s
+        if rule is not None:
+            return per_rule[rule]
+        return {"queries": queries, "scan_time_s": scan_time_s, "rules": per_rule}
@@ -0,0 +1,166 @@
+import json
+import os
+import uuid
+from typing import Any, Dict, Iterator, Optional, Tuple
+import numpy as np
+import pyarrow as pa
+import pyarrow.ipc as ipc
+from src.config.settings import CHUNK_STORE_PATH
+
+# Column order of the chunk store; "vector" is a fixed-size list<float32>.
+STORE_COLUMNS = ["chunk_id", "doc_id", "base_id", "lang", "region", "prechunk_id", "chunk_hash", "deleted", "chunk_text"]
+STORE_SCHEMA = pa.schema([
+    ("chunk_id", pa.string()),
+    ("doc_id", pa.string()),
+    ("base_id", pa.string()),
+    ("lang", pa.string()),
+    ("region", pa.string()),
+    ("prechunk_id", pa.int64()),
+    ("chunk_hash", pa.string()),
+    ("deleted", pa.bool_()),
+    ("chunk_text", pa.string()),
+])
+# Optional columns of stores built with near-duplicate elimination: the other
+# documents a stored chunk stands in for
+ALIAS_COLUMNS = ["dup_doc_ids", "dup_base_ids"]
+ALIAS_SCHEMA = pa.schema([(c, pa.list_(pa.string())) for c in ALIAS_COLUMNS])
+_MANIFEST_KEY = b"singai.manifest"
+
+def chunk_ids(hashes, seen: Optional[Dict[str, int]] = None) -> list:
+    """
+    Stable chunk IDs derived from content hashes. The n-th repeat of an
+    identical chunk (same doc, lang, region and text) gets a ".n" suffix.
+    Pass the same `seen` dict across batches of one build.
+    """
+    seen = {} if seen is None else seen
+    ids = []
+    for h in hashes:
+        n = seen.get(h, 0)
+        seen[h] = n + 1
+        ids.append(h[:20] if n == 0 else f"{h[:20]}.{n}")
+    return ids
+
+class ChunkStoreWriter:
+    """
+    Appends (metadata, vectors) batches to a chunk store, so metadata, text
+    and vectors share one Arrow IPC file and their row alignment cannot
+    drift. The manifest goes in the schema metadata, plus a fresh
+    "build_id": two writes never share one, even with the same version
+    and row count, so anything derived from a store (index snapshots,
+    cached decisions) can tell them apart. Data is written to
+    `<path>.tmp` and only replaces `path` on a clean close. With `aliases`,
+    ALIAS_COLUMNS are stored too (empty lists where `meta` lacks them).
+    """
+
+    def __init__(self, path: str, manifest: Dict[str, Any], aliases: bool = False):
+        self.path = path
+        self.manifest = dict(manifest, build_id=uuid.uuid4().hex)
+        self.columns = STORE_COLUMNS + (ALIAS_COLUMNS if aliases else [])
+        self._meta_schema = pa.unify_schemas([STORE_SCHEMA, ALIAS_SCHEMA]) if aliases else STORE_SCHEMA
+        self.rows = 0
+        self._sink = None
+        self._writer = None
+        self._schema = None
+
+    def _open(self, dim: int):
+        self.manifest["dim"] = int(dim)
+        schema = self._meta_schema.append(pa.field("vector", pa.list_(pa.float32(), dim)))
+        self._schema = schema.with_metadata({_MANIFEST_KEY: json.dumps(self.manifest).encode("utf-8")})
+        self._sink = pa.OSFile(self.path + ".tmp", "wb")
+        self._writer = ipc.new_file(self._sink, self._schema)
+
+    def write(self, meta, vecs: np.ndarray):
+        """`meta` is a DataFrame or Arrow table/batch with STORE_COLUMNS (and optionally ALIAS_COLUMNS)."""
+        is_arrow = isinstance(meta, (pa.Table, pa.RecordBatch))
+        n = meta.num_rows if is_arrow else len(meta)
+        if n == 0:
+            return
+        vecs = np.ascontiguousarray(vecs, dtype=np.float32).reshape(n, -1)
+        if self._writer is None:
+            self._open(vecs.shape[1])
+        names = meta.schema.names if is_arrow else list(meta.columns)
+        if not is_arrow:
+            present = [c for c in self.columns if c in names]
+            fields = [self._meta_schema.field(c) for c in present]
+            meta = pa.Table.from_pandas(meta[present], schema=pa.schema(fields), preserve_index=False)
+        empty = pa.array([[]] * n, pa.list_(pa.string()))
+        arrays = [empty if c in ALIAS_COLUMNS and c not in names else meta.column(c) for c in self.columns]
+        arrays.append(pa.FixedSizeListArray.from_arrays(pa.array(vecs.reshape(-1)), vecs.shape[1]))
+        self._writer.write_table(pa.Table.from_arrays(arrays, schema=self._schema))
+        self.rows += n
+
+    def close(self, commit: bool = True):
+        if self._writer is None:
+            # Nothing written: still produce a valid (empty) store on commit
+            if not commit:
+                return
+            self._open(self.manifest.get("dim", 0))
+        self._writer.close()
+        self._sink.close()
+        self._writer = None
+        if commit:
+            os.replace(self.path + ".tmp", self.path)
+        else:
+            os.remove(self.path + ".tmp")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close(commit=exc_type is None)
+
+def write_chunk_store(meta_df, vecs: np.ndarray, manifest: Dict[str, Any], path: str = CHUNK_STORE_PATH):
+    """Writes a whole chunk store in one go (see ChunkStoreWriter)."""
+    with ChunkStoreWriter(path, manifest) as writer:
+        writer.write(meta_df, vecs)
+
+def read_manifest(path: str = CHUNK_STORE_PATH) -> Optional[Dict[str, Any]]:
+    if not os.path.exists(path):
+        return None
+    with pa.memory_map(path, "r") as source:
+        meta = ipc.open_file(source).schema.metadata or {}
+    return json.loads(meta[_MANIFEST_KEY]) if _MANIFEST_KEY in meta else None
+
+def split_vectors(batch) -> Tuple[Any, np.ndarray]:
+    """(metadata without vectors, [rows, dim] float32 vectors) of a store batch or table."""
+    vec_col = batch.column(batch.schema.get_field_index("vector"))
+    if isinstance(vec_col, pa.ChunkedArray):
+        vec_col = vec_col.chunk(0) if vec_col.num_chunks == 1 else vec_col.combine_chunks()
+    dim = batch.schema.field("vector").type.list_size
+    vecs = vec_col.flatten().to_numpy(zero_copy_only=False).reshape(-1, dim)
+    return batch.drop_columns(["vector"]), vecs
+
+def iter_chunk_store(path: str = CHUNK_STORE_PATH) -> Iterator[Tuple[pa.RecordBatch, np.ndarray]]:
+    """Streams (metadata batch, vectors) from a memory-mapped store."""
+    with pa.memory_map(path, "r") as source:
+        reader = ipc.open_file(source)
+        for i in range(reader.num_record_batches):
+            yield split_vectors(reader.get_batch(i))
+
+def open_chunk_store(path: str = CHUNK_STORE_PATH) -> Tuple[pa.Table, Dict[str, Any]]:
+    """
+    Memory-maps the store without touching any column: returns (table
+    including the vector column, manifest). Pages are read on first access.
+    """
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"Chunk store {path} not found. Run ingestion first.")
+    source = pa.memory_map(path, "r")
+    table = ipc.open_file(source).read_all()
+    manifest = json.loads((table.schema.metadata or {}).get(_MANIFEST_KEY, b"{}"))
+    return table, manifest
+
+def take_vectors(table: pa.Table, rows: np.ndarray) -> np.ndarray:
+    """[len(rows), dim] float32 vectors of the given rows of an opened store."""
+    picked = table.column("vector").take(pa.array(rows, type=pa.int64()))
+    dim = table.schema.field("vector").type.list_size
+    return picked.combine_chunks().flatten().to_numpy(zero_copy_only=False).reshape(-1, dim)
+
+def read_chunk_store(path: str = CHUNK_STORE_PATH) -> Tuple[pa.Table, np.ndarray, Dict[str, Any]]:
+    """
+    Memory-maps the store. Returns (metadata table without vectors,
+    [rows, dim] float32 vectors, manifest). Vectors are a zero-copy view of
+    the mapped file when it holds a single record batch.
+    """
+    table, manifest = open_chunk_store(path)
+    meta, vecs = split_vectors(table)
+    return meta, vecs, manifest
@@ -0,0 +1,116 @@
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import List, Optional, Sequence
+import pyarrow as pa
+from src.config.settings import CHUNK_SPEC_BY_LANG, DEFAULT_SPEC, _SENT_SPLIT, CHUNK_WORKERS, CHUNK_BATCH_DOCS
+
+# Columns emitted by the chunker, in order
+CHUNK_SCHEMA = pa.schema([
+    ("doc_id", pa.string()),
+    ("base_id", pa.string()),
+    ("lang", pa.string()),
+    ("region", pa.string()),
+    ("prechunk_id", pa.int64()),
+    ("chunk_text", pa.string()),
+])
+
+def _sentences(text: str, lang: str) -> List[str]:
+    text = (text or "").strip()
+    if not text:
+        return []
+    rx = _SENT_SPLIT.get(lang, _SENT_SPLIT["default"])
+    parts = [p.strip() for p in rx.split(text) if p and p.strip()]
+    return parts if parts else [text]
+
+def _lang_chunk(text: str, lang: str) -> List[str]:
+    spec = CHUNK_SPEC_BY_LANG.get(lang, DEFAULT_SPEC)
+    max_chars = spec["max_chars"]
+    overlap = spec["overlap_chars"]
+
+    sents = _sentences(text, lang)
+    if not sents:
+        return []
+
+    # Sentences are collected in a list and joined once per chunk; cur_len
+    # tracks the length " ".join(parts) would have.
+    chunks_out = []
+    parts: List[str] = []
+    cur_len = 0
+    for s in sents:
+        if cur_len + len(s) + 1 <= max_chars:
+            cur_len += len(s) + (1 if parts else 0)
+            parts.append(s)
+        else:
+            if parts:
+                chunks_out.append(" ".join(parts))
+            parts = [s]
+            cur_len = len(s)
+    if parts:
+        chunks_out.append(" ".join(parts))
+
+    # Apply overlap
+    if overlap > 0 and len(chunks_out) > 1:
+        overlapped = [chunks_out[0]]
+        for i in range(1, len(chunks_out)):
+            prev = overlapped[-1]
+            tail = prev[-overlap:] if len(prev) > overlap else prev
+            overlapped.append((tail + " " + chunks_out[i]).strip())
+        chunks_out = overlapped
+
+    return chunks_out
+
+def _field(v) -> str:
+    # Same coercion the row-wise loader applied: None/"" -> "", anything else str()
+    return str(v or "")
+
+def _chunk_batch(doc_ids: Sequence, base_ids: Sequence, langs: Sequence, regions: Sequence, texts: Sequence) -> pa.RecordBatch:
+    out_doc, out_base, out_lang, out_region, out_j, out_text = [], [], [], [], [], []
+    for doc_id, base_id, lang, region, text in zip(doc_ids, base_ids, langs, regions, texts):
+        lang = _field(lang)
+        chunks = _lang_chunk(_field(text).strip(), lang)
+        n = len(chunks)
+        if not n:
+            continue
+        out_doc.extend([_field(doc_id)] * n)
+        out_base.extend([_field(base_id)] * n)
+        out_lang.extend([lang] * n)
+        out_region.extend([_field(region)] * n)
+        out_j.extend(range(n))
+        out_text.extend(chunks)
+    return pa.RecordBatch.from_arrays(
+        [pa.array(out_doc, pa.string()), pa.array(out_base, pa.string()), pa.array(out_lang, pa.string()),
+         pa.array(out_region, pa.string()), pa.array(out_j, pa.int64()), pa.array(out_text, pa.string())],
+        schema=CHUNK_SCHEMA,
+    )
+
+def _column(table: pa.Table, name: str, n: int) -> list:
+    return table.column(name).to_pylist() if name in table.column_names else [""] * n
+
+def chunk_pool(workers: Optional[int] = CHUNK_WORKERS) -> Optional[Executor]:
+    """A process pool for chunk_table(), or None when chunking stays in-process."""
+    return ProcessPoolExecutor(max_workers=workers) if workers and workers > 1 else None
+
+def chunk_table(kb, workers: Optional[int] = CHUNK_WORKERS, batch_docs: int = CHUNK_BATCH_DOCS,
+                pool: Optional[Executor] = None) -> pa.Table:
+    """
+    Chunks a KB (pandas DataFrame or Arrow table with doc_id, base_id, lang,
+    region and kb_text) into an Arrow table with CHUNK_SCHEMA. Document
+    batches are spread over a process pool when `workers` > 1; output order
+    and chunk text are identical to chunking the rows one by one. Callers
+    chunking many KB batches pass one long-lived `pool` (see chunk_pool())
+    instead of paying pool startup on every call.
+    """
+    table = kb if isinstance(kb, pa.Table) else pa.Table.from_pandas(kb, preserve_index=False)
+    n = table.num_rows
+    cols = [_column(table, c, n) for c in ("doc_id", "base_id", "lang", "region", "kb_text")]
+    spans = [(i, min(i + batch_docs, n)) for i in range(0, n, batch_docs)]
+    args = [[c[a:b] for c in cols] for a, b in spans]
+
+    if len(spans) <= 1 or (pool is None and (not workers or workers <= 1)):
+        batches = [_chunk_batch(*a) for a in args]
+    elif pool is not None:
+        batches = list(pool.map(_chunk_batch, *zip(*args)))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as own_pool:
+            batches = list(own_pool.map(_chunk_batch, *zip(*args)))
+
+    return pa.Table.from_batches(batches, schema=CHUNK_SCHEMA)
@@ -0,0 +1,139 @@
+import zlib
+from functools import lru_cache
+from typing import Dict, FrozenSet, List, Sequence, Tuple
+import numpy as np
+from src.config.settings import DEDUP_NUM_PERM, DEDUP_BANDS, DEDUP_SHINGLE, LANG_SCOPE_MAP
+from src.retrieval.lexical import tokenize
+
+# Shingle hashes per numpy pass, bounding the [num_perm, shingles] temporary
+_MAX_SHINGLES = 32768
+_MIX = np.uint64(0x9E3779B97F4A7C15)
+
+def _shingle_hashes(texts: Sequence[str], langs: Sequence[str], k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    (uint64 hashes of every k-token shingle, shingles per text). A text of
+    fewer than k tokens is one shingle; one without tokens has none.
+    Tokens are hashed with CRC32, so hashes are the same in every process
+    and build.
+    """
+    crc: Dict[str, int] = {}
+    tokens = [tokenize(t, l) for t, l in zip(texts, langs)]
+    lens = np.array([len(t) for t in tokens], dtype=np.int64)
+    flat = np.fromiter((crc[w] if w in crc else crc.setdefault(w, zlib.crc32(w.encode("utf-8")))
+                        for t in tokens for w in t), dtype=np.uint64, count=int(lens.sum()))
+    pos = np.arange(len(flat))
+    end = np.repeat(np.cumsum(lens), lens)
+    h = np.zeros(len(flat), dtype=np.uint64)
+    for j in range(k):
+        nxt = np.minimum(pos + j, max(len(flat) - 1, 0))
+        h = h * _MIX + np.where(pos + j < end, flat[nxt], np.uint64(0))
+    # Shingles start wherever k tokens remain, plus at the start of texts shorter than k
+    first = np.repeat(np.cumsum(lens) - lens, lens)
+    keep = (pos + k <= end) | ((pos == first) & (end - first < k))
+    return h[keep], np.maximum(lens - k + 1, (lens > 0).astype(np.int64))
+
+def minhash_signatures(texts: Sequence[str], langs: Sequence[str], num_perm: int = DEDUP_NUM_PERM,
+                       shingle: int = DEDUP_SHINGLE, seed: int = 1) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    ([n, num_perm] uint32 MinHash signatures, [n] bool "has tokens"). Rows
+    without tokens are left at the maximum and must not be compared. The
+    permutations are multiply-add-shift hashes of the shingle hash folded
+    to 32 bits.
+    """
+    rng = np.random.RandomState(seed)
+    a = rng.randint(0, 2**63, size=(num_perm, 1), dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+    b = rng.randint(0, 2**63, size=(num_perm, 1), dtype=np.uint64)
+    hashes, counts = _shingle_hashes(texts, langs, shingle)
+    hashes = (hashes ^ (hashes >> np.uint64(32))) & np.uint64(0xFFFFFFFF)
+    sigs = np.full((len(texts), num_perm), np.iinfo(np.uint32).max, dtype=np.uint32)
+    has_tokens = counts > 0
+
+    # Rows are hashed in groups; within a group each row's minimum comes from one reduceat
+    rows = np.flatnonzero(has_tokens)
+    bounds = np.concatenate([[0], np.cumsum(counts)])
+    start = 0
+    while start < len(rows):
+        end = start + 1
+        while end < len(rows) and bounds[rows[end] + 1] - bounds[rows[start]] <= _MAX_SHINGLES:
+            end += 1
+        group = rows[start:end]
+        x = hashes[bounds[group[0]]:bounds[group[-1] + 1]]
+        hx = (a * x[None, :] + b) >> np.uint64(32)
+        sigs[group] = np.minimum.reduceat(hx, bounds[group] - bounds[group[0]], axis=1).T.astype(np.uint32)
+        start = end
+    return sigs, has_tokens
+
+@lru_cache(maxsize=None)
+def _searched_by(lang: str) -> FrozenSet[str]:
+    """Query languages whose search scope includes partitions of `lang` ("*": any unmapped language)."""
+    langs = {lang} | {q for q, scope in LANG_SCOPE_MAP.items() if lang in scope}
+    if lang == "en":
+        # Query languages without partitions of their own fall back to the English scope
+        langs.add("*")
+    return frozenset(langs)
+
+def can_represent(owner_lang: str, owner_region: str, lang: str, region: str) -> bool:
+    """
+    Whether a chunk of (owner_lang, owner_region) can stand in for one of
+    (lang, region): every query that could retrieve the latter also
+    searches the former, including searches kept to the latter's region.
+    """
+    if owner_region not in (region, ""):
+        return False
+    return _searched_by(lang) <= _searched_by(owner_lang)
+
+
+class NearDuplicateIndex:
+    """
+    Streaming near-duplicate detection over a build's chunks. Chunks are
+    numbered in the order they are added; add() returns, per chunk, the
+    number of its owner: the earlier chunk it duplicates (estimated
+    Jaccard >= threshold, and can_represent() it), or itself. Only owners
+    are indexed, so every duplicate points straight at a stored chunk.
+
+    Candidates come from LSH over `bands` bands of the signature. Within a
+    batch, chunks searched by more query languages are placed first, so an
+    "en" chunk owns its "en_sg" copy rather than the other way round.
+    """
+
+    def __init__(self, threshold: float, num_perm: int = DEDUP_NUM_PERM, bands: int = DEDUP_BANDS,
+                 shingle: int = DEDUP_SHINGLE):
+        if not 0.0 < threshold <= 1.0:
+            raise ValueError(f"Near-duplicate threshold must be in (0, 1], got {threshold}")
+        if num_perm % bands:
+            raise ValueError(f"DEDUP_NUM_PERM ({num_perm}) must be a multiple of DEDUP_BANDS ({bands})")
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.shingle = shingle
+        self.rows = num_perm // bands
+        self.n = 0
+        self._buckets: List[Dict[bytes, List[int]]] = [{} for _ in range(bands)]
+        self._owners: Dict[int, Tuple[np.ndarray, str, str]] = {}
+
+    def add(self, texts: Sequence[str], langs: Sequence[str], regions: Sequence[str]) -> np.ndarray:
+        sigs, has_tokens = minhash_signatures(texts, langs, self.num_perm, self.shingle)
+        base = self.n
+        owner = np.arange(base, base + len(texts), dtype=np.int64)
+        order = sorted(range(len(texts)), key=lambda i: -len(_searched_by(langs[i])))
+        for i in order:
+            if not has_tokens[i]:
+                continue
+            sig = sigs[i]
+            keys = [sig[band * self.rows:(band + 1) * self.rows].tobytes() for band in range(len(self._buckets))]
+            candidates = {c for band, key in enumerate(keys) for c in self._buckets[band].get(key, ())}
+            # Most similar eligible owner; the earliest one on ties
+            best, best_sim = -1, 0.0
+            for c in sorted(candidates):
+                c_sig, c_lang, c_region = self._owners[c]
+                sim = float(np.count_nonzero(c_sig == sig)) / self.num_perm
+                if sim < self.threshold or sim <= best_sim or not can_represent(c_lang, c_region, langs[i], regions[i]):
+                    continue
+                best, best_sim = c, sim
+            if best >= 0:
+                owner[i] = best
+                continue
+            self._owners[base + i] = (sig, langs[i], regions[i])
+            for band, key in enumerate(keys):
+                self._buckets[band].setdefault(key, []).append(base + i)
+        self.n += len(texts)
+        return owner
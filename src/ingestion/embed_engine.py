@@ -0,0 +1,160 @@
+import hashlib
+import os
+import random
+import shutil
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait
+from typing import List, Optional
+import numpy as np
+from tqdm.auto import tqdm
+from src.config.settings import (
+    EMBED_MODEL, EMBED_BASE_URL, EMBED_BATCH_SIZE, EMBED_MAX_IN_FLIGHT, EMBED_TPM_LIMIT,
+    EMBED_MAX_RETRIES, EMBED_BACKOFF_S, EMBED_CHECKPOINT_DIR,
+)
+
+# Client errors that will not succeed on retry
+_NON_RETRYABLE_STATUS = {400, 401, 403, 404, 422}
+
+def estimate_tokens(text: str) -> int:
+    """Conservative token estimate (~3 UTF-8 bytes per token) used for TPM pacing."""
+    return max(1, len(text.encode("utf-8")) // 3)
+
+class TokenBucket:
+    """Thread-safe token bucket refilled continuously at `tokens_per_minute`."""
+
+    def __init__(self, tokens_per_minute: int):
+        self.capacity = float(tokens_per_minute)
+        self.rate = tokens_per_minute / 60.0
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self, n: int):
+        n = min(float(n), self.capacity)
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= n:
+                    self.tokens -= n
+                    return
+                wait_s = (n - self.tokens) / self.rate
+            time.sleep(wait_s)
+
+class EmbeddingEngine:
+    """
+    Concurrent embedding for ingestion.
+
+    Batches are sent from a thread pool with at most `max_in_flight` requests
+    outstanding, paced by a tokens-per-minute bucket, and retried with
+    exponential backoff plus jitter. Each completed batch is written to
+    `checkpoint_dir` under a fingerprint of (model, texts), so re-running the
+    same job after a crash only embeds the batches that are still missing.
+
+    `client` is anything exposing `embeddings.create(model=..., input=...)`
+    (the OpenAI client by default), so a stub client or a local fake server
+    via `base_url` can stand in for offline runs.
+    """
+
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        client=None,
+        model: str = EMBED_MODEL,
+        base_url: Optional[str] = EMBED_BASE_URL,
+        batch_size: int = EMBED_BATCH_SIZE,
+        max_in_flight: int = EMBED_MAX_IN_FLIGHT,
+        tpm_limit: int = EMBED_TPM_LIMIT,
+        max_retries: int = EMBED_MAX_RETRIES,
+        backoff_s: float = EMBED_BACKOFF_S,
+        checkpoint_dir: Optional[str] = EMBED_CHECKPOINT_DIR,
+        keep_checkpoints: bool = False,
+    ):
+        if client is None:
+            from openai import OpenAI
+            client = OpenAI(api_key=api_key, base_url=base_url)
+        self.client = client
+        self.model = model
+        self.batch_size = batch_size
+        self.max_in_flight = max_in_flight
+        self.bucket = TokenBucket(tpm_limit)
+        self.max_retries = max_retries
+        self.backoff_s = backoff_s
+        self.checkpoint_dir = checkpoint_dir
+        self.keep_checkpoints = keep_checkpoints
+
+    def _fingerprint(self, texts: List[str]) -> str:
+        h = hashlib.sha1(self.model.encode("utf-8"))
+        h.update(str(self.batch_size).encode("utf-8"))
+        for t in texts:
+            h.update(b"\x00" + t.encode("utf-8"))
+        return h.hexdigest()[:16]
+
+    def _embed_batch(self, batch: List[str]) -> np.ndarray:
+        self.bucket.acquire(sum(estimate_tokens(t) for t in batch))
+        for attempt in range(self.max_retries + 1):
+            try:
+                resp = self.client.embeddings.create(model=self.model, input=batch)
+                X = np.array([d.embedding for d in resp.data], dtype=np.float32)
+                # Normalize
+                X /= (np.linalg.norm(X, axis=1, keepdims=True) + 1e-12)
+                return X
+            except Exception as e:
+                if getattr(e, "status_code", None) in _NON_RETRYABLE_STATUS or attempt == self.max_retries:
+                    raise
+                delay = self.backoff_s * (2 ** attempt) * (1 + random.random())
+                print(f"Embedding batch failed ({e}); retry {attempt + 1}/{self.max_retries} in {delay:.1f}s")
+                time.sleep(delay)
+
+    @staticmethod
+    def _save_atomic(path: str, X: np.ndarray):
+        tmp = path + ".tmp.npy"
+        np.save(tmp, X)
+        os.replace(tmp, path)
+
+    def embed(self, texts) -> np.ndarray:
+        texts = [str(x) for x in texts]
+        if not texts:
+            return np.array([], dtype=np.float32)
+
+        starts = list(range(0, len(texts), self.batch_size))
+        done = {}
+        ckpt = None
+        if self.checkpoint_dir:
+            ckpt = os.path.join(self.checkpoint_dir, self._fingerprint(texts))
+            os.makedirs(ckpt, exist_ok=True)
+            for b, start in enumerate(starts):
+                path = os.path.join(ckpt, f"{b:06d}.npy")
+                if os.path.exists(path):
+                    done[b] = np.load(path)
+            if done:
+                print(f"Resuming from checkpoint: {len(done)}/{len(starts)} batches already embedded.")
+
+        todo = [b for b in range(len(starts)) if b not in done]
+        with ThreadPoolExecutor(max_workers=self.max_in_flight) as pool, \
+                tqdm(total=len(starts), initial=len(done), desc="Embedding") as bar:
+            futures = {pool.submit(self._embed_batch, texts[starts[b]:starts[b] + self.batch_size]): b for b in todo}
+            try:
+                for fut in as_completed(futures):
+                    b = futures[fut]
+                    X = fut.result()
+                    if ckpt:
+                        self._save_atomic(os.path.join(ckpt, f"{b:06d}.npy"), X)
+                    done[b] = X
+                    bar.update(1)
+            except Exception:
+                # Stop scheduling new work but keep what is already in flight
+                for f in futures:
+                    f.cancel()
+                wait(futures)
+                for f, b in futures.items():
+                    if ckpt and f.done() and not f.cancelled() and f.exception() is None and b not in done:
+                        self._save_atomic(os.path.join(ckpt, f"{b:06d}.npy"), f.result())
+                raise
+
+        if ckpt and not self.keep_checkpoints:
+            shutil.rmtree(ckpt, ignore_errors=True)
+
+        return np.vstack([done[b] for b in range(len(starts))])
@@ -1,148 +1,344 @@
+import hashlib
 import os
 import re
+import shutil
+import numpy as np
 import pandas as pd
-from typing import List, Dict
-from src.config.settings import CHUNK_SPEC_BY_LANG, DEFAULT_SPEC, _SENT_SPLIT, INDEX_PATH, META_PATH
-from src.ingestion.loader import load_kb_data
-from phoenix_ai.vector_embedding_pipeline import VectorEmbedding
-from phoenix_ai.utils import GenAIEmbeddingClient
-
-def _sentences(text: str, lang: str) -> List[str]:
-    text = (text or "").strip()
-    if not text:
-        return []
-    rx = _SENT_SPLIT.get(lang, _SENT_SPLIT["default"])
-    parts = [p.strip() for p in rx.split(text) if p and p.strip()]
-    return parts if parts else [text]
-
-def _lang_chunk(text: str, lang: str) -> List[str]:
-    spec = CHUNK_SPEC_BY_LANG.get(lang, DEFAULT_SPEC)
-    max_chars = spec["max_chars"]
-    overlap = spec["overlap_chars"]
-
-    sents = _sentences(text, lang)
-    if not sents:
-        return []
-
-    chunks_out = []
-    cur = ""
-    for s in sents:
-        if len(cur) + len(s) + 1 <= max_chars:
-            cur = (cur + " " + s).strip()
-        else:
-            if cur:
-                chunks_out.append(cur)
-            cur = s
-    if cur:
-        chunks_out.append(cur)
-
-    # Apply overlap
-    if overlap > 0 and len(chunks_out) > 1:
-        overlapped = [chunks_out[0]]
-        for i in range(1, len(chunks_out)):
-            prev = overlapped[-1]
-            tail = prev[-overlap:] if len(prev) > overlap else prev
-            overlapped.append((tail + " " + chunks_out[i]).strip())
-        chunks_out = overlapped
-
-    return chunks_out
-
-def build_index(api_key: str):
-    if os.path.exists(INDEX_PATH) and os.path.exists(META_PATH):
-        print(f"Index found at {INDEX_PATH}, skipping build.")
-        return
+from typing import Dict, Iterator, List, Optional, Tuple
+from src.config.settings import (
+    CHUNK_STORE_PATH, INDEX_COMPACT_RATIO, KB_STREAM_BATCH_ROWS, INDEX_TYPE, VECTOR_STORAGE, VECTOR_DIM,
+    INDEX_SNAPSHOT_DIR, SHARD_BY, DEDUP_THRESHOLD, EMBED_CHECKPOINT_DIR,
+)
+from src.ingestion.loader import load_kb_data, iter_kb_batches
+from src.ingestion.chunking import chunk_pool, chunk_table
+from src.ingestion.chunk_store import (
+    ALIAS_COLUMNS, ChunkStoreWriter, chunk_ids, iter_chunk_store, read_manifest, open_chunk_store, take_vectors,
+)
+from src.ingestion.dedup import NearDuplicateIndex
+from src.retrieval.embedders import Embedder, get_embedder, check_store_signature
+from src.retrieval.partitions import partition_rows, build_partition, snapshot_config, write_snapshot
+
+def chunk_hash(doc_id: str, lang: str, region: str, text: str) -> str:
+    """Content hash deciding whether a chunk needs (re-)embedding."""
+    return hashlib.sha1("\x1f".join([doc_id, lang, region, text]).encode("utf-8")).hexdigest()
+
+def _previous_live_rows(embedder: Embedder) -> Tuple[Dict[str, int], int]:
+    """
+    chunk_id -> row for the live rows of a store built with the same
+    embedder, plus its total row count. Only the ID columns are read.
+    """
+    manifest = read_manifest(CHUNK_STORE_PATH)
+    if manifest is None:
+        return {}, 0
+    try:
+        check_store_signature(manifest, embedder)
+    except ValueError as e:
+        print(f"{e} Rebuilding from scratch.")
+        return {}, 0
+    live, row = {}, 0
+    for meta, _ in iter_chunk_store(CHUNK_STORE_PATH):
+        for cid, dead in zip(meta.column("chunk_id").to_pylist(), meta.column("deleted").to_pylist()):
+            if not dead:
+                live[cid] = row
+            row += 1
+    return live, row
+
+def _drop_near_duplicates(cur_df: pd.DataFrame, dedup: NearDuplicateIndex, stream_ids: List[str],
+                          aliases: Dict[str, Tuple[List[str], List[str]]], removed: Dict[str, int]) -> pd.DataFrame:
+    """Drops chunks duplicating an earlier chunk of this build and records their documents on that chunk."""
+    base = len(stream_ids)
+    owners = dedup.add(cur_df["chunk_text"].tolist(), cur_df["lang"].tolist(), cur_df["region"].tolist())
+    stream_ids.extend(cur_df["chunk_id"])
+    dup = owners != np.arange(base, base + len(cur_df))
+    for owner, doc_id, base_id, lang in zip(owners[dup], cur_df["doc_id"][dup], cur_df["base_id"][dup],
+                                            cur_df["lang"][dup]):
+        doc_ids, base_ids = aliases.setdefault(stream_ids[owner], ([], []))
+        doc_ids.append(doc_id)
+        base_ids.append(base_id)
+        removed[lang] = removed.get(lang, 0) + 1
+    return cur_df[~dup]
+
+def _with_aliases(meta_df: pd.DataFrame, aliases: Dict[str, Tuple[List[str], List[str]]]) -> pd.DataFrame:
+    """Fills ALIAS_COLUMNS: the other doc_ids / base_ids each live row stands in for."""
+    doc_lists, base_lists = [], []
+    for cid, doc_id, base_id, dead in zip(meta_df["chunk_id"], meta_df["doc_id"], meta_df["base_id"],
+                                          meta_df["deleted"]):
+        doc_ids, base_ids = ([], []) if dead else aliases.get(cid, ([], []))
+        doc_lists.append([d for d in dict.fromkeys(doc_ids) if d != doc_id])
+        base_lists.append([b for b in dict.fromkeys(base_ids) if b != base_id])
+    meta_df["dup_doc_ids"] = doc_lists
+    meta_df["dup_base_ids"] = base_lists
+    return meta_df
+
+def _store_unchanged(kept: Dict[int, Tuple[str, int]], aliases: Optional[Dict[str, Tuple[List[str], List[str]]]],
+                     signature: Dict) -> bool:
+    """
+    Whether pass 2 would write the previous store back as it is, given
+    that every live row was kept: same dedup settings, and no live row gets
+    a new base_id, prechunk_id or (with dedup) alias list.
+    """
+    manifest = read_manifest(CHUNK_STORE_PATH) or {}
+    if manifest.get("dedup") != signature.get("dedup"):
+        return False
+    cols = ["chunk_id", "doc_id", "base_id", "prechunk_id", "deleted"]
+    row0 = 0
+    for meta, _ in iter_chunk_store(CHUNK_STORE_PATH):
+        meta_df = meta.select(cols + (ALIAS_COLUMNS if aliases is not None else [])).to_pandas()
+        rows = np.arange(row0, row0 + len(meta_df))
+        row0 += len(meta_df)
+        live = ~meta_df["deleted"].to_numpy()
+        if [kept[r] for r in rows[live].tolist()] != list(zip(meta_df["base_id"][live],
+                                                              meta_df["prechunk_id"][live].astype(int))):
+            return False
+        if aliases is not None:
+            expected = _with_aliases(meta_df[live].drop(columns=ALIAS_COLUMNS), aliases)
+            for c in ALIAS_COLUMNS:
+                if [list(v) for v in meta_df[c][live]] != expected[c].tolist():
+                    return False
+    return True
+
+class _BuildCheckpoint:
+    """
+    Vectors embedded by a build that has not committed its store yet, keyed
+    by chunk_hash: one .npz of (hashes, vectors) per embedded batch under
+    `root/build-<backend>_<model>_<dim>`. A build that crashed and is run
+    again only embeds chunks it never reached. clear() removes it once the
+    new store is committed. With `root` None nothing is kept.
+    """
 
+    def __init__(self, embedder: Embedder, root: Optional[str] = EMBED_CHECKPOINT_DIR):
+        signature = f"{embedder.backend}_{embedder.model}_{embedder.dim or 'native'}"
+        self.path = os.path.join(root, "build-" + re.sub(r"\W+", "_", signature)) if root else None
+        self._where: Dict[str, Tuple[str, int]] = {}  # chunk_hash -> (file, row)
+        self._files = 0
+        if self.path and os.path.isdir(self.path):
+            for name in sorted(os.listdir(self.path)):
+                if not name.endswith(".npz"):
+                    continue
+                with np.load(os.path.join(self.path, name)) as data:
+                    for row, h in enumerate(data["hashes"].tolist()):
+                        self._where.setdefault(h, (name, row))
+                self._files += 1
+            if self._where:
+                print(f"Resuming build: {len(self._where)} chunks already embedded.")
+
+    def embed(self, embedder: Embedder, hashes: List[str], texts: List[str]) -> np.ndarray:
+        """Vectors of `texts`, embedding only chunks not already checkpointed."""
+        missing = [i for i, h in enumerate(hashes) if h not in self._where]
+        fresh = embedder.embed_corpus([texts[i] for i in missing]) if missing else None
+        if fresh is not None and self.path:
+            os.makedirs(self.path, exist_ok=True)
+            name = f"{self._files:06d}.npz"
+            tmp = os.path.join(self.path, name + ".tmp")
+            with open(tmp, "wb") as f:
+                np.savez(f, hashes=np.array([hashes[i] for i in missing]), vectors=fresh)
+            os.replace(tmp, os.path.join(self.path, name))
+            self._files += 1
+            for row, i in enumerate(missing):
+                self._where.setdefault(hashes[i], (name, row))
+        if len(missing) == len(hashes):
+            return fresh
+
+        # Gather the checkpointed rows, reading each file once
+        embedded_now = set(missing)
+        by_file: Dict[str, List[Tuple[int, int]]] = {}
+        for i, h in enumerate(hashes):
+            if i not in embedded_now:
+                name, row = self._where[h]
+                by_file.setdefault(name, []).append((i, row))
+        out = None
+        for name, picks in by_file.items():
+            with np.load(os.path.join(self.path, name)) as data:
+                vecs = data["vectors"][[row for _, row in picks]]
+            if out is None:
+                out = np.empty((len(hashes), vecs.shape[1]), dtype=np.float32)
+            out[[i for i, _ in picks]] = vecs
+        if fresh is not None:
+            out[missing] = fresh
+        return out
+
+    def clear(self):
+        if self.path:
+            shutil.rmtree(self.path, ignore_errors=True)
+
+def _kb_batches(source: Optional[str], batch_rows: int) -> Iterator[pd.DataFrame]:
+    if source is not None:
+        yield from iter_kb_batches(source, batch_rows)
+        return
     kb_df = load_kb_data()
-    kb_rows = []
-    
-    print("Chunking documents...")
-    for _, r in kb_df.iterrows():
-        lang   = str(r.get("lang", "") or "")
-        doc_id = str(r.get("doc_id", "") or "")
-        base_id= str(r.get("base_id", "") or "")
-        region = str(r.get("region", "") or "")
-        text   = str(r.get("kb_text", "") or "").strip()
-
-        for j, ch in enumerate(_lang_chunk(text, lang)):
-            kb_rows.append({
-                "doc_id": doc_id,
-                "base_id": base_id,
-                "lang": lang,
-                "region": region,
-                "prechunk_id": j,
-                "kb_text_prechunk": ch,
-            })
-
-    kb_index_df = pd.DataFrame(kb_rows)
-    print(f"Generated {len(kb_index_df)}chunks.")
-
-    # Add metadata prefix for Phoenix
-    def _add_meta_prefix(r):
-        doc_id  = (r["doc_id"] or "").replace(" ", "_")
-        base_id = (r["base_id"] or "").replace(" ", "_")
-        lang    = (r["lang"] or "").replace(" ", "_")
-        region  = (r["region"] or "").replace(" ", "_")
-        return (
-            f"__META__ doc_id={doc_id} base_id={base_id} lang={lang} region={region}\n"
-            f"{r['kb_text_prechunk']}"
-        )
-
-    kb_index_df["kb_text_prechunk"] = kb_index_df.apply(_add_meta_prefix, axis=1)
-
-    print("Building Phoenix Index...")
-    embedding_client = GenAIEmbeddingClient(
-        provider="openai",
-        model="text-embedding-3-large", # Hardcoded in notebook, should use config but keeping consistency
-        api_key=api_key
-    )
-    
-    vector = VectorEmbedding(embedding_client, chunk_size=5000, overlap=0)
-    
-    index_path, chunks = vector.generate_index(
-        df=kb_index_df,
-        text_column="kb_text_prechunk",
-        index_path=INDEX_PATH,
-        vector_index_type="local_index"
-    )
-    
-    print(f"Index saved to {index_path}")
-    
-    # Process metadata again to save as parquet
-    # Simplified parsing for now, assuming chunks correspond to kb_index_df roughly
-    # In a real run, Phoenix returns 'chunks' as list of texts. 
-    # We should re-parse them to get metadata back for the parquet.
-    
-    META_RE = re.compile(
-        r"__META__\s+doc_id=(?P<doc_id>\S+)\s+base_id=(?P<base_id>\S+)\s+lang=(?P<lang>\S+)\s+region=(?P<region>\S+)\s*\n",
-        re.I
-    )
-    
-    def parse_chunk_meta(chunk_text: str):
-        matches = list(META_RE.finditer(chunk_text or ""))
-        if not matches:
-             return {"doc_id":"", "base_id":"", "lang":"", "region":"", "chunk_text":(chunk_text or "").strip()}
-        
-        # Take the most common if multiple matches (though Phoenix usually preserves 1:1 if configured right, but here we prepended)
-        # The notebook logic used _mode logic.
-        from collections import Counter
-        def _mode(xs):
-            c = Counter([x for x in xs if x and x.lower() != "nan"])
-            return c.most_common(1)[0][0] if c else ""
-
-        doc_ids  = [m.group("doc_id") for m in matches]
-        base_ids = [m.group("base_id") for m in matches]
-        langs    = [m.group("lang") for m in matches]
-        regions  = [m.group("region") for m in matches]
-        
-        cleaned = META_RE.sub("", chunk_text).strip()
-        return {
-            "doc_id": _mode(doc_ids),
-            "base_id": _mode(base_ids),
-            "lang": _mode(langs),
-            "region": _mode(regions),
-            "chunk_text": cleaned
+    for i in range(0, len(kb_df), batch_rows):
+        yield kb_df.iloc[i:i + batch_rows]
+
+def build_index(
+    api_key: str,
+    force: bool = False,
+    source: Optional[str] = None,
+    batch_rows: int = KB_STREAM_BATCH_ROWS,
+    embedder: Optional[Embedder] = None,
+    snapshot: bool = True,
+    dedup_threshold: Optional[float] = DEDUP_THRESHOLD,
+):
+    """
+    One-pass, incremental, streaming ingestion into the chunk store.
+
+    The KB is read `batch_rows` documents at a time, either from the
+    Hugging Face dataset or, with `source`, from a local Parquet/Arrow file
+    or `save_to_disk` directory (fully offline). Each batch is chunked,
+    hashed and embedded before the next one is read, so peak memory is set
+    by the batch size rather than by the KB.
+
+    Chunks get a stable chunk_id from their content hash on (doc_id, lang,
+    region, text), and only chunks whose ID is new are embedded. Existing
+    rows keep their position, chunks that disappeared are tombstoned
+    (`deleted=True`) and new ones are appended. Vectors, text and metadata
+    are written together to CHUNK_STORE_PATH. Tombstones are compacted
+    away once they exceed INDEX_COMPACT_RATIO of the rows. When nothing was
+    added, changed or removed, the store, its version and its snapshot are
+    left as they are, so caches keyed on the index version stay valid.
+    Vectors embedded so far are checkpointed by chunk_hash under
+    EMBED_CHECKPOINT_DIR until the store is committed, so rerunning a build
+    that failed part-way only embeds the chunks it had not reached.
+
+    `embedder` defaults to the EMBED_BACKEND backend. Its backend, model and
+    dim are recorded in the manifest; a store built by a different embedder
+    is rebuilt from scratch.
+
+    With `snapshot`, the language partitions are then built once with
+    INDEX_TYPE / VECTOR_STORAGE / VECTOR_DIM / SHARD_BY and serialized to
+    INDEX_SNAPSHOT_DIR, so retrievers map them instead of rebuilding.
+
+    With `dedup_threshold`, chunks that are near-duplicates (MinHash
+    Jaccard estimate) of an earlier chunk this build are not embedded or
+    stored; the chunk kept lists their doc_ids / base_ids in ALIAS_COLUMNS.
+    A chunk is only folded into one that every query able to retrieve it
+    also searches (see src/ingestion/dedup.py).
+    """
+    embedder = embedder if embedder is not None else get_embedder(api_key=api_key)
+    manifest = read_manifest(CHUNK_STORE_PATH) or {}
+    version = manifest.get("version", 0) + 1
+    old_live, old_rows = ({}, 0) if force else _previous_live_rows(embedder)
+
+    # Pass 1: stream the KB; new chunks are embedded and spilled to disk
+    kept: Dict[int, Tuple[str, int]] = {}  # old row -> refreshed (base_id, prechunk_id)
+    seen: Dict[str, int] = {}
+    n_chunks = 0
+    dedup = NearDuplicateIndex(dedup_threshold) if dedup_threshold is not None else None
+    stream_ids: List[str] = []  # chunk_id of every chunk streamed, in dedup numbering
+    aliases: Dict[str, Tuple[List[str], List[str]]] = {}  # kept chunk_id -> (doc_ids, base_ids) folded into it
+    removed: Dict[str, int] = {}  # near-duplicates dropped per language
+    spill = ChunkStoreWriter(CHUNK_STORE_PATH + ".new", {})
+    # One chunking pool for the whole build rather than one per KB batch
+    pool = chunk_pool()
+    # Survives a crash until the new store is committed, so a rerun skips chunks already embedded
+    checkpoint = _BuildCheckpoint(embedder)
+    try:
+        print("Chunking and embedding documents...")
+        for kb_batch in _kb_batches(source, batch_rows):
+            cur_df = chunk_table(kb_batch, pool=pool).to_pandas()
+            cur_df["chunk_hash"] = [
+                chunk_hash(d, l, r, t)
+                for d, l, r, t in zip(cur_df["doc_id"], cur_df["lang"], cur_df["region"], cur_df["chunk_text"])
+            ]
+            cur_df["chunk_id"] = chunk_ids(cur_df["chunk_hash"], seen)
+            cur_df["deleted"] = False
+            n_chunks += len(cur_df)
+            if dedup is not None:
+                cur_df = _drop_near_duplicates(cur_df, dedup, stream_ids, aliases, removed)
+
+            new_src = []
+            for i, (cid, base_id, j) in enumerate(zip(cur_df["chunk_id"], cur_df["base_id"], cur_df["prechunk_id"])):
+                row = old_live.pop(cid, None)
+                if row is None:
+                    new_src.append(i)
+                else:
+                    kept[row] = (base_id, int(j))
+
+            new_df = cur_df.iloc[new_src]
+            if len(new_df):
+                spill.write(new_df, checkpoint.embed(
+                    embedder, new_df["chunk_hash"].tolist(), new_df["chunk_text"].tolist()))
+        spill.close(commit=spill.rows > 0)
+    except BaseException:
+        spill.close(commit=False)
+        raise
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    n_new = spill.rows
+    if dedup is not None:
+        n_removed = sum(removed.values())
+        print(f"Near-duplicates: {n_removed} of {n_chunks} chunks ({n_removed / max(n_chunks, 1):.1%}) folded into "
+              f"{len(aliases)} kept chunks; removed per language: {dict(sorted(removed.items()))}")
+    print(f"Incremental diff: {len(kept)} unchanged, {n_new} new/changed, {len(old_live)} removed ({n_chunks} chunks).")
+    signature = {"version": version, "backend": embedder.backend, "model": embedder.model}
+    if embedder.dim:
+        # Recorded up front, so a store with no rows still has the embedder's width
+        signature["dim"] = embedder.dim
+    if dedup is not None:
+        signature["dedup"] = {
+            "threshold": dedup_threshold, "chunks": n_chunks, "removed": dict(sorted(removed.items())),
         }
+    # Nothing added, changed or removed: keep the store, its version and its snapshot
+    unchanged = old_rows and not n_new and not old_live
+    if unchanged and _store_unchanged(kept, aliases if dedup is not None else None, signature):
+        checkpoint.clear()
+        print(f"Chunk store v{manifest['version']} unchanged -> {CHUNK_STORE_PATH}")
+        if snapshot:
+            write_index_snapshot()
+        return
+    tombstones = old_rows - len(kept)
+    compact = (old_rows + n_new) > 0 and tombstones / (old_rows + n_new) > INDEX_COMPACT_RATIO
+
+    # Pass 2: previous rows (tombstoned / refreshed / compacted) + new rows
+    with ChunkStoreWriter(CHUNK_STORE_PATH, signature, aliases=dedup is not None) as out:
+        if old_rows:
+            row0 = 0
+            for meta, vecs in iter_chunk_store(CHUNK_STORE_PATH):
+                meta_df = meta.to_pandas()
+                rows = np.arange(row0, row0 + len(meta_df))
+                row0 += len(meta_df)
+                alive = np.array([r in kept for r in rows.tolist()], dtype=bool)
+                meta_df["deleted"] = ~alive
+                if alive.any():
+                    refreshed = [kept[r] for r in rows[alive].tolist()]
+                    meta_df.loc[alive, "base_id"] = [b for b, _ in refreshed]
+                    meta_df.loc[alive, "prechunk_id"] = [j for _, j in refreshed]
+                if compact:
+                    meta_df, vecs = meta_df[alive], vecs[alive]
+                out.write(_with_aliases(meta_df, aliases) if dedup is not None else meta_df, vecs)
+        if n_new:
+            for meta, vecs in iter_chunk_store(CHUNK_STORE_PATH + ".new"):
+                out.write(_with_aliases(meta.to_pandas(), aliases) if dedup is not None else meta, vecs)
+    if n_new:
+        os.remove(CHUNK_STORE_PATH + ".new")
+    checkpoint.clear()
+
+    if compact:
+        print(f"Compacted {tombstones} tombstoned rows.")
+        tombstones = 0
+    print(f"Chunk store v{version} saved: {out.rows} rows ({tombstones} tombstones) -> {CHUNK_STORE_PATH}")
+    if snapshot:
+        write_index_snapshot()
+
+def write_index_snapshot(index_type: str = INDEX_TYPE, storage: str = VECTOR_STORAGE,
+                         vector_dim: Optional[int] = VECTOR_DIM, root: str = INDEX_SNAPSHOT_DIR,
+                         shard_by: str = SHARD_BY) -> str:
+    """
+    Builds the partitions of the current chunk store and writes them as a
+    versioned snapshot. Partitions are built one at a time from their own
+    rows of the mapped store, so peak memory is one partition's vectors and
+    index rather than a copy of the whole store.
+    """
+    table, manifest = open_chunk_store(CHUNK_STORE_PATH)
+    config = snapshot_config(manifest, table.num_rows, index_type, storage, vector_dim, shard_by)
+    shards = partition_rows(table.drop_columns(["vector"]), shard_by)
+
+    def built():
+        for lang, rows in sorted(shards.items()):
+            idx, exact = build_partition(take_vectors(table, rows), index_type, storage, vector_dim)
+            yield lang, (idx, rows, exact)
 
-    chunk_meta_df = pd.DataFrame([parse_chunk_meta(t) for t in chunks])
-    chunk_meta_df.to_parquet(META_PATH, index=False)
-    print(f"Metadata saved to {META_PATH}")
+    path = write_snapshot(config, built(), root=root)
+    print(f"Index snapshot saved: {len(shards)} partitions -> {path}")
+    return path
@@ -1,23 +1,72 @@
+import glob
+import json
+import os
+from typing import Iterator
 import pandas as pd
-from datasets import load_dataset
-from src.config.settings import HF_KB_REPO, HF_EVAL_REPO
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.ipc as ipc
+from src.config.settings import HF_KB_REPO, HF_EVAL_REPO, KB_STREAM_BATCH_ROWS
 
-def load_kb_data():
-    """Loads the Knowledge Base dataset."""
-    print(f"Loading KB from {HF_KB_REPO}...")
-    kb_df = load_dataset(HF_KB_REPO, split="train").to_pandas()
-    
-    # Preprocess text
+KB_COLUMNS = ["doc_id", "base_id", "lang", "region", "kb_text"]
+
+def _add_kb_text(kb_df: pd.DataFrame) -> pd.DataFrame:
     kb_df["kb_text"] = (
         kb_df["title"].fillna("").astype(str).str.strip()
         + "\n\n"
         + kb_df["content"].fillna("").astype(str).str.strip()
     ).str.strip()
-    
     return kb_df
 
+def load_kb_data():
+    """Loads the Knowledge Base dataset."""
+    from datasets import load_dataset
+    print(f"Loading KB from {HF_KB_REPO}...")
+    kb_df = load_dataset(HF_KB_REPO, split="train").to_pandas()
+
+    # Preprocess text
+    return _add_kb_text(kb_df)
+
 def load_eval_data():
     """Loads the Evaluation dataset."""
+    from datasets import load_dataset
     print(f"Loading Eval from {HF_EVAL_REPO}...")
     ev_df = load_dataset(HF_EVAL_REPO, split="train").to_pandas()
     return ev_df
+
+def _hf_saved_files(path: str):
+    """Arrow stream files of a `datasets.save_to_disk` directory, in order."""
+    with open(os.path.join(path, "state.json"), "r", encoding="utf-8") as f:
+        state = json.load(f)
+    return [os.path.join(path, d["filename"]) for d in state.get("_data_files", [])]
+
+def _raw_batches(path: str, batch_rows: int) -> Iterator[pa.RecordBatch]:
+    if os.path.isdir(path) and os.path.exists(os.path.join(path, "state.json")):
+        # Hugging Face save_to_disk output (Arrow IPC *stream* files)
+        for fname in _hf_saved_files(path):
+            with pa.memory_map(fname, "r") as source:
+                for batch in ipc.open_stream(source):
+                    for off in range(0, batch.num_rows, batch_rows):
+                        yield batch.slice(off, batch_rows)
+        return
+
+    if os.path.isdir(path):
+        files = sorted(glob.glob(os.path.join(path, "**", "*.parquet"), recursive=True))
+        fmt = "parquet" if files else "arrow"
+    else:
+        fmt = "parquet" if path.endswith(".parquet") else "arrow"
+    dataset = ds.dataset(path, format=fmt)
+    yield from dataset.to_batches(batch_size=batch_rows)
+
+def iter_kb_batches(path: str, batch_rows: int = KB_STREAM_BATCH_ROWS) -> Iterator[pd.DataFrame]:
+    """
+    Streams the KB from a local Parquet file/directory, Arrow IPC file or a
+    `datasets.save_to_disk` directory, `batch_rows` documents at a time,
+    with `kb_text` built exactly as in load_kb_data(). Only one batch is
+    materialized at a time, and nothing touches the network.
+    """
+    for batch in _raw_batches(path, batch_rows):
+        kb_df = batch.to_pandas()
+        if "kb_text" not in kb_df.columns:
+            kb_df = _add_kb_text(kb_df)
+        yield kb_df[[c for c in KB_COLUMNS if c in kb_df.columns]]
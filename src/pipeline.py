@@ -1,17 +1,42 @@
+import math
 import os
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional, Union
 from src.retrieval.search import RiskAwareRetriever
+from src.retrieval.embedders import Embedder
 from src.guardrails.domain_guard import domain_guard
-from src.config.settings import TOP_K_SEARCH
+from src.config.settings import TOP_K_SEARCH, SIMILARITY_THRESHOLD, ASYNC_MAX_BATCH_SIZE, ASYNC_MAX_WAIT_MS
+from src.telemetry import Metrics, optional_trace
+from src.batching import MicroBatcher
+from src.decision_cache import DecisionCache
 
 class SingAIRAGPipeline:
-    def __init__(self, api_key: str):
-        self.retriever = RiskAwareRetriever(api_key=api_key)
-        
-    def run(self, query: str, lang: str = "en") -> Dict[str, Any]:
+    def __init__(
+        self,
+        api_key: str,
+        embedder: Optional[Embedder] = None,
+        metrics: Optional[Metrics] = None,
+        max_batch_size: int = ASYNC_MAX_BATCH_SIZE,
+        max_wait_ms: float = ASYNC_MAX_WAIT_MS,
+        retriever: Optional[RiskAwareRetriever] = None,
+        decision_cache: Optional[DecisionCache] = None,
+    ):
+        # With `metrics`, every request is traced per stage (guard, embed,
+        # search, gate, materialize) and counted by language and reason code.
+        self.metrics = metrics
+        # A prebuilt `retriever` (e.g. attached by src.serving) is used as-is
+        if retriever is None:
+            retriever = RiskAwareRetriever(api_key=api_key, embedder=embedder, metrics=metrics)
+        self.retriever = retriever
+        # Repeated questions return the cached output for the same index version
+        self.decision_cache = decision_cache
+        # arun() requests are coalesced into run_batch() calls
+        self.batcher = MicroBatcher(self._run_items, max_batch_size=max_batch_size, max_wait_ms=max_wait_ms)
+
+    def run(self, query: str, lang: str = "en", region: Optional[str] = None) -> Dict[str, Any]:
         """
-        Executes the Two-Stage Risk-Aware RAG pipeline.
-        
+        Executes the Two-Stage Risk-Aware RAG pipeline. With `region`,
+        retrieval only returns that region's chunks and region-less ones.
+
         Returns:
             Dict containing:
             - decision: "ANSWER", "REFUSE", "ESCALATE"
@@ -19,42 +44,199 @@ class SingAIRAGPipeline:
             - reason: Logged reason for the decision
             - context: Retrieved context (if any)
         """
-        
+
         # Gate-B: Deterministic Symbolic Guardrails (Pre-retrieval check?)
         # Paper says "Two-Stage Risk-Aware RAG controller"
         # Usually RAG flow: Query -> Retrieve -> Gate-A (Similarity) -> Gate-B (Policy) -> Generate
         # But abstract says:
         # "cosine-calibrated similarity gate for out-of-domain filtering" (Gate-A)
         # "Deterministic Symbolic Guardrails... for detecting credential disclosure..." (Gate-B)
-        
+
+        trace = optional_trace(self.metrics, "run", lang)
+
+        cache_key, cache = None, None
+        if self.decision_cache is not None:
+            cache_key = self.decision_cache.key(query, lang, self.retriever.index_version, region)
+            cached = self.decision_cache.get(cache_key)
+            if trace is not None:
+                trace.lap("cache")
+            if cached is not None:
+                if trace is not None:
+                    self.metrics.finish(trace, [self._outcome(cached, lang, cache="hit")])
+                return cached
+            cache = "miss"
+
         # Check Guardrails first for obvious violations (Input Guardrail)
-        is_blocked, reason = domain_guard.domain_guard_action(query)
+        is_blocked, reason = domain_guard.domain_guard_action(query, timed=self.metrics is not None)
+        if trace is not None:
+            trace.lap("guard")
         if is_blocked:
-            return {
-                "decision": "REFUSE",
-                "answer": "I cannot fulfill this request due to policy constraints.",
-                "reason": reason,
-                "context": []
-            }
-            
-        # Retrieve
-        results = self.retriever.retrieve(query, lang=lang, top_k=TOP_K_SEARCH)
-        
-        if not results:
+            output = self._blocked(reason)
+            if cache_key is not None:
+                self.decision_cache.put(cache_key, output)
+            if trace is not None:
+                self.metrics.finish(trace, [self._outcome(output, lang, cache=cache)])
+            return output
+
+        # Retrieve; hit metadata and text are only read if Gate-A passes
+        scores, global_ids = self.retriever.search(
+            [query], [lang], top_k=TOP_K_SEARCH, trace=trace, regions=None if region is None else [region]
+        )
+        output = self._gate(scores[0], global_ids[0])
+        if trace is not None:
+            trace.lap("gate")
+        if output["decision"] == "ANSWER":
+            output["context"] = self.retriever.materialize(scores, global_ids)[0]
+            if trace is not None:
+                trace.lap("materialize")
+        if cache_key is not None:
+            self.decision_cache.put(cache_key, output)
+        if trace is not None:
+            self.metrics.finish(trace, [self._outcome(output, lang, scores[0], global_ids[0], cache=cache)])
+        return output
+
+    def run_batch(
+        self,
+        queries: List[str],
+        langs: Optional[Union[str, List[str]]] = "en",
+        regions: Optional[List[Optional[str]]] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Batched run(): Gate-B over the whole batch, a single retrieval pass
+        for the surviving queries, Gate-A per query, then one materialize()
+        for the queries that answer. outputs[i] is the same dict
+        run(queries[i], langs[i], regions[i]) would return.
+        """
+        if langs is None or isinstance(langs, str):
+            langs = [langs or "en"] * len(queries)
+        if len(langs) != len(queries):
+            raise ValueError("queries and langs must have the same length")
+        if regions is not None and len(regions) != len(queries):
+            raise ValueError("queries and regions must have the same length")
+
+        trace = optional_trace(self.metrics, "run_batch")
+        outputs: List[Optional[Dict[str, Any]]] = [None] * len(queries)
+        pending = list(range(len(queries)))
+        cache_keys: Dict[int, str] = {}
+        if self.decision_cache is not None:
+            pending = []
+            for i, (query, lang) in enumerate(zip(queries, langs)):
+                region = None if regions is None else regions[i]
+                cache_keys[i] = self.decision_cache.key(query, lang, self.retriever.index_version, region)
+                outputs[i] = self.decision_cache.get(cache_keys[i])
+                if outputs[i] is None:
+                    pending.append(i)
+            if trace is not None:
+                trace.lap("cache")
+
+        survivors = []
+        guarded = domain_guard.domain_guard_action_batch([queries[i] for i in pending], timed=self.metrics is not None)
+        for i, (is_blocked, reason) in zip(pending, guarded):
+            if is_blocked:
+                outputs[i] = self._blocked(reason)
+            else:
+                survivors.append(i)
+        if trace is not None:
+            trace.lap("guard")
+
+        scores, global_ids = self.retriever.search(
+            [queries[i] for i in survivors], [langs[i] for i in survivors], top_k=TOP_K_SEARCH, trace=trace,
+            regions=None if regions is None else [regions[i] for i in survivors],
+        )
+        answered = []
+        for j, i in enumerate(survivors):
+            outputs[i] = self._gate(scores[j], global_ids[j])
+            if outputs[i]["decision"] == "ANSWER":
+                answered.append(j)
+        if trace is not None:
+            trace.lap("gate")
+
+        if answered:
+            contexts = self.retriever.materialize(scores[answered], global_ids[answered])
+            for j, context in zip(answered, contexts):
+                outputs[survivors[j]]["context"] = context
+            if trace is not None:
+                trace.lap("materialize")
+
+        for i in pending:
+            if i in cache_keys:
+                self.decision_cache.put(cache_keys[i], outputs[i])
+
+        if trace is not None:
+            row = {i: j for j, i in enumerate(survivors)}
+            fresh = set(pending)
+            self.metrics.finish(trace, [
+                self._outcome(out, lang, *((scores[row[i]], global_ids[row[i]]) if i in row else ()),
+                              cache=None if not cache_keys else "miss" if i in fresh else "hit")
+                for i, (out, lang) in enumerate(zip(outputs, langs))
+            ])
+        return outputs
+
+    async def arun(self, query: str, lang: str = "en", region: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Async run(). Concurrent calls are micro-batched: they share one
+        embedding call and one search per language scope (see MicroBatcher
+        for the size / wait limits). Returns the same dict as run().
+        """
+        return await self.batcher.submit((query, lang, region))
+
+    def _run_items(self, items: List[tuple]) -> List[Dict[str, Any]]:
+        regions = [region for _, _, region in items]
+        return self.run_batch([q for q, _, _ in items], [lang or "en" for _, lang, _ in items],
+                              None if all(r is None for r in regions) else regions)
+
+    @staticmethod
+    def _outcome(output: Dict[str, Any], lang: str, scores=None, global_ids=None,
+                 cache: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Per-query metrics entry: decision, reason, the top score Gate-A saw
+        (None when there was none, including lexical fast-path answers) and
+        any cache hit / miss.
+        """
+        top_score = float(scores[0]) if global_ids is not None and global_ids[0] >= 0 else None
+        if top_score is not None and math.isnan(top_score):
+            top_score = None
+        outcome = {"lang": lang, "decision": output["decision"], "reason": output["reason"], "top_score": top_score}
+        if cache is not None:
+            outcome["cache"] = cache
+        return outcome
+
+    @staticmethod
+    def _blocked(reason: str) -> Dict[str, Any]:
+        return {
+            "decision": "REFUSE",
+            "answer": "I cannot fulfill this request due to policy constraints.",
+            "reason": reason,
+            "context": []
+        }
+
+    @staticmethod
+    def _gate(scores, global_ids) -> Dict[str, Any]:
+        """Gate-A on one query's ranked (scores, global_ids); the caller fills "context" on ANSWER."""
+        if global_ids[0] < 0:
              return {
                 "decision": "REFUSE",
                 "answer": "I do not have enough information to answer this.",
                 "reason": "NO_CONTEXT_FOUND",
                 "context": []
             }
-            
+
+        # Lexical fast path (lexical_mode="hybrid"): a confident near-exact
+        # match was decided by the retriever and has no cosine for Gate-A
+        top_score = float(scores[0])
+        if math.isnan(top_score):
+            return {
+                "decision": "ANSWER",
+                "answer": "[GENERATED_ANSWER_PLACEHOLDER]",
+                "reason": "LEXICAL_MATCH",
+                "context": []
+            }
+
         # Gate-A: Similarity Threshold
         # "similarity thresholding alone effectively filters out-of-domain queries"
         # We check the top score
-        top_score = results[0]["score"]
-        # Threshold from paper abstract or config? Paper mentions 0.25 in section 3.3
-        SIMILARITY_THRESHOLD = 0.25 
-        
+        # Paper section 3.3 uses 0.25 (SIMILARITY_THRESHOLD in settings)
+
         if top_score < SIMILARITY_THRESHOLD:
              return {
                 "decision": "REFUSE", # Or ESCALATE? Abstract says "out-of-domain filtering"
@@ -62,15 +244,15 @@ class SingAIRAGPipeline:
                 "reason": f"LOW_SIMILARITY_SCORE ({top_score:.3f} < {SIMILARITY_THRESHOLD})",
                 "context": []
             }
-        
+
         # If passed both, we would Generate.
         # (Generation logic not fully implemented in this repo structure as it requires LLM inference code which was just 'SEA-LION or Qwen' in abstract)
-        
+
         return {
             "decision": "ANSWER",
             "answer": "[GENERATED_ANSWER_PLACEHOLDER]",
             "reason": "PASSED_ALL_GATES",
-            "context": results
+            "context": []
         }
 
 if __name__ == "__main__":
@@ -80,7 +262,7 @@ if __name__ == "__main__":
     if not key:
         print("Please set OPENAI_API_KEY")
         sys.exit(1)
-        
+
     pipeline = SingAIRAGPipeline(api_key=key)
     q = "I want a refund for my bill from last month"
     print(f"Query: {q}")
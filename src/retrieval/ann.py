@@ -0,0 +1,116 @@
+import math
+from typing import Optional
+import faiss
+import numpy as np
+from src.config.settings import (
+    INDEX_TYPE, AUTO_FLAT_MAX, AUTO_HNSW_MAX, IVF_NLIST, IVF_NPROBE, PQ_M, PQ_NBITS,
+    HNSW_M, HNSW_EF_CONSTRUCTION, HNSW_EF_SEARCH, VECTOR_STORAGE,
+)
+
+INDEX_TYPES = ("flat", "ivf_flat", "ivf_pq", "hnsw")
+STORAGE_TYPES = ("float32", "float16", "int8")
+# faiss scalar-quantizer codecs for the compact encodings
+_SQ_CODECS = {"float16": "SQfp16", "int8": "SQ8"}
+
+# faiss warns below ~39 training points per centroid
+_MIN_POINTS_PER_CENTROID = 39
+
+def resolve_index_type(n: int, index_type: str = INDEX_TYPE) -> str:
+    """Maps "auto" to a concrete type by partition size."""
+    if index_type != "auto":
+        if index_type not in INDEX_TYPES:
+            raise ValueError(f"Unknown index type {index_type!r}; expected one of {INDEX_TYPES} or 'auto'")
+        return index_type
+    if n <= AUTO_FLAT_MAX:
+        return "flat"
+    if n <= AUTO_HNSW_MAX:
+        return "hnsw"
+    return "ivf_pq"
+
+def _nlist(n: int, nlist: Optional[int]) -> int:
+    nlist = nlist or int(4 * math.sqrt(n))
+    return max(1, min(nlist, n // _MIN_POINTS_PER_CENTROID))
+
+def build_ann_index(
+    vecs: np.ndarray,
+    index_type: str = INDEX_TYPE,
+    nlist: Optional[int] = IVF_NLIST,
+    storage: str = VECTOR_STORAGE,
+) -> faiss.Index:
+    """
+    Builds an inner-product index over L2-normalized vectors (so scores are
+    cosine similarities). IVF types fall back to flat when there is too
+    little data to train even one centroid; IVF-PQ also falls back to
+    IVF-Flat when PQ_M does not divide the dimension or there are too few
+    points to train its codebooks. `storage` picks the encoding of the
+    stored vectors for flat, HNSW and IVF-Flat; IVF-PQ is already compressed
+    and ignores it.
+    """
+    if storage not in STORAGE_TYPES:
+        raise ValueError(f"Unknown vector storage {storage!r}; expected one of {STORAGE_TYPES}")
+    codec = _SQ_CODECS.get(storage)
+    vecs = np.ascontiguousarray(vecs, dtype=np.float32)
+    n, dim = vecs.shape
+    kind = resolve_index_type(n, index_type)
+
+    if kind in ("ivf_flat", "ivf_pq") and n < _MIN_POINTS_PER_CENTROID:
+        kind = "flat"
+    if kind == "ivf_pq" and (dim % PQ_M or n < _MIN_POINTS_PER_CENTROID * 2 ** PQ_NBITS):
+        kind = "ivf_flat"
+
+    if kind == "flat":
+        idx = faiss.IndexFlatIP(dim) if codec is None else faiss.index_factory(dim, codec, faiss.METRIC_INNER_PRODUCT)
+    elif kind == "hnsw":
+        if codec is None:
+            idx = faiss.IndexHNSWFlat(dim, HNSW_M, faiss.METRIC_INNER_PRODUCT)
+        else:
+            idx = faiss.index_factory(dim, f"HNSW{HNSW_M},{codec}", faiss.METRIC_INNER_PRODUCT)
+        idx.hnsw.efConstruction = HNSW_EF_CONSTRUCTION
+    elif kind == "ivf_flat":
+        idx = faiss.index_factory(dim, f"IVF{_nlist(n, nlist)},{codec or 'Flat'}", faiss.METRIC_INNER_PRODUCT)
+    else:
+        idx = faiss.index_factory(dim, f"IVF{_nlist(n, nlist)},PQ{PQ_M}x{PQ_NBITS}", faiss.METRIC_INNER_PRODUCT)
+
+    if not idx.is_trained:
+        idx.train(vecs)
+    idx.add(vecs)
+    set_search_params(idx)
+    return idx
+
+def index_kind(idx: faiss.Index) -> str:
+    if isinstance(idx, faiss.IndexHNSW):
+        return "hnsw"
+    ivf = faiss.try_extract_index_ivf(idx)
+    if ivf is not None:
+        return "ivf_pq" if isinstance(ivf, faiss.IndexIVFPQ) else "ivf_flat"
+    return "flat"
+
+def set_search_params(idx: faiss.Index, nprobe: int = IVF_NPROBE, ef_search: int = HNSW_EF_SEARCH):
+    """Applies the query-time recall/latency knobs; a no-op for flat indexes."""
+    if isinstance(idx, faiss.IndexHNSW):
+        idx.hnsw.efSearch = ef_search
+        return
+    ivf = faiss.try_extract_index_ivf(idx)
+    if ivf is not None:
+        ivf.nprobe = min(nprobe, ivf.nlist)
+
+def index_memory_bytes(idx: faiss.Index) -> int:
+    """Serialized size: codes plus graph links / coarse quantizer."""
+    return int(faiss.serialize_index(idx).nbytes)
+
+def filtered_search(idx: faiss.Index, q: np.ndarray, k: int, allowed: np.ndarray):
+    """
+    idx.search() restricted to the local ids where the bool mask `allowed`
+    is set, keeping the index's current nprobe / efSearch. Flat indexes
+    stay exact; IVF and HNSW skip filtered ids while they traverse.
+    """
+    bitmap = np.packbits(np.asarray(allowed, dtype=bool), bitorder="little")
+    sel = faiss.IDSelectorBitmap(len(allowed), faiss.swig_ptr(bitmap))
+    if isinstance(idx, faiss.IndexHNSW):
+        params = faiss.SearchParametersHNSW(sel=sel, efSearch=idx.hnsw.efSearch)
+    elif faiss.try_extract_index_ivf(idx) is not None:
+        params = faiss.SearchParametersIVF(sel=sel, nprobe=faiss.try_extract_index_ivf(idx).nprobe)
+    else:
+        params = faiss.SearchParameters(sel=sel)
+    # `bitmap` must outlive the search: the selector only holds a pointer into it
+    return idx.search(q, k, params=params)
@@ -0,0 +1,164 @@
+import hashlib
+import re
+from typing import Any, Dict, List, Optional, Sequence
+import numpy as np
+from src.config.settings import (
+    EMBED_BACKEND, EMBED_MODEL, EMBED_BASE_URL, LOCAL_EMBED_MODEL, LOCAL_EMBED_BATCH_SIZE,
+    LOCAL_EMBED_QUERY_PREFIX, LOCAL_EMBED_PASSAGE_PREFIX, HASH_EMBED_DIM,
+)
+from src.retrieval.embedding import normalize_text, openai_embed_norm
+
+EMBED_BACKENDS = ("openai", "local", "hash")
+
+# Native output width of the OpenAI models this repo has used
+_OPENAI_DIMS = {"text-embedding-3-large": 3072, "text-embedding-3-small": 1536, "text-embedding-ada-002": 1536}
+
+class Embedder:
+    """
+    Text -> L2-normalized float32 vectors, shared by ingestion and the
+    retriever. `embed` is the query path (small, latency-bound batches) and
+    `embed_corpus` the ingestion path (large batches, passage side).
+    `signature()` is recorded in the chunk store manifest so a store is
+    only ever searched with the backend, model and width that built it.
+    """
+
+    backend = "base"
+
+    def __init__(self, model: str, dim: Optional[int] = None):
+        self.model = model
+        self.dim = dim
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        raise NotImplementedError
+
+    def embed_corpus(self, texts: Sequence[str]) -> np.ndarray:
+        return self.embed(texts)
+
+    def signature(self) -> Dict[str, Any]:
+        return {"backend": self.backend, "model": self.model, "dim": self.dim}
+
+class OpenAIEmbedder(Embedder):
+    """
+    OpenAI embeddings API. Queries go through openai_embed_norm on one
+    persistent client (created on first use, then reused so requests do
+    not pay a new connection); ingestion goes through the concurrent,
+    checkpointed EmbeddingEngine.
+    """
+
+    backend = "openai"
+
+    def __init__(self, api_key: Optional[str] = None, client=None, model: str = EMBED_MODEL,
+                 base_url: Optional[str] = EMBED_BASE_URL):
+        super().__init__(model, _OPENAI_DIMS.get(model))
+        self.api_key = api_key
+        self.base_url = base_url
+        self._client = client
+
+    @property
+    def client(self):
+        if self._client is None:
+            from openai import OpenAI
+            self._client = OpenAI(api_key=self.api_key, base_url=self.base_url)
+        return self._client
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        return openai_embed_norm(texts, self.api_key, client=self.client, model=self.model)
+
+    def embed_corpus(self, texts: Sequence[str]) -> np.ndarray:
+        from src.ingestion.embed_engine import EmbeddingEngine
+        return EmbeddingEngine(client=self.client, model=self.model).embed(texts)
+
+class LocalEmbedder(Embedder):
+    """
+    In-process CPU model via sentence-transformers (optional dependency,
+    imported on construction). Inference is batched; query and passage
+    prefixes support instruction-tuned models such as multilingual-e5.
+    """
+
+    backend = "local"
+
+    def __init__(self, model: str = LOCAL_EMBED_MODEL, batch_size: int = LOCAL_EMBED_BATCH_SIZE,
+                 query_prefix: str = LOCAL_EMBED_QUERY_PREFIX, passage_prefix: str = LOCAL_EMBED_PASSAGE_PREFIX,
+                 device: str = "cpu"):
+        try:
+            from sentence_transformers import SentenceTransformer
+        except ImportError as e:
+            raise ImportError(
+                "The local embedding backend needs sentence-transformers: pip install 'singai-ramrag[local]'"
+            ) from e
+        self._model = SentenceTransformer(model, device=device)
+        super().__init__(model, int(self._model.get_sentence_embedding_dimension()))
+        self.batch_size = batch_size
+        self.query_prefix = query_prefix
+        self.passage_prefix = passage_prefix
+
+    def _encode(self, texts: Sequence[str], prefix: str, progress: bool) -> np.ndarray:
+        X = self._model.encode(
+            [prefix + str(t) for t in texts], batch_size=self.batch_size, convert_to_numpy=True,
+            normalize_embeddings=True, show_progress_bar=progress,
+        )
+        return np.asarray(X, dtype=np.float32).reshape(len(texts), self.dim)
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        return self._encode(texts, self.query_prefix, progress=False)
+
+    def embed_corpus(self, texts: Sequence[str]) -> np.ndarray:
+        return self._encode(texts, self.passage_prefix, progress=True)
+
+_TOKEN = re.compile(r"\w+")
+
+class HashEmbedder(Embedder):
+    """
+    Deterministic signed feature hashing of words and character trigrams
+    (so unsegmented zh / ta text still overlaps). No model and no network,
+    for tests and offline runs; lexically similar texts score higher.
+    """
+
+    backend = "hash"
+
+    def __init__(self, dim: int = HASH_EMBED_DIM):
+        super().__init__("feature-hash-v1", dim)
+
+    @staticmethod
+    def _features(text: str) -> List[str]:
+        feats = []
+        for w in _TOKEN.findall(normalize_text(text).lower()):
+            feats.append("w:" + w)
+            padded = f"<{w}>"
+            feats.extend("c:" + padded[i:i + 3] for i in range(len(padded) - 2))
+        return feats
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        X = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for f in self._features(str(text)):
+                h = int.from_bytes(hashlib.blake2b(f.encode("utf-8"), digest_size=8).digest(), "little")
+                X[row, h % self.dim] += 1.0 if h >> 63 else -1.0
+        X /= (np.linalg.norm(X, axis=1, keepdims=True) + 1e-12)
+        return X
+
+def get_embedder(backend: str = EMBED_BACKEND, api_key: Optional[str] = None, **kwargs) -> Embedder:
+    if backend == "openai":
+        return OpenAIEmbedder(api_key=api_key, **kwargs)
+    if backend == "local":
+        return LocalEmbedder(**kwargs)
+    if backend == "hash":
+        return HashEmbedder(**kwargs)
+    raise ValueError(f"Unknown embedding backend {backend!r}; expected one of {EMBED_BACKENDS}")
+
+def check_store_signature(manifest: Dict[str, Any], embedder: Embedder):
+    """
+    Rejects a chunk store built by a different backend, model or width.
+    Stores written before backends existed carry no "backend" and were
+    always built with OpenAI.
+    """
+    if "model" not in manifest:
+        return
+    built = (manifest.get("backend", "openai"), manifest["model"])
+    if built != (embedder.backend, embedder.model):
+        raise ValueError(
+            f"Chunk store was embedded with {built[0]}:{built[1]} but queries would use "
+            f"{embedder.backend}:{embedder.model}; rebuild the index or change EMBED_BACKEND."
+        )
+    if embedder.dim and manifest.get("dim") and int(manifest["dim"]) != embedder.dim:
+        raise ValueError(f"Chunk store dim {manifest['dim']} does not match embedder dim {embedder.dim}.")
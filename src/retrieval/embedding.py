@@ -1,18 +1,209 @@
+import hashlib
+import os
+import re
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional
 import numpy as np
-from tqdm.auto import tqdm
-from openai import OpenAI
-from src.config.settings import EMBED_MODEL
+from src.config.settings import EMBED_MODEL, EMBED_CACHE_SIZE
 
-def openai_embed_norm(texts, api_key, batch_size=128):
-    client = OpenAI(api_key=api_key)
-    vecs = []
+_WS = re.compile(r"\s+")
+
+def normalize_text(text: str) -> str:
+    """Cache-key normalization: NFKC plus collapsed whitespace (case is kept)."""
+    return _WS.sub(" ", unicodedata.normalize("NFKC", str(text))).strip()
+
+class EmbeddingCache:
+    """
+    Bounded LRU of normalized embeddings keyed on model + normalized text.
+
+    If `path` is given, every vector is also appended to an on-disk store
+    (`<path>.f32`, raw float32 rows, memory-mapped for reads, plus
+    `<path>.keys`, one key per row) so the cache survives restarts. Disk
+    hits are promoted into the in-memory LRU. Safe to share between threads
+    of one process; the disk store supports a single writing process.
+    """
+
+    def __init__(self, path: Optional[str] = None, max_items: int = EMBED_CACHE_SIZE, model: str = EMBED_MODEL):
+        self.path = path
+        self.max_items = max_items
+        self.model = model
+        self.dim: Optional[int] = None
+        self._lru: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._disk_rows: Dict[str, int] = {}
+        self._disk_vecs: Optional[np.memmap] = None
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        if path:
+            self._open_disk()
+
+    def key(self, text: str) -> str:
+        return hashlib.sha1(f"{self.model}\x00{normalize_text(text)}".encode("utf-8")).hexdigest()
+
+    # --- disk store ---
+    def _open_disk(self):
+        keys_path, vec_path = f"{self.path}.keys", f"{self.path}.f32"
+        if not os.path.exists(keys_path):
+            return
+        with open(keys_path, "r", encoding="utf-8") as f:
+            header = f.readline().strip()
+            keys = [line.strip() for line in f if line.strip()]
+        if not header.startswith("# dim="):
+            raise ValueError(f"Corrupt embedding cache header in {keys_path}")
+        self.dim = int(header.split("=", 1)[1])
+        n_vecs = os.path.getsize(vec_path) // (4 * self.dim) if os.path.exists(vec_path) else 0
+        # A crash between the two appends leaves at most one unpaired row; drop it.
+        keys = keys[:n_vecs]
+        self._disk_rows = {k: i for i, k in enumerate(keys)}
+        self._map_disk(len(keys))
+
+    def _map_disk(self, n_rows: int):
+        self._disk_vecs = None
+        if n_rows:
+            self._disk_vecs = np.memmap(f"{self.path}.f32", dtype=np.float32, mode="r", shape=(n_rows, self.dim))
+
+    def _append_disk(self, key: str, vec: np.ndarray):
+        keys_path = f"{self.path}.keys"
+        if not os.path.exists(keys_path):
+            os.makedirs(os.path.dirname(os.path.abspath(keys_path)), exist_ok=True)
+            with open(keys_path, "w", encoding="utf-8") as f:
+                f.write(f"# dim={self.dim}\n")
+        row = len(self._disk_rows)
+        # Vector first, then key: a key on disk always has its row.
+        with open(f"{self.path}.f32", "r+b" if os.path.exists(f"{self.path}.f32") else "wb") as f:
+            f.seek(row * 4 * self.dim)
+            f.write(np.ascontiguousarray(vec, dtype=np.float32).tobytes())
+            f.truncate()
+        with open(keys_path, "a", encoding="utf-8") as f:
+            f.write(key + "\n")
+        self._disk_rows[key] = row
+        self._disk_vecs = None  # remapped lazily on next disk read
+
+    # --- public API ---
+    def get(self, text: str) -> Optional[np.ndarray]:
+        k = self.key(text)
+        with self._lock:
+            return self._get(k)
+
+    def _get(self, k: str) -> Optional[np.ndarray]:
+        vec = self._lru.get(k)
+        if vec is not None:
+            self._lru.move_to_end(k)
+            self.hits += 1
+            return vec
+        row = self._disk_rows.get(k)
+        if row is not None:
+            if self._disk_vecs is None or row >= self._disk_vecs.shape[0]:
+                self._map_disk(len(self._disk_rows))
+            vec = np.array(self._disk_vecs[row])
+            self._remember(k, vec)
+            self.hits += 1
+            self.disk_hits += 1
+            return vec
+        self.misses += 1
+        return None
+
+    def put(self, text: str, vec: np.ndarray):
+        k = self.key(text)
+        vec = np.asarray(vec, dtype=np.float32)
+        with self._lock:
+            self._put(k, vec)
+
+    def _put(self, k: str, vec: np.ndarray):
+        if self.dim is None:
+            self.dim = int(vec.shape[0])
+        elif vec.shape[0] != self.dim:
+            self._discard(int(vec.shape[0]))
+        self._remember(k, vec)
+        if self.path and k not in self._disk_rows:
+            self._append_disk(k, vec)
+
+    def _discard(self, dim: int):
+        """
+        Drops every cached vector, on disk too, and restarts at `dim`: the
+        embedder changed width, so nothing cached can be served.
+        """
+        print(f"Embedding cache dim {self.dim} does not match new embeddings ({dim}); discarding the cache.")
+        self._lru.clear()
+        self._disk_rows = {}
+        self._disk_vecs = None
+        if self.path:
+            for suffix in (".keys", ".f32"):
+                if os.path.exists(self.path + suffix):
+                    os.remove(self.path + suffix)
+        self.dim = dim
+
+    def _remember(self, k: str, vec: np.ndarray):
+        self._lru[k] = vec
+        self._lru.move_to_end(k)
+        while len(self._lru) > self.max_items:
+            self._lru.popitem(last=False)
+            self.evictions += 1
+
+    def stats(self) -> Dict[str, float]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "memory_items": len(self._lru),
+            "disk_items": len(self._disk_rows),
+        }
+
+def embed_with_cache(embed_fn: Callable[[List[str]], np.ndarray], texts, cache: EmbeddingCache) -> np.ndarray:
+    """
+    Looks every text up in `cache` and calls `embed_fn` once for the
+    misses, with one entry per distinct key (texts differing only in
+    whitespace share a request). Fresh vectors are added to the cache. If
+    they have a new width, hits cached at the old one are embedded again.
+    """
+    texts = [str(x) for x in texts]
+    found: List[Optional[np.ndarray]] = [cache.get(t) for t in texts]
+    missing: Dict[str, str] = {}
+    for t, v in zip(texts, found):
+        if v is None:
+            missing.setdefault(cache.key(t), t)
+    if missing:
+        fresh = embed_fn(list(missing.values()))
+        fresh_by_key = dict(zip(missing.keys(), fresh))
+        for k, t in missing.items():
+            cache.put(t, fresh_by_key[k])
+        if any(v is not None and v.shape[0] != fresh.shape[1] for v in found):
+            # The embedder changed width and the cache was discarded; the old hits are embedded again
+            return embed_with_cache(embed_fn, texts, cache)
+        found = [v if v is not None else fresh_by_key[cache.key(t)] for t, v in zip(texts, found)]
+    if not found:
+        return np.array([], dtype=np.float32)
+    return np.vstack(found).astype(np.float32, copy=False)
+
+def openai_embed_norm(texts, api_key, batch_size=128, cache: Optional[EmbeddingCache] = None, client=None,
+                      model: str = EMBED_MODEL):
     # Ensure texts are strings
     texts = [str(x) for x in texts]
-    
+
+    if cache is not None:
+        return embed_with_cache(
+            lambda misses: openai_embed_norm(misses, api_key, batch_size=batch_size, client=client, model=model),
+            texts, cache,
+        )
+
+    # Imported here: they are slow to import and only needed once a batch is sent
+    from tqdm.auto import tqdm
+    if client is None:
+        from openai import OpenAI
+        client = OpenAI(api_key=api_key)
+    vecs = []
+
     for i in tqdm(range(0, len(texts), batch_size), desc="Embedding"):
         batch = texts[i:i+batch_size]
         try:
-            resp = client.embeddings.create(model=EMBED_MODEL, input=batch)
+            resp = client.embeddings.create(model=model, input=batch)
             X = np.array([d.embedding for d in resp.data], dtype=np.float32)
             # Normalize
             X /= (np.linalg.norm(X, axis=1, keepdims=True) + 1e-12)
@@ -20,8 +211,8 @@ def openai_embed_norm(texts, api_key, batch_size=128):
         except Exception as e:
             print(f"Error embedding batch {i}: {e}")
             raise e
-            
+
     if not vecs:
         return np.array([], dtype=np.float32)
-        
+
     return np.vstack(vecs)
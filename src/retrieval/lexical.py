@@ -0,0 +1,95 @@
+import re
+from collections import Counter
+from typing import Dict, List, Optional, Sequence, Tuple
+import numpy as np
+from src.config.settings import LEXICAL_CHAR_NGRAMS, BM25_K1, BM25_B
+from src.retrieval.embedding import normalize_text
+
+_TOKEN = re.compile(r"\w+")
+
+def tokenize(text: str, lang: str) -> List[str]:
+    """
+    Lower-cased word tokens. Languages in LEXICAL_CHAR_NGRAMS (no word
+    spacing, or long agglutinative words) are split into character n-grams
+    of each run instead; runs shorter than n are kept whole.
+    """
+    words = _TOKEN.findall(normalize_text(text).casefold())
+    n = LEXICAL_CHAR_NGRAMS.get(lang)
+    if not n:
+        return words
+    grams = []
+    for w in words:
+        if len(w) > n:
+            grams.extend(w[i:i + n] for i in range(len(w) - n + 1))
+        else:
+            grams.append(w)
+    return grams
+
+class BM25Index:
+    """
+    Okapi BM25 over one partition's chunks. Postings are stored
+    term-major as flat arrays with each posting's BM25 weight precomputed,
+    so a query costs one gather plus one bincount over the postings of its
+    terms.
+    """
+
+    def __init__(self, docs: Sequence[Sequence[str]], k1: float = BM25_K1, b: float = BM25_B):
+        self.vocab: Dict[str, int] = {}
+        terms, doc_ids, tfs = [], [], []
+        doc_len = np.zeros(len(docs), dtype=np.float32)
+        for d, tokens in enumerate(docs):
+            doc_len[d] = len(tokens)
+            for term, tf in Counter(tokens).items():
+                terms.append(self.vocab.setdefault(term, len(self.vocab)))
+                doc_ids.append(d)
+                tfs.append(tf)
+        terms = np.asarray(terms, dtype=np.int64)
+        order = np.argsort(terms, kind="stable")
+        self.n_docs = len(docs)
+        self.doc_ids = np.asarray(doc_ids, dtype=np.int64)[order]
+        self.indptr = np.concatenate([[0], np.cumsum(np.bincount(terms, minlength=len(self.vocab)))])
+
+        df = np.diff(self.indptr).astype(np.float32)
+        self.idf = np.log1p((self.n_docs - df + 0.5) / (df + 0.5)).astype(np.float32)
+        tf = np.asarray(tfs, dtype=np.float32)[order]
+        norm = k1 * (1 - b + b * doc_len[self.doc_ids] / max(float(doc_len.mean()) if len(docs) else 0.0, 1e-6))
+        self.weights = (np.repeat(self.idf, np.diff(self.indptr)) * tf * (k1 + 1) / (tf + norm)).astype(np.float32)
+
+    def _term_ids(self, tokens: Sequence[str]) -> np.ndarray:
+        return np.unique([self.vocab[t] for t in tokens if t in self.vocab]).astype(np.int64)
+
+    def search(self, tokens: Sequence[str], k: int,
+               allowed: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Top-k (scores, local ids), best first; only documents sharing a term
+        (and, with the bool mask `allowed`, only allowed ones) are returned.
+        """
+        tids = self._term_ids(tokens)
+        if not len(tids) or not self.n_docs:
+            return np.zeros(0, dtype=np.float32), np.zeros(0, dtype=np.int64)
+        postings = np.concatenate([np.arange(self.indptr[t], self.indptr[t + 1]) for t in tids])
+        scores = np.bincount(self.doc_ids[postings], weights=self.weights[postings], minlength=self.n_docs)
+        if allowed is not None:
+            scores = np.where(allowed, scores, 0.0)
+        k = min(k, int(np.count_nonzero(scores)))
+        if k <= 0:
+            return np.zeros(0, dtype=np.float32), np.zeros(0, dtype=np.int64)
+        top = np.argpartition(-scores, k - 1)[:k] if k < self.n_docs else np.arange(self.n_docs)
+        top = top[np.argsort(-scores[top], kind="stable")][:k]
+        return scores[top].astype(np.float32), top.astype(np.int64)
+
+    def coverage(self, tokens: Sequence[str], local_id: int) -> float:
+        """IDF-weighted share of the query's distinct terms that occur in the document (0..1)."""
+        wanted = set(tokens)
+        if not wanted:
+            return 0.0
+        total = sum(float(self.idf[self.vocab[t]]) if t in self.vocab else float(np.log1p(self.n_docs + 0.5))
+                    for t in wanted)
+        found = 0.0
+        for tid in self._term_ids(list(wanted)):
+            # Postings of a term are in document order
+            docs = self.doc_ids[self.indptr[tid]:self.indptr[tid + 1]]
+            pos = int(np.searchsorted(docs, local_id))
+            if pos < len(docs) and docs[pos] == local_id:
+                found += float(self.idf[tid])
+        return found / total if total > 0 else 0.0
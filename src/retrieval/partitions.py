@@ -0,0 +1,214 @@
+import hashlib
+import json
+import os
+import re
+import shutil
+import uuid
+from typing import Any, Dict, Iterable, Optional, Tuple
+import numpy as np
+from src.config.settings import INDEX_SNAPSHOT_DIR, INDEX_SNAPSHOT_KEEP, SHARD_BY
+
+# faiss is only imported by the functions that build or read indexes, so
+# importing the retriever stays cheap and the first partition load pays it.
+
+SNAPSHOT_FORMAT = 1
+SHARD_TYPES = ("lang", "lang_region")
+_MANIFEST = "manifest.json"
+_LEASE_PREFIX = ".lease-"
+
+def truncate_vectors(vecs: np.ndarray, dim: Optional[int]) -> np.ndarray:
+    """
+    Matryoshka truncation: keeps the first `dim` components and
+    re-normalizes, so inner products are still cosines. A `dim` of None or
+    >= the full width returns float32 vectors unchanged.
+    """
+    vecs = np.asarray(vecs, dtype=np.float32)
+    if not dim or dim >= vecs.shape[-1]:
+        return vecs
+    out = np.array(vecs[..., :dim], dtype=np.float32)
+    out /= np.linalg.norm(out, axis=-1, keepdims=True) + 1e-12
+    return out
+
+def shard_key(lang: str, region: Optional[str] = None) -> str:
+    """Partition key: the chunk language, plus ":region" for region shards."""
+    return lang if region is None else f"{lang}:{region}"
+
+def shard_lang(key: str) -> str:
+    return key.split(":", 1)[0]
+
+def shard_region(key: str) -> Optional[str]:
+    """Region of a region shard ("" for chunks without one); None for language-only partitions."""
+    return key.split(":", 1)[1] if ":" in key else None
+
+def partition_rows(chunk_meta, shard_by: str = SHARD_BY) -> Dict[str, np.ndarray]:
+    """
+    Store rows of every partition, keyed by shard_key(). Tombstoned rows
+    are never searchable.
+    """
+    import pyarrow.compute as pc
+    if shard_by not in SHARD_TYPES:
+        raise ValueError(f"Unknown shard layout {shard_by!r}; expected one of {SHARD_TYPES}")
+    chunk_langs = pc.fill_null(chunk_meta.column("lang"), "").to_numpy().astype(str)
+    if "deleted" in chunk_meta.column_names:
+        deleted = pc.fill_null(chunk_meta.column("deleted"), False).to_numpy()
+        chunk_langs = np.where(deleted, "", chunk_langs)
+    keys = chunk_langs
+    if shard_by == "lang_region":
+        regions = pc.fill_null(chunk_meta.column("region"), "").to_numpy().astype(str)
+        # ":" separates the two parts of a key
+        keys = np.char.add(np.char.add(chunk_langs, ":"), np.char.replace(regions, ":", "_"))
+        keys = np.where(chunk_langs == "", "", keys)
+    return {
+        str(key): np.where(keys == key)[0].astype(np.int64)
+        for key in np.unique(keys) if key
+    }
+
+def build_partition(vecs: np.ndarray, index_type: str, storage: str, vector_dim: Optional[int]):
+    """
+    Builds one partition index. Returns (index, exact); exact is False when
+    its scores are approximate (compact storage, truncation or IVF-PQ) and
+    candidates must be re-scored against the full vectors.
+    """
+    from src.retrieval.ann import build_ann_index, index_kind
+    truncated = bool(vector_dim) and vector_dim < vecs.shape[1]
+    idx = build_ann_index(truncate_vectors(vecs, vector_dim), index_type, storage=storage)
+    return idx, not truncated and storage == "float32" and index_kind(idx) != "ivf_pq"
+
+def snapshot_config(store_manifest: Dict[str, Any], store_rows: int, index_type: str, storage: str,
+                    vector_dim: Optional[int], shard_by: str = SHARD_BY) -> Dict[str, Any]:
+    """
+    What a snapshot must have been built from to be reused as-is. The
+    store's build_id ties it to one write of the store, so a rebuild that
+    lands on the same version and row count still gets a new snapshot.
+    """
+    return {
+        "format": SNAPSHOT_FORMAT,
+        "store_version": store_manifest.get("version"),
+        "store_build": store_manifest.get("build_id"),
+        "backend": store_manifest.get("backend", "openai"),
+        "model": store_manifest.get("model"),
+        "dim": store_manifest.get("dim"),
+        "store_rows": int(store_rows),
+        "index_type": index_type,
+        "storage": storage,
+        "vector_dim": vector_dim,
+        "shard_by": shard_by,
+    }
+
+def snapshot_name(config: Dict[str, Any]) -> str:
+    digest = hashlib.sha1(json.dumps(config, sort_keys=True).encode("utf-8")).hexdigest()[:10]
+    return f"v{config['store_version'] or 0:06d}-{digest}"
+
+def _file_stem(i: int, key: str) -> str:
+    # The position keeps stems unique once keys are sanitized
+    return f"{i:04d}-" + re.sub(r"[^\w.-]", "_", key)
+
+def write_snapshot(config: Dict[str, Any], partitions: Iterable[Tuple[str, Tuple[Any, np.ndarray, bool]]],
+                   root: str = INDEX_SNAPSHOT_DIR, keep: int = INDEX_SNAPSHOT_KEEP) -> str:
+    """
+    Serializes (partition key, (index, store rows, exact)) pairs with
+    faiss.write_index into `root/<snapshot_name(config)>/`. `partitions`
+    may be a generator: each index is written and released before the
+    next is taken, so only one is held at a time (and none are built when
+    the snapshot already exists). The directory is renamed into place once
+    complete, so readers never see a partial snapshot. Only the `keep`
+    newest snapshots are kept, plus older ones a live process still holds a
+    lease on (see lease_snapshot()), since its partitions are loaded lazily.
+    """
+    import faiss
+    from src.retrieval.ann import index_kind
+    final = os.path.join(root, snapshot_name(config))
+    if os.path.exists(os.path.join(final, _MANIFEST)):
+        return final
+    tmp = os.path.join(root, f".tmp-{os.path.basename(final)}-{os.getpid()}")
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+
+    entries = {}
+    for i, (lang, (idx, rows, exact)) in enumerate(partitions):
+        stem = _file_stem(i, lang)
+        faiss.write_index(idx, os.path.join(tmp, f"{stem}.faiss"))
+        np.save(os.path.join(tmp, f"{stem}.ids.npy"), np.asarray(rows, dtype=np.int64))
+        entries[lang] = {"file": stem, "rows": int(len(rows)), "kind": index_kind(idx), "exact": bool(exact)}
+        del idx, rows
+    with open(os.path.join(tmp, _MANIFEST), "w", encoding="utf-8") as f:
+        json.dump({"config": config, "partitions": entries}, f, indent=2)
+    os.replace(tmp, final)
+
+    snapshots = sorted(
+        (d for d in os.listdir(root) if d.startswith("v") and os.path.isdir(os.path.join(root, d))),
+        key=lambda d: os.path.getmtime(os.path.join(root, d)), reverse=True,
+    )
+    for old in snapshots[max(1, keep):]:
+        if not _leased(os.path.join(root, old)):
+            shutil.rmtree(os.path.join(root, old), ignore_errors=True)
+    return final
+
+def lease_snapshot(path: str) -> str:
+    """
+    Marks the snapshot at `path` as in use by this process, so
+    write_snapshot() does not prune it while partitions may still be
+    loaded from it. Returns the lease file to pass to release_snapshot().
+    Raises FileNotFoundError if the snapshot is already gone.
+    """
+    lease = os.path.join(path, f"{_LEASE_PREFIX}{os.getpid()}-{uuid.uuid4().hex[:8]}")
+    with open(lease, "x", encoding="utf-8"):
+        pass
+    return lease
+
+def release_snapshot(lease: str):
+    try:
+        os.remove(lease)
+    except FileNotFoundError:
+        pass
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+def _leased(path: str) -> bool:
+    """Whether a live process holds a lease on the snapshot. Leases left by exited processes are removed."""
+    leased = False
+    for name in os.listdir(path):
+        if not name.startswith(_LEASE_PREFIX):
+            continue
+        try:
+            pid = int(name[len(_LEASE_PREFIX):].split("-", 1)[0])
+        except ValueError:
+            continue
+        if _pid_alive(pid):
+            leased = True
+        else:
+            release_snapshot(os.path.join(path, name))
+    return leased
+
+def find_snapshot(config: Dict[str, Any], root: str = INDEX_SNAPSHOT_DIR) -> Optional[Tuple[str, Dict[str, Any]]]:
+    """(snapshot dir, manifest) of the snapshot built from exactly `config`, if any."""
+    path = os.path.join(root, snapshot_name(config))
+    try:
+        with open(os.path.join(path, _MANIFEST), "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return (path, manifest) if manifest.get("config") == config else None
+
+def load_partition(path: str, entry: Dict[str, Any]):
+    """
+    Reads one partition of a snapshot as (index, store rows). Index codes
+    and the row array are memory-mapped where faiss supports it, so
+    untouched pages stay on disk and are shared between processes.
+    """
+    import faiss
+    index_file = os.path.join(path, f"{entry['file']}.faiss")
+    mmap = faiss.IO_FLAG_MMAP if entry["kind"] in ("ivf_flat", "ivf_pq") else faiss.IO_FLAG_MMAP_IFC
+    try:
+        idx = faiss.read_index(index_file, mmap | faiss.IO_FLAG_READ_ONLY)
+    except RuntimeError:
+        idx = faiss.read_index(index_file)
+    rows = np.load(os.path.join(path, f"{entry['file']}.ids.npy"), mmap_mode="r")
+    return idx, rows
@@ -1,109 +1,560 @@
-import pandas as pd
+import math
+import re
+import threading
+import weakref
 import numpy as np
-import faiss
-import os
-from src.config.settings import LANG_SCOPE_MAP, META_PATH, CHUNK_VEC_DIR
-from src.retrieval.embedding import openai_embed_norm
+import pyarrow as pa
+from typing import Any, Dict, List, Optional, Tuple
+from src.config.settings import (
+    LANG_SCOPE_MAP, CHUNK_STORE_PATH, EMBED_CACHE_PATH, INDEX_TYPE, VECTOR_STORAGE, VECTOR_DIM, RESCORE_FACTOR,
+    INDEX_SNAPSHOT_DIR, SHARD_BY, LEXICAL_MODE, LEXICAL_CANDIDATES, RRF_K,
+    LEXICAL_FASTPATH_COVERAGE, LEXICAL_FASTPATH_MIN_TERMS, LEXICAL_FASTPATH_MARGIN,
+)
+from src.retrieval.embedding import embed_with_cache, EmbeddingCache
+from src.retrieval.embedders import Embedder, get_embedder, check_store_signature
+from src.retrieval.partitions import (
+    truncate_vectors, partition_rows, build_partition, snapshot_config, snapshot_name, find_snapshot, load_partition,
+    lease_snapshot, release_snapshot, shard_lang, shard_region, SHARD_TYPES,
+)
+from src.retrieval.lexical import BM25Index, tokenize
+from src.ingestion.chunk_store import ALIAS_COLUMNS, open_chunk_store, split_vectors, take_vectors
+from src.telemetry import Metrics, Trace, optional_trace
+
+# faiss (via src.retrieval.ann) is imported when a partition is first built or
+# loaded, not with this module.
+
+def lexical_matches(scores: np.ndarray) -> np.ndarray:
+    """Rows of search() scores answered by the lexical fast path: NaN, no query cosine was computed."""
+    return np.isnan(np.atleast_2d(scores)[:, 0])
 
 class RiskAwareRetriever:
-    def __init__(self, api_key: str):
+    def __init__(
+        self,
+        api_key: str,
+        query_cache: Optional[EmbeddingCache] = None,
+        index_type: str = INDEX_TYPE,
+        storage: str = VECTOR_STORAGE,
+        vector_dim: Optional[int] = VECTOR_DIM,
+        rescore_factor: int = RESCORE_FACTOR,
+        embedder: Optional[Embedder] = None,
+        metrics: Optional[Metrics] = None,
+        snapshot_root: Optional[str] = INDEX_SNAPSHOT_DIR,
+        attach_only: bool = False,
+        lexical_mode: str = LEXICAL_MODE,
+        shard_by: str = SHARD_BY,
+    ):
         self.api_key = api_key
-        self.chunk_meta_df = None
-        self.chunk_vecs = None
-        self.lang_indices = {}
-        self.lang_scopes = {}
-        
+        self.metrics = metrics
+        self.embedder = embedder if embedder is not None else get_embedder(api_key=api_key)
+        self.index_type = index_type
+        self.storage = storage
+        self.vector_dim = vector_dim
+        self.rescore_factor = rescore_factor
+        if lexical_mode not in ("off", "hybrid"):
+            raise ValueError(f"Unknown lexical mode {lexical_mode!r}; expected 'off' or 'hybrid'")
+        self.lexical_mode = lexical_mode
+        if shard_by not in SHARD_TYPES:
+            raise ValueError(f"Unknown shard layout {shard_by!r}; expected one of {SHARD_TYPES}")
+        self.shard_by = shard_by
+        # Where ingestion writes index snapshots; None always builds in memory
+        self.snapshot_root = snapshot_root
+        # Serving workers only attach to a published snapshot; building a
+        # private copy of every partition per process is an error there.
+        self.attach_only = attach_only
+        # Repeated customer questions skip the embedding round trip
+        if query_cache is None:
+            # One store per backend, model and width, so switching any of them never mixes vectors
+            signature = f"{self.embedder.backend}_{self.embedder.model}_{self.embedder.dim or 'native'}"
+            cache_path = EMBED_CACHE_PATH + "." + re.sub(r"\W+", "_", signature)
+            query_cache = EmbeddingCache(cache_path, model=self.embedder.model)
+        self.query_cache = query_cache
+        # Memory-mapped Arrow metadata (no vectors); text pages are only
+        # touched when a hit is materialized.
+        self.chunk_meta: Optional[pa.Table] = None
+        self.store_manifest = {}
+        self.dim = 0
+        self._store: Optional[pa.Table] = None
+        self._chunk_vecs: Optional[np.ndarray] = None
+        # One index per shard (chunk language, or language and region; see
+        # src/retrieval/partitions.py): every vector is stored exactly once.
+        # With a snapshot these fill in as shards are first searched.
+        self.partitions: Dict[str, Any] = {}
+        self.partition_ids: Dict[str, np.ndarray] = {}
+        # False where partition scores are approximate and need re-scoring
+        self.partition_exact: Dict[str, bool] = {}
+        # Query language -> partitions it searches (from LANG_SCOPE_MAP)
+        self.lang_scopes: Dict[str, List[str]] = {}
+        # Runs dense partition searches elsewhere (e.g. shards.ProcessPoolTransport); None = in-process
+        self.transport = None
+        self.snapshot_dir: Optional[str] = None
+        self.index_version = ""
+        self._snapshot_parts: Dict[str, Dict[str, Any]] = {}
+        # Keeps write_snapshot() from pruning the snapshot while partitions are still to be loaded
+        self._snapshot_lease: Optional[weakref.finalize] = None
+        self._search_params: Dict[str, int] = {}
+        self._load_lock = threading.Lock()
+        # (partition, region) -> bool mask of the partition's rows that region may see (shard_by="lang")
+        self._region_masks: Dict[Tuple[str, str], np.ndarray] = {}
+        # Per-language BM25 (lexical_mode="hybrid") and the store rows it covers, built on first use
+        self.lexical: Dict[str, BM25Index] = {}
+        self.lexical_rows: Dict[str, np.ndarray] = {}
+        self.lexical_stats = {"fast_path": 0, "fused": 0}
+        self._lexical_lock = threading.Lock()
+
         self.load_resources()
 
     def load_resources(self):
-        # Load Metadata
-        if not os.path.exists(META_PATH):
-            raise FileNotFoundError(f"Metadata file {META_PATH} not found. Run ingestion first.")
-        
-        print("Loading metadata...")
-        self.chunk_meta_df = pd.read_parquet(META_PATH)
-        
-        # Load Vectors (In a real scenario, these would be loaded from disk or re-computed)
-        # For this setup, we assume they need to be computed or loaded.
-        # The notebook computed them in memory.
-        # To make this persistent, we should check if they exist.
-        
-        vec_path = os.path.join(CHUNK_VEC_DIR, "chunk_vecs.npy")
-        if os.path.exists(vec_path):
-             print(f"Loading vectors from {vec_path}...")
-             self.chunk_vecs = np.load(vec_path)
-        else:
-             print("Vectors not found on disk. In a production system, these should be persisted.")
-             print("Re-computing vectors for all chunks (this may take time/cost)...")
-             # NOTE: This is dangerous if the index is huge.
-             # Ideally we load from keys.
-             # For the purpose of this repo structure, we'll provide a placeholder or re-compute.
-             # We'll re-compute using the helper.
-             texts = self.chunk_meta_df["chunk_text"].tolist()
-             self.chunk_vecs = openai_embed_norm(texts, self.api_key)
-             np.save(vec_path, self.chunk_vecs)
-
-        self.build_indices()
+        # Vectors, text and metadata come from the single chunk store written by
+        # ingestion; nothing is re-embedded here. The store is only mapped:
+        # metadata stays as Arrow columns over the mapping and vectors are
+        # resolved when something needs them (building, re-scoring).
+        print(f"Loading chunk store from {CHUNK_STORE_PATH}...")
+        self._store, self.store_manifest = open_chunk_store(CHUNK_STORE_PATH)
+        check_store_signature(self.store_manifest, self.embedder)
+        self.chunk_meta = self._store.drop_columns(["vector"])
+        self.dim = self._store.schema.field("vector").type.list_size
+
+        config = snapshot_config(self.store_manifest, self._store.num_rows,
+                                 self.index_type, self.storage, self.vector_dim, self.shard_by)
+        # Changes whenever the store or anything shaping search results does;
+        # result caches key on it.
+        self.index_version = snapshot_name(config) + (f"-{self.lexical_mode}" if self.lexical_mode != "off" else "")
+        found = find_snapshot(config, self.snapshot_root) if self.snapshot_root else None
+        if self._snapshot_lease is not None:
+            self._snapshot_lease()
+            self._snapshot_lease = None
+        if found is not None:
+            try:
+                lease = lease_snapshot(found[0])
+            except FileNotFoundError:
+                # Pruned between finding and leasing it
+                found = None
+            else:
+                self._snapshot_lease = weakref.finalize(self, release_snapshot, lease)
+        if found is None:
+            if self.attach_only:
+                raise FileNotFoundError(
+                    f"No index snapshot under {self.snapshot_root} for chunk store "
+                    f"v{self.store_manifest.get('version')} and these index settings. "
+                    "Run ingestion or src.serving.publish() first."
+                )
+            self.build_indices()
+            return
+        # Prebuilt partitions from ingestion: only the manifest is read now,
+        # each index is mapped the first time its language is searched.
+        self.snapshot_dir, manifest = found
+        self._snapshot_parts = manifest["partitions"]
+        self.partition_exact = {lang: entry["exact"] for lang, entry in self._snapshot_parts.items()}
+        self._resolve_scopes(self._snapshot_parts)
+        print(f"Using index snapshot {self.snapshot_dir} ({len(self._snapshot_parts)} partitions, loaded on first use)")
+
+    @property
+    def chunk_vecs(self) -> np.ndarray:
+        """[rows, dim] float32 store vectors, a view of the mapped store where possible."""
+        if self._chunk_vecs is None:
+            self._chunk_vecs = split_vectors(self._store)[1]
+        return self._chunk_vecs
 
     def build_indices(self):
-        print("Building language-scoped indices...")
-        dim = self.chunk_vecs.shape[1]
-        chunk_langs = self.chunk_meta_df["lang"].fillna("").astype(str).to_numpy()
-        
-        # We build indices for known languages in the scope map, plus generally
+        """
+        Partitions the vectors by chunk language instead of copying them into
+        one index per query language. A query searches every partition in its
+        LANG_SCOPE_MAP scope and the per-partition hits are merged, which gives
+        the same top-k as a flat index over the whole scope. Each partition's
+        index type comes from `index_type` (see src/retrieval/ann.py).
+
+        Partitions may hold compact vectors (`storage` float16/int8 and/or
+        Matryoshka-truncated to `vector_dim`). Their candidates are re-scored
+        against the full-precision store vectors, so returned scores remain
+        exact cosines and Gate-A's threshold stays calibrated.
+
+        Used when no matching snapshot was written at ingestion (see
+        src/retrieval/partitions.py).
+        """
+        print("Building language partitions...")
+        for lang, global_idxs in partition_rows(self.chunk_meta, self.shard_by).items():
+            idx, exact = build_partition(self.chunk_vecs[global_idxs], self.index_type, self.storage, self.vector_dim)
+            self.partitions[lang] = idx
+            self.partition_ids[lang] = global_idxs
+            self.partition_exact[lang] = exact
+        if self.lexical_mode != "off":
+            for lang in self.partitions:
+                self._lexical_index(lang)
+        self._resolve_scopes(self.partitions)
+
+    def _resolve_scopes(self, available):
+        # Partition keys per chunk language (several with region shards)
+        by_lang: Dict[str, List[str]] = {}
+        for key in sorted(available):
+            by_lang.setdefault(shard_lang(key), []).append(key)
+
+        # We resolve scopes for known languages in the scope map, plus generally
         unique_langs = set(LANG_SCOPE_MAP.keys())
-        unique_langs.update(chunk_langs)
-        
+        unique_langs.update(by_lang)
+
         for q_lang in unique_langs:
-            if not q_lang: continue
-            
             # Get valid target languages for this query language
-            scope_langs = LANG_SCOPE_MAP.get(q_lang, [q_lang])
-            
-            # Filter chunks
-            global_idxs = np.where(np.isin(chunk_langs, scope_langs))[0].astype(np.int64)
-            
-            if len(global_idxs) == 0:
-                continue
-                
-            idx = faiss.IndexFlatIP(dim)
-            idx.add(self.chunk_vecs[global_idxs])
-            
-            self.lang_indices[q_lang] = idx
-            self.lang_scopes[q_lang] = global_idxs
-            
-    def retrieve(self, query: str, lang: str = "en", top_k: int = 5):
-        # Embed query
-        q_vec = openai_embed_norm([query], self.api_key)[0].reshape(1, -1)
-        
-        # Select index
-        idx = self.lang_indices.get(lang)
-        scope_idxs = self.lang_scopes.get(lang)
-        
+            scope_keys = [key for l in LANG_SCOPE_MAP.get(q_lang, [q_lang]) for key in by_lang.get(l, [])]
+            if scope_keys:
+                self.lang_scopes[q_lang] = scope_keys
+
+    def _partition(self, lang: str) -> Tuple[Any, np.ndarray]:
+        """(index, store rows) of a partition, mapping it from the snapshot on first use."""
+        idx = self.partitions.get(lang)
         if idx is None:
-            # Fallback to English or all?
-            # For now, simplistic fallback to first available or error
-            if "en" in self.lang_indices:
-                idx = self.lang_indices["en"]
-                scope_idxs = self.lang_scopes["en"]
+            with self._load_lock:
+                idx = self.partitions.get(lang)
+                if idx is None:
+                    from src.retrieval.ann import set_search_params
+                    idx, rows = load_partition(self.snapshot_dir, self._snapshot_parts[lang])
+                    set_search_params(idx, **self._search_params)
+                    self.partition_ids[lang] = rows
+                    self.partitions[lang] = idx
+        return idx, self.partition_ids[lang]
+
+    def _lexical_index(self, key: str) -> Tuple[BM25Index, np.ndarray]:
+        """
+        (BM25, store rows) over the chunk text of a partition's language,
+        tokenized for that language. Region shards of a language share one
+        index, so BM25 statistics (and hybrid rankings) do not depend on the
+        shard layout; region searches filter it with _region_mask().
+        """
+        lang = shard_lang(key)
+        bm25 = self.lexical.get(lang)
+        if bm25 is None:
+            shards = [k for k in self.partition_exact if shard_lang(k) == lang]
+            rows = np.sort(np.concatenate([self._partition(k)[1] for k in shards]))
+            with self._lexical_lock:
+                bm25 = self.lexical.get(lang)
+                if bm25 is None:
+                    texts = self.chunk_meta.column("chunk_text").take(pa.array(rows, type=pa.int64())).to_pylist()
+                    self.lexical_rows[lang] = rows
+                    bm25 = self.lexical[lang] = BM25Index([tokenize(t or "", lang) for t in texts])
+        return bm25, self.lexical_rows[lang]
+
+    def warm(self, langs: Optional[List[str]] = None):
+        """Loads the partitions searched by `langs` (default: all) ahead of the first query."""
+        targets = self.partition_exact.keys() if langs is None else {p for l in langs for p in self._resolve_scope(l)}
+        for lang in targets:
+            self._partition(lang)
+            if self.lexical_mode != "off":
+                self._lexical_index(lang)
+
+    def set_search_params(self, nprobe: Optional[int] = None, ef_search: Optional[int] = None):
+        """Retunes IVF nprobe / HNSW efSearch on every partition without rebuilding."""
+        from src.retrieval.ann import set_search_params
+        with self._load_lock:
+            self._search_params.update({k: v for k, v in (("nprobe", nprobe), ("ef_search", ef_search)) if v is not None})
+            for idx in self.partitions.values():
+                set_search_params(idx, **self._search_params)
+
+    def memory_bytes(self) -> int:
+        """Bytes held by the loaded vector partitions (excluding metadata and the mapped store)."""
+        from src.retrieval.ann import index_memory_bytes
+        return sum(index_memory_bytes(idx) for idx in self.partitions.values())
+
+    def _resolve_scope(self, lang: str, region: Optional[str] = None) -> List[str]:
+        scope = self.lang_scopes.get(lang)
+        if scope is None:
+            # Fallback to English scope if the language is unknown
+            scope = self.lang_scopes.get("en", [])
+        if region is not None and self.shard_by == "lang_region":
+            # Chunks without a region apply everywhere
+            scope = [key for key in scope if shard_region(key) in (region, "")]
+        return scope
+
+    def _region_mask(self, lang: str, region: Optional[str],
+                     rows: Optional[np.ndarray] = None) -> Optional[np.ndarray]:
+        """
+        Rows of a language partition (or of the language's BM25 index, given
+        its `rows`) visible to a search kept to `region`: the region's chunks
+        plus region-less ones, as a bool mask over local ids; None when
+        nothing needs filtering. Region shards are already cut to one region
+        by _resolve_scope().
+        """
+        if region is None or shard_region(lang) is not None:
+            return None
+        mask = self._region_masks.get((lang, region))
+        if mask is None:
+            if rows is None:
+                _, rows = self._partition(lang)
+            import pyarrow.compute as pc
+            chunk_regions = pc.fill_null(self.chunk_meta.column("region").take(pa.array(rows, type=pa.int64())), "")
+            chunk_regions = chunk_regions.to_numpy(zero_copy_only=False).astype(str)
+            mask = self._region_masks[(lang, region)] = (chunk_regions == region) | (chunk_regions == "")
+        return mask
+
+    def _dense(self, q_vecs: np.ndarray, scope: List[str], top_k: int,
+               region: Optional[str] = None) -> Tuple[np.ndarray, np.ndarray]:
+        if self.transport is not None:
+            return self.transport.search(scope, q_vecs, top_k, region)
+        return self._search_scope(q_vecs, scope, top_k, region)
+
+    def _search_scope(self, q_vecs: np.ndarray, scope: List[str], top_k: int,
+                      region: Optional[str] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Searches each partition in the scope and merges to a global top-k.
+        Returns (scores, global_ids), both [n_queries, top_k]; missing slots
+        are padded with -inf / -1. Lossy partitions return top_k *
+        rescore_factor candidates, which are re-scored exactly before the merge.
+        With `region`, language partitions only return rows that region may
+        see (see _region_mask()).
+        """
+        q_vecs = np.asarray(q_vecs, dtype=np.float32)
+        q_compact = truncate_vectors(q_vecs, self.vector_dim)
+        all_scores, all_ids = [], []
+        for lang in scope:
+            exact = self.partition_exact[lang]
+            k = top_k if exact else top_k * self.rescore_factor
+            idx, rows = self._partition(lang)
+            allowed = self._region_mask(lang, region)
+            if allowed is None:
+                scores, local_idxs = idx.search(q_compact, k)
+            elif allowed.any():
+                from src.retrieval.ann import filtered_search
+                scores, local_idxs = filtered_search(idx, q_compact, k, allowed)
             else:
-                return [], []
-
-        # Search
-        scores, local_idxs = idx.search(q_vec, top_k)
-        
-        # Map back to global IDs
-        # local_idxs is [1, k]
-        global_ids = scope_idxs[local_idxs[0]]
-        
-        results = []
-        for g_id, score in zip(global_ids, scores[0]):
-            meta = self.chunk_meta_df.iloc[g_id]
-            results.append({
-                "score": float(score),
-                "text": meta["chunk_text"],
-                "doc_id": meta["doc_id"],
-                "base_id": meta["base_id"]
-            })
-            
+                continue
+            ids = np.where(local_idxs >= 0, rows[local_idxs], -1)
+            all_scores.append(np.where(ids >= 0, scores, -np.inf) if exact else self._rescore(q_vecs, ids))
+            all_ids.append(ids)
+
+        if not all_scores:
+            return (np.full((len(q_vecs), top_k), -np.inf, dtype=np.float32),
+                    np.full((len(q_vecs), top_k), -1, dtype=np.int64))
+        scores = np.concatenate(all_scores, axis=1)
+        ids = np.concatenate(all_ids, axis=1)
+        order = np.argsort(-scores, axis=1, kind="stable")[:, :top_k]
+        return np.take_along_axis(scores, order, axis=1), np.take_along_axis(ids, order, axis=1)
+
+    def _vectors(self, global_ids: np.ndarray) -> np.ndarray:
+        """Full float32 store vectors of `global_ids` (any shape, all >= 0), shaped [..., dim]."""
+        if self._chunk_vecs is not None:
+            return self._chunk_vecs[global_ids]
+        # Gathered from the mapped store: no process-private copy of all vectors
+        return take_vectors(self._store, global_ids.reshape(-1)).reshape(*global_ids.shape, -1)
+
+    def _rescore(self, q_vecs: np.ndarray, global_ids: np.ndarray) -> np.ndarray:
+        """Exact cosines of [n_queries, k] candidates against the full float32 store vectors."""
+        valid = global_ids >= 0
+        full = self._vectors(np.where(valid, global_ids, 0))
+        return np.where(valid, np.einsum("qkd,qd->qk", full, q_vecs), -np.inf)
+
+    def _lexical_search(self, query: str, scope: List[str], k: int,
+                        region: Optional[str] = None) -> Dict[str, Tuple[np.ndarray, np.ndarray]]:
+        """
+        Top-k BM25 hits of each language in the scope as {language:
+        (scores, local ids)}, best first; local ids index lexical_rows.
+        BM25 scores depend on each language's own statistics, so rankings
+        are kept apart rather than merged on score.
+        """
+        hits = {}
+        for lang in dict.fromkeys(shard_lang(key) for key in scope):
+            bm25, rows = self._lexical_index(lang)
+            scores, local_ids = bm25.search(tokenize(query, lang), k, self._region_mask(lang, region, rows))
+            if len(local_ids):
+                hits[lang] = (scores, local_ids)
+        return hits
+
+    def _fast_path(self, query: str, hits: Dict[str, Tuple[np.ndarray, np.ndarray]]) -> Optional[str]:
+        """
+        The language whose top BM25 hit is confident enough to answer
+        without an embedding call, or None. Within its language the hit
+        must cover nearly all of the query's IDF mass and beat the runner-up
+        by LEXICAL_FASTPATH_MARGIN; coverage is a share, so it is the only
+        measure compared across languages: if the top hit of more than one
+        language covers the query, the match is ambiguous.
+        """
+        covered = []
+        for lang, (scores, local_ids) in hits.items():
+            tokens = tokenize(query, lang)
+            if len(set(tokens)) < LEXICAL_FASTPATH_MIN_TERMS:
+                continue
+            if self.lexical[lang].coverage(tokens, int(local_ids[0])) >= LEXICAL_FASTPATH_COVERAGE:
+                covered.append(lang)
+        if len(covered) != 1:
+            return None
+        scores = hits[covered[0]][0]
+        if len(scores) > 1 and scores[0] < LEXICAL_FASTPATH_MARGIN * scores[1]:
+            return None
+        return covered[0]
+
+    def _fuse(self, q_vecs: np.ndarray, dense_ids: np.ndarray,
+              lexical_hits: List[Dict[str, Tuple[np.ndarray, np.ndarray]]], top_k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Reciprocal rank fusion of the dense ranking and each language's BM25
+        ranking. Hits are ordered by fused rank, but their scores are exact
+        cosines so Gate-A keeps its calibration.
+        """
+        global_ids = np.full((len(q_vecs), top_k), -1, dtype=np.int64)
+        for qi, hits in enumerate(lexical_hits):
+            fused: Dict[int, float] = {}
+            for rank, g in enumerate(dense_ids[qi].tolist()):
+                if g >= 0:
+                    fused[g] = 1.0 / (RRF_K + rank + 1)
+            for lang, (_, local_ids) in hits.items():
+                for rank, g in enumerate(self.lexical_rows[lang][local_ids].tolist()):
+                    fused[g] = fused.get(g, 0.0) + 1.0 / (RRF_K + rank + 1)
+            best = sorted(fused, key=lambda g: -fused[g])[:top_k]
+            global_ids[qi, :len(best)] = best
+        return self._rescore(q_vecs, global_ids), global_ids
+
+    def search(self, queries: List[str], langs: List[str], top_k: int = 5,
+               trace: Optional[Trace] = None, regions: Optional[List[Optional[str]]] = None
+               ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Embeds the queries (in as few calls as possible) and searches each
+        distinct language scope once. Returns (scores, global_ids), both
+        [n_queries, top_k] and padded with -inf / -1, without touching any
+        metadata; pass them to materialize() for the hits you keep. The
+        embed and search stages are lapped on `trace` if one is given.
+
+        `regions` (one per query, None = anywhere) keeps a query to its
+        region's chunks plus region-less ones: with shard_by="lang_region"
+        only those shards are searched, with shard_by="lang" the language
+        partitions are searched with the other regions' rows filtered out.
+        Shards are searched in-process or through `transport`; either way
+        hits are merged on exact scores.
+
+        With lexical_mode="hybrid", queries whose BM25 top hit is a
+        confident near-exact match (see _fast_path()) are neither embedded
+        nor searched densely: their hits are the matched language's BM25
+        ranking and their scores are NaN, since no query cosine exists.
+        Callers decide those queries lexically (lexical_matches()) instead
+        of thresholding a score. Other queries get BM25 and dense candidates
+        fused by reciprocal rank; their hits are in fused order and their
+        scores are still exact cosines. A "lexical" stage is lapped first.
+        """
+        if len(queries) != len(langs):
+            raise ValueError("queries and langs must have the same length")
+        regions = [None] * len(queries) if regions is None else list(regions)
+        if len(regions) != len(queries):
+            raise ValueError("queries and regions must have the same length")
+        scopes = [self._resolve_scope(lang, region) for lang, region in zip(langs, regions)]
+        scores = np.full((len(queries), top_k), -np.inf, dtype=np.float32)
+        global_ids = np.full((len(queries), top_k), -1, dtype=np.int64)
+        if not queries:
+            return scores, global_ids
+
+        # Lexical first stage: confident matches are answered from BM25 alone,
+        # with no embedding call and no dense search.
+        lexical_hits: Dict[int, Dict[str, Tuple[np.ndarray, np.ndarray]]] = {}
+        fast: set = set()
+        if self.lexical_mode == "hybrid":
+            for i, query in enumerate(queries):
+                hits = self._lexical_search(query, scopes[i], max(top_k, LEXICAL_CANDIDATES), regions[i])
+                matched = self._fast_path(query, hits)
+                if matched is not None:
+                    fast.add(i)
+                    ranked = self.lexical_rows[matched][hits[matched][1][:top_k]]
+                    scores[i, :len(ranked)] = np.nan
+                    global_ids[i, :len(ranked)] = ranked
+                else:
+                    lexical_hits[i] = hits
+            self.lexical_stats["fast_path"] += len(fast)
+            self.lexical_stats["fused"] += len(lexical_hits)
+            if trace is not None:
+                trace.lap("lexical")
+
+        # Queries with nothing in scope (e.g. an empty store) have no hits and are not embedded
+        to_embed = [i for i in range(len(queries)) if i not in fast and scopes[i]]
+        q_vecs = np.empty((len(queries), self.dim), dtype=np.float32)
+        if to_embed:
+            embedded = embed_with_cache(self.embedder.embed, [queries[i] for i in to_embed], self.query_cache)
+            if embedded.shape[1] != self.dim:
+                raise ValueError(f"Query embeddings have dim {embedded.shape[1]}, chunk store has {self.dim}")
+            q_vecs[to_embed] = embedded
+        if trace is not None:
+            trace.lap("embed")
+
+        # Group queries sharing a scope (and, for language partitions, a
+        # region filter) so each is searched once
+        groups: Dict[Tuple[Tuple[str, ...], Optional[str]], List[int]] = {}
+        for i, scope in enumerate(scopes):
+            if scope and i not in fast:
+                region = regions[i] if self.shard_by == "lang" else None
+                groups.setdefault((tuple(scope), region), []).append(i)
+
+        for (scope, region), rows in groups.items():
+            fused = [i for i in rows if i in lexical_hits]
+            plain = [i for i in rows if i not in lexical_hits]
+            if plain:
+                s, g = self._dense(q_vecs[plain], list(scope), top_k, region)
+                scores[plain, :s.shape[1]] = s
+                global_ids[plain, :g.shape[1]] = g
+            if fused:
+                _, dense_ids = self._dense(q_vecs[fused], list(scope), max(top_k, LEXICAL_CANDIDATES), region)
+                s, g = self._fuse(q_vecs[fused], dense_ids, [lexical_hits[i] for i in fused], top_k)
+                scores[fused] = s
+                global_ids[fused] = g
+        if trace is not None:
+            trace.lap("search")
+        return scores, global_ids
+
+    def materialize(self, scores: np.ndarray, global_ids: np.ndarray, with_text: bool = True) -> List[List[Dict]]:
+        """
+        Turns search() output into result dicts. Metadata for every hit in
+        the batch is gathered with one Arrow take per column; chunk text is
+        read from the mapped store only when `with_text` is set. Stores
+        built with near-duplicate elimination add "doc_ids" / "base_ids":
+        every document the hit's chunk stands for, its own first.
+        """
+        scores = np.atleast_2d(scores)
+        global_ids = np.atleast_2d(global_ids)
+        valid = global_ids >= 0
+        take = pa.array(global_ids[valid], type=pa.int64())
+
+        aliases = "dup_doc_ids" in self.chunk_meta.column_names
+        columns = ["doc_id", "base_id"] + (["chunk_text"] if with_text else []) + (ALIAS_COLUMNS if aliases else [])
+        picked = {c: self.chunk_meta.column(c).take(take).to_pylist() for c in columns}
+        hit_scores = scores[valid].tolist()
+
+        results: List[List[Dict]] = []
+        pos = 0
+        for n in valid.sum(axis=1).tolist():
+            rows = []
+            for j in range(pos, pos + n):
+                # Lexical fast-path hits have no cosine
+                hit = {"score": None if math.isnan(hit_scores[j]) else hit_scores[j]}
+                if with_text:
+                    hit["text"] = picked["chunk_text"][j]
+                hit["doc_id"] = picked["doc_id"][j]
+                hit["base_id"] = picked["base_id"][j]
+                if aliases:
+                    hit["doc_ids"] = [hit["doc_id"]] + picked["dup_doc_ids"][j]
+                    hit["base_ids"] = [hit["base_id"]] + picked["dup_base_ids"][j]
+                rows.append(hit)
+            results.append(rows)
+            pos += n
+        return results
+
+    def _finish(self, trace: Optional[Trace], langs: List[str], scores: np.ndarray, global_ids: np.ndarray):
+        if trace is not None:
+            self.metrics.finish(trace, [
+                {"lang": lang, "top_score": float(s[0]) if g[0] >= 0 and not np.isnan(s[0]) else None}
+                for lang, s, g in zip(langs, scores, global_ids)
+            ])
+
+    def retrieve(self, query: str, lang: str = "en", top_k: int = 5, region: Optional[str] = None):
+        trace = optional_trace(self.metrics, "retrieve", lang)
+        scores, global_ids = self.search([query], [lang], top_k, trace=trace, regions=[region])
+        results = self.materialize(scores, global_ids)[0]
+        if trace is not None:
+            trace.lap("materialize")
+        self._finish(trace, [lang], scores, global_ids)
+        return results
+
+    def retrieve_batch(self, queries: List[str], langs: List[str], top_k: int = 5,
+                       regions: Optional[List[Optional[str]]] = None) -> List[List[Dict]]:
+        """
+        Batched retrieve(): one search() over the batch and one
+        materialize() for all hits. results[i] is identical to
+        retrieve(queries[i], langs[i], top_k, regions[i]).
+        """
+        trace = optional_trace(self.metrics, "retrieve_batch")
+        scores, global_ids = self.search(queries, langs, top_k, trace=trace, regions=regions)
+        results = self.materialize(scores, global_ids)
+        if trace is not None:
+            trace.lap("materialize")
+        self._finish(trace, langs, scores, global_ids)
         return results
@@ -0,0 +1,104 @@
+import multiprocessing as mp
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+from src.config.settings import SHARD_WORKERS
+from src.retrieval.embedders import Embedder
+from src.retrieval.embedding import EmbeddingCache
+from src.retrieval.search import RiskAwareRetriever
+
+class ShardTransport:
+    """
+    Where a retriever's dense partition searches run (set as
+    `retriever.transport`). search() gets partition keys and already
+    embedded queries and must return (scores, global_ids), both
+    [n_queries, top_k], padded with -inf / -1, best first and with exact
+    cosines, so results from different shards merge on score. A `region`
+    filters language partitions to the rows that region may see (see
+    RiskAwareRetriever._region_mask()). Implement it over RPC to serve
+    shards from remote nodes.
+    """
+
+    def search(self, keys: List[str], q_vecs: np.ndarray, top_k: int,
+               region: Optional[str] = None) -> Tuple[np.ndarray, np.ndarray]:
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+def merge_top_k(parts: List[Tuple[np.ndarray, np.ndarray]], top_k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Merges per-shard (scores, global_ids) into one global top-k by score."""
+    scores = np.concatenate([s for s, _ in parts], axis=1)
+    ids = np.concatenate([g for _, g in parts], axis=1)
+    order = np.argsort(-scores, axis=1, kind="stable")[:, :top_k]
+    return np.take_along_axis(scores, order, axis=1), np.take_along_axis(ids, order, axis=1)
+
+class _StoreSignature(Embedder):
+    """Stands in for the embedder in shard workers, which get query vectors and never embed."""
+
+    def __init__(self, manifest: Dict[str, Any]):
+        super().__init__(manifest.get("model"), manifest.get("dim"))
+        self.backend = manifest.get("backend", "openai")
+
+    def embed(self, texts):
+        raise RuntimeError("Shard workers search precomputed query vectors")
+
+_worker: Optional[RiskAwareRetriever] = None
+
+def _init_worker(workdir: str, manifest: Dict[str, Any], settings: Dict[str, Any], keys: List[str]):
+    global _worker
+    os.chdir(workdir)
+    _worker = RiskAwareRetriever("", query_cache=EmbeddingCache(None), embedder=_StoreSignature(manifest),
+                                 attach_only=True, **settings)
+    for key in keys:
+        _worker._partition(key)
+
+def _search_worker(keys: List[str], q_vecs: np.ndarray, top_k: int,
+                   region: Optional[str]) -> Tuple[np.ndarray, np.ndarray]:
+    return _worker._search_scope(q_vecs, keys, top_k, region)
+
+class ProcessPoolTransport(ShardTransport):
+    """
+    Scatter-gather over local worker processes. Shards are spread over
+    `n_workers` processes, each attaching read-only to the retriever's
+    published snapshot and mapping only its own shards. A search sends each
+    involved worker the queries plus its shards in scope, then merges the
+    per-worker top-k.
+    """
+
+    def __init__(self, retriever: RiskAwareRetriever, n_workers: int = SHARD_WORKERS):
+        if retriever.snapshot_dir is None:
+            raise ValueError("ProcessPoolTransport serves a published snapshot; run src.serving.publish() first")
+        keys = sorted(retriever.partition_exact)
+        n_workers = max(1, min(n_workers, len(keys)))
+        self.route = {key: i % n_workers for i, key in enumerate(keys)}
+        settings = {
+            "index_type": retriever.index_type,
+            "storage": retriever.storage,
+            "vector_dim": retriever.vector_dim,
+            "rescore_factor": retriever.rescore_factor,
+            "shard_by": retriever.shard_by,
+            "snapshot_root": os.path.abspath(retriever.snapshot_root),
+        }
+        ctx = mp.get_context("spawn")
+        self._pools = [
+            ProcessPoolExecutor(
+                max_workers=1, mp_context=ctx, initializer=_init_worker,
+                initargs=(os.getcwd(), retriever.store_manifest, settings, [k for k in keys if self.route[k] == w]),
+            )
+            for w in range(n_workers)
+        ]
+
+    def search(self, keys: List[str], q_vecs: np.ndarray, top_k: int,
+               region: Optional[str] = None) -> Tuple[np.ndarray, np.ndarray]:
+        by_worker: Dict[int, List[str]] = {}
+        for key in keys:
+            by_worker.setdefault(self.route[key], []).append(key)
+        futures = [self._pools[w].submit(_search_worker, shard_keys, q_vecs, top_k, region)
+                   for w, shard_keys in by_worker.items()]
+        return merge_top_k([f.result() for f in futures], top_k)
+
+    def close(self):
+        for pool in self._pools:
+            pool.shutdown(wait=True)
@@ -0,0 +1,76 @@
+from typing import Optional
+from src.config.settings import CHUNK_STORE_PATH, INDEX_TYPE, VECTOR_STORAGE, VECTOR_DIM, INDEX_SNAPSHOT_DIR, SHARD_BY, SHARD_WORKERS
+from src.ingestion.chunk_store import open_chunk_store
+from src.retrieval.embedders import Embedder, get_embedder, check_store_signature
+from src.retrieval.embedding import EmbeddingCache
+from src.retrieval.partitions import snapshot_config, find_snapshot
+from src.retrieval.search import RiskAwareRetriever
+from src.pipeline import SingAIRAGPipeline
+from src.decision_cache import DecisionCache
+from src.telemetry import Metrics
+
+# Multi-worker serving on one node. A loader process calls publish() once;
+# every worker then calls attach(). Workers map the same files read-only
+# (chunk store, partition indexes, row arrays), so their pages live once in
+# the OS page cache and node memory stays flat as workers are added.
+
+def publish(
+    api_key: str = "",
+    embedder: Optional[Embedder] = None,
+    index_type: str = INDEX_TYPE,
+    storage: str = VECTOR_STORAGE,
+    vector_dim: Optional[int] = VECTOR_DIM,
+    root: str = INDEX_SNAPSHOT_DIR,
+    shard_by: str = SHARD_BY,
+) -> str:
+    """
+    Makes sure the current chunk store has an index snapshot for these
+    settings (building it once if ingestion did not) and returns its path.
+    Run it in the loader before starting workers.
+    """
+    embedder = embedder if embedder is not None else get_embedder(api_key=api_key)
+    table, manifest = open_chunk_store(CHUNK_STORE_PATH)
+    check_store_signature(manifest, embedder)
+    found = find_snapshot(snapshot_config(manifest, table.num_rows, index_type, storage, vector_dim, shard_by), root)
+    if found is not None:
+        return found[0]
+    from src.ingestion.indexer import write_index_snapshot
+    return write_index_snapshot(index_type, storage, vector_dim, root=root, shard_by=shard_by)
+
+def attach(
+    api_key: str = "",
+    embedder: Optional[Embedder] = None,
+    metrics: Optional[Metrics] = None,
+    query_cache: Optional[EmbeddingCache] = None,
+    warm: bool = True,
+    decision_cache: Optional[DecisionCache] = None,
+    shard_workers: int = SHARD_WORKERS,
+    **retriever_kwargs,
+) -> SingAIRAGPipeline:
+    """
+    A worker's pipeline over the published snapshot. Raises
+    FileNotFoundError instead of building private partitions when there is
+    none. With `warm`, every partition is mapped up front rather than on
+    its first query. The query cache defaults to memory-only, because the
+    on-disk cache supports a single writing process. Pass a
+    DecisionCache over a shared backend to share decisions across workers.
+    With `shard_workers` > 0, dense searches fan out to that many local
+    shard processes (ProcessPoolTransport), which map the partitions
+    instead of this process.
+    """
+    embedder = embedder if embedder is not None else get_embedder(api_key=api_key)
+    retriever = RiskAwareRetriever(
+        api_key,
+        query_cache=query_cache if query_cache is not None else EmbeddingCache(None, model=embedder.model),
+        embedder=embedder,
+        metrics=metrics,
+        attach_only=True,
+        **retriever_kwargs,
+    )
+    if shard_workers > 0:
+        from src.retrieval.shards import ProcessPoolTransport
+        retriever.transport = ProcessPoolTransport(retriever, shard_workers)
+    elif warm:
+        retriever.warm()
+    return SingAIRAGPipeline(api_key, embedder=embedder, metrics=metrics, retriever=retriever,
+                             decision_cache=decision_cache)
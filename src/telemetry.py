@@ -0,0 +1,179 @@
+import json
+import threading
+import time
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+# Histogram upper bounds (seconds / cosine); +Inf is implied
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+SCORE_BUCKETS = (0.05, 0.1, 0.15, 0.2, 0.25, 0.3, 0.35, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 1.0)
+
+class Trace:
+    """
+    Stage timings for one request. Each lap() charges the time since the
+    previous lap to a stage. Instrumented code only touches a trace when
+    one was started, so a pipeline without Metrics pays a None check per
+    stage.
+    """
+
+    __slots__ = ("op", "lang", "start", "last", "stages")
+
+    def __init__(self, op: str, lang: str):
+        self.op = op
+        self.lang = lang
+        self.start = self.last = time.perf_counter()
+        self.stages: Dict[str, float] = {}
+
+    def lap(self, stage: str):
+        now = time.perf_counter()
+        self.stages[stage] = self.stages.get(stage, 0.0) + now - self.last
+        self.last = now
+
+class _Histogram:
+    __slots__ = ("bounds", "counts", "sum", "count")
+
+    def __init__(self, bounds: Sequence[float]):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _labels(**labels) -> str:
+    return ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items())
+
+class Metrics:
+    """
+    Collects finished traces: per (op, stage) latency histograms, decision
+    counters per (lang, decision, reason code), decision-cache hit / miss
+    counters per lang and top-score histograms per lang. Each finished
+    trace is also passed to every sink as a JSON-serializable record.
+    Thread-safe.
+    """
+
+    def __init__(self, sinks: Sequence[Callable[[Dict[str, Any]], None]] = (),
+                 latency_buckets: Sequence[float] = LATENCY_BUCKETS, score_buckets: Sequence[float] = SCORE_BUCKETS):
+        self.sinks = list(sinks)
+        self.latency_buckets = tuple(latency_buckets)
+        self.score_buckets = tuple(score_buckets)
+        self._lock = threading.Lock()
+        self.stage_seconds: Dict[Tuple[str, str], _Histogram] = {}
+        self.decisions: Dict[Tuple[str, str, str], int] = {}
+        self.cache_lookups: Dict[Tuple[str, str], int] = {}
+        self.top_scores: Dict[str, _Histogram] = {}
+
+    def start(self, op: str, lang: str = "") -> Trace:
+        return Trace(op, lang)
+
+    def finish(self, trace: Trace, results: Sequence[Dict[str, Any]] = ()):
+        """
+        Records `trace` plus one entry per query it served, each a dict with
+        lang and optionally decision, reason, top_score and cache ("hit" /
+        "miss").
+        """
+        total = time.perf_counter() - trace.start
+        stages = dict(trace.stages, total=total)
+        with self._lock:
+            for stage, seconds in stages.items():
+                key = (trace.op, stage)
+                hist = self.stage_seconds.get(key)
+                if hist is None:
+                    hist = self.stage_seconds[key] = _Histogram(self.latency_buckets)
+                hist.observe(seconds)
+            for r in results:
+                lang = r.get("lang", trace.lang)
+                if "decision" in r:
+                    # Reasons may carry a value ("LOW_SIMILARITY_SCORE (0.12 < 0.25)"); keep the code only
+                    key = (lang, r["decision"], r.get("reason", "").split(" ", 1)[0])
+                    self.decisions[key] = self.decisions.get(key, 0) + 1
+                if "cache" in r:
+                    key = (lang, r["cache"])
+                    self.cache_lookups[key] = self.cache_lookups.get(key, 0) + 1
+                if r.get("top_score") is not None:
+                    hist = self.top_scores.get(lang)
+                    if hist is None:
+                        hist = self.top_scores[lang] = _Histogram(self.score_buckets)
+                    hist.observe(r["top_score"])
+        if self.sinks:
+            record = {"ts": time.time(), "op": trace.op, "lang": trace.lang, "stages": stages, "results": list(results)}
+            for sink in self.sinks:
+                sink(record)
+
+    def prometheus_text(self) -> str:
+        """Current values in the Prometheus text exposition format."""
+        lines: List[str] = []
+
+        def histogram(name: str, help_text: str, series):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} histogram")
+            for labels, hist in series:
+                cumulative = 0
+                for bound, n in zip(list(hist.bounds) + ["+Inf"], hist.counts):
+                    cumulative += n
+                    lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+                lines.append(f"{name}_sum{{{labels}}} {hist.sum}")
+                lines.append(f"{name}_count{{{labels}}} {hist.count}")
+
+        with self._lock:
+            histogram("singai_stage_seconds", "Wall time per pipeline stage.",
+                      [(_labels(op=op, stage=stage), h) for (op, stage), h in sorted(self.stage_seconds.items())])
+            lines.append("# HELP singai_decisions_total Decisions by language and reason code.")
+            lines.append("# TYPE singai_decisions_total counter")
+            for (lang, decision, reason), n in sorted(self.decisions.items()):
+                lines.append(f"singai_decisions_total{{{_labels(lang=lang, decision=decision, reason=reason)}}} {n}")
+            lines.append("# HELP singai_decision_cache_total Decision cache lookups by language and result.")
+            lines.append("# TYPE singai_decision_cache_total counter")
+            for (lang, result), n in sorted(self.cache_lookups.items()):
+                lines.append(f"singai_decision_cache_total{{{_labels(lang=lang, result=result)}}} {n}")
+            histogram("singai_top_score", "Top retrieval cosine per query (Gate-A input).",
+                      [(_labels(lang=lang), h) for lang, h in sorted(self.top_scores.items())])
+        return "\n".join(lines) + "\n"
+
+class JsonlSink:
+    """Appends one JSON line per finished trace to `path`."""
+
+    def __init__(self, path: str):
+        self._file = open(path, "a", encoding="utf-8")
+        self._lock = threading.Lock()
+
+    def __call__(self, record: Dict[str, Any]):
+        line = json.dumps(record, ensure_ascii=False)
+        with self._lock:
+            self._file.write(line + "\n")
+            self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+def serve_prometheus(metrics: Metrics, port: int = 9464, host: str = "") -> ThreadingHTTPServer:
+    """Serves metrics.prometheus_text() at /metrics from a daemon thread; call .shutdown() to stop."""
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?", 1)[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = metrics.prometheus_text().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def optional_trace(metrics: Optional[Metrics], op: str, lang: str = "") -> Optional[Trace]:
+    return metrics.start(op, lang) if metrics is not None else None
@@ -0,0 +1,93 @@
+import pandas as pd
+import pyarrow as pa
+import pytest
+
+from src.config.settings import CHUNK_SPEC_BY_LANG, DEFAULT_SPEC
+from src.ingestion.chunking import CHUNK_SCHEMA, _sentences, chunk_pool, chunk_table
+
+
+def _legacy_lang_chunk(text, lang):
+    # The string-concatenating chunker build_index used before chunk_table()
+    spec = CHUNK_SPEC_BY_LANG.get(lang, DEFAULT_SPEC)
+    max_chars, overlap = spec["max_chars"], spec["overlap_chars"]
+    chunks_out, cur = [], ""
+    for s in _sentences(text, lang):
+        if len(cur) + len(s) + 1 <= max_chars:
+            cur = (cur + " " + s).strip()
+        else:
+            if cur:
+                chunks_out.append(cur)
+            cur = s
+    if cur:
+        chunks_out.append(cur)
+    if overlap > 0 and len(chunks_out) > 1:
+        overlapped = [chunks_out[0]]
+        for i in range(1, len(chunks_out)):
+            prev = overlapped[-1]
+            tail = prev[-overlap:] if len(prev) > overlap else prev
+            overlapped.append((tail + " " + chunks_out[i]).strip())
+        chunks_out = overlapped
+    return chunks_out
+
+
+def _legacy_rows(kb_rows):
+    rows = []
+    for r in kb_rows:
+        lang = str(r.get("lang", "") or "")
+        text = str(r.get("kb_text", "") or "").strip()
+        for j, ch in enumerate(_legacy_lang_chunk(text, lang)):
+            rows.append({
+                "doc_id": str(r.get("doc_id", "") or ""), "base_id": str(r.get("base_id", "") or ""),
+                "lang": lang, "region": str(r.get("region", "") or ""), "prechunk_id": j, "chunk_text": ch,
+            })
+    return rows
+
+
+@pytest.fixture
+def kb_rows():
+    sentences = {
+        "en": "Please reset your password before the billing cycle ends. ",
+        "en_sg": "Can lah, the refund need to wait one week then see how ok? ",
+        "ms": "Sila tetapkan semula kata laluan anda sebelum kitaran bil tamat! ",
+        "zh": "请在账单周期结束前重置您的密码。",
+        "ta": "தயவுசெய்து உங்கள் கடவுச்சொல்லை மீட்டமைக்கவும். ",
+        "xx": "Unmapped language text goes through the default spec. ",
+    }
+    rows = []
+    for i in range(40):
+        lang = list(sentences)[i % len(sentences)]
+        # Short, multi-chunk and over-long single sentences
+        text = sentences[lang] * (1 + (i * 7) % 60)
+        if i % 9 == 4:
+            text = sentences[lang].rstrip(" .!?。") * 80
+        rows.append({"doc_id": f"doc_{i}", "base_id": f"base_{i // 3}", "lang": lang,
+                     "region": ["SG", "MY", None][i % 3], "kb_text": f"  Title {i}\n\n{text}  "})
+    rows += [
+        {"doc_id": "empty", "base_id": "b", "lang": "en", "region": "SG", "kb_text": "   "},
+        {"doc_id": "none", "base_id": None, "lang": None, "region": "", "kb_text": None},
+        {"doc_id": None, "base_id": "b", "lang": "en", "region": "SG", "kb_text": "No terminator"},
+    ]
+    return rows
+
+
+@pytest.mark.parametrize("workers,batch_docs", [(1, 1000), (1, 4), (2, 4)])
+def test_chunk_table_matches_row_by_row_chunking(kb_rows, workers, batch_docs):
+    table = chunk_table(pa.Table.from_pylist(kb_rows), workers=workers, batch_docs=batch_docs)
+    assert table.schema == CHUNK_SCHEMA
+    assert table.to_pylist() == _legacy_rows(kb_rows)
+
+
+def test_chunk_table_accepts_dataframes(kb_rows):
+    complete = [r for r in kb_rows if all(v is not None for v in r.values())]
+    assert chunk_table(pd.DataFrame(complete), workers=1).to_pylist() == _legacy_rows(complete)
+
+
+def test_chunk_table_with_shared_pool(kb_rows):
+    pool = chunk_pool(2)
+    try:
+        first = chunk_table(pa.Table.from_pylist(kb_rows), batch_docs=5, pool=pool)
+        second = chunk_table(pa.Table.from_pylist(kb_rows[::-1]), batch_docs=5, pool=pool)
+    finally:
+        pool.shutdown()
+    assert first.to_pylist() == _legacy_rows(kb_rows)
+    assert second.to_pylist() == _legacy_rows(kb_rows[::-1])
@@ -0,0 +1,84 @@
+import pandas as pd
+import pytest
+
+from src.ingestion import dedup
+from src.ingestion.dedup import NearDuplicateIndex, can_represent
+from src.ingestion.indexer import build_index
+from src.retrieval.embedders import HashEmbedder
+from src.retrieval.search import RiskAwareRetriever
+
+TEXT = "please reset your password before the billing cycle ends and check the refund invoice account"
+
+
+@pytest.fixture
+def ms_only(monkeypatch):
+    """A scope map where "ms" queries search the "ms" partition alone."""
+    monkeypatch.setattr(dedup, "LANG_SCOPE_MAP", {"en_sg": ["en_sg", "en"], "ms": ["ms"]})
+    dedup._searched_by.cache_clear()
+    yield
+    dedup._searched_by.cache_clear()
+
+
+@pytest.mark.parametrize("owner,dup,allowed", [
+    (("en", ""), ("en_sg", ""), True),
+    (("en_sg", ""), ("en", ""), False),
+    (("en", ""), ("ms", ""), True),  # every "ms" query also searches "en"
+    (("ms", ""), ("en", ""), False),
+    (("ms", ""), ("id", ""), False),
+    (("en", ""), ("en", "SG"), True),
+    (("en", "SG"), ("en", "MY"), False),
+    (("en", "SG"), ("en", ""), False),
+])
+def test_can_represent_follows_query_scopes(owner, dup, allowed):
+    assert can_represent(*owner, *dup) is allowed
+
+
+def test_no_folding_into_a_language_outside_the_scope(ms_only):
+    assert not can_represent("en", "", "ms", "")
+    owners = NearDuplicateIndex(0.8).add([TEXT, TEXT, TEXT], ["ms", "en", "en_sg"], ["", "", ""])
+    # The en_sg copy folds into "en"; the "ms" one keeps its own chunk
+    assert owners.tolist() == [0, 1, 1]
+
+
+def _reachable(retriever, langs, regions):
+    """Documents each (query language, region) search can return, through live chunks or their aliases."""
+    meta = retriever.chunk_meta.to_pandas()
+    docs = {}
+    for lang in langs:
+        for region in regions:
+            rows = [r for key in retriever._resolve_scope(lang, region) for r in retriever.partition_ids[key]]
+            live = meta.iloc[rows]
+            live = live[~live["deleted"]]
+            found = set(live["doc_id"])
+            if "dup_doc_ids" in live:
+                found.update(d for ds in live["dup_doc_ids"] for d in ds)
+            docs[lang, region] = found
+    return docs
+
+
+@pytest.mark.parametrize("scopes", ["default", "ms_only"])
+def test_dedup_loses_no_document_a_search_could_reach(tmp_path, monkeypatch, request, scopes):
+    if scopes == "ms_only":
+        request.getfixturevalue("ms_only")
+    rows = []
+    for i, (lang, region) in enumerate([("en", ""), ("en", "SG"), ("ms", ""), ("ms", "MY"), ("zh", "SG")]):
+        text = f"Title {i}\n\n{TEXT} {i}."
+        rows.append({"doc_id": f"doc_{i}", "base_id": f"base_{i}", "lang": lang, "region": region, "kb_text": text})
+        for copy_lang, copy_region in [("en", region), ("en_sg", region), ("ms", ""), ("en", "MY")]:
+            rows.append({"doc_id": f"doc_{i}_{copy_lang}_{copy_region}", "base_id": f"base_{i}", "lang": copy_lang,
+                         "region": copy_region, "kb_text": text})
+    pd.DataFrame(rows).to_parquet(tmp_path / "kb.parquet")
+
+    reachable, stored = {}, {}
+    for threshold in (None, 0.8):
+        workdir = tmp_path / str(threshold)
+        workdir.mkdir()
+        monkeypatch.chdir(workdir)
+        build_index("", source=str(tmp_path / "kb.parquet"), embedder=HashEmbedder(32), snapshot=False,
+                    dedup_threshold=threshold)
+        retriever = RiskAwareRetriever("", embedder=HashEmbedder(32), snapshot_root=None, shard_by="lang_region")
+        reachable[threshold] = _reachable(retriever, ["en", "en_sg", "ms", "zh", "xx"], [None, "SG", "MY", ""])
+        stored[threshold] = int((~retriever.chunk_meta.column("deleted").to_numpy(zero_copy_only=False)).sum())
+    assert stored[0.8] < stored[None]
+    for key, docs in reachable[None].items():
+        assert docs <= reachable[0.8][key], (key, docs - reachable[0.8][key])
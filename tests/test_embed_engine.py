@@ -0,0 +1,103 @@
+import hashlib
+import os
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from src.ingestion import embed_engine
+from src.ingestion.embed_engine import EmbeddingEngine, TokenBucket
+
+
+class ApiError(Exception):
+    def __init__(self, status_code):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+
+
+class StubClient:
+    """embeddings.create() stand-in: deterministic vectors, optional scripted failures per call."""
+
+    def __init__(self, failures=(), fail_on=None, dim=8):
+        self.embeddings = self
+        self.failures = list(failures)
+        self.fail_on = fail_on
+        self.dim = dim
+        self.inputs = []
+
+    def create(self, model, input):
+        self.inputs.append(list(input))
+        if self.failures:
+            status = self.failures.pop(0)
+            if status:
+                raise ApiError(status)
+        if self.fail_on is not None and self.fail_on in input:
+            raise ApiError(400)
+        return SimpleNamespace(data=[SimpleNamespace(embedding=_vector(t, self.dim)) for t in input])
+
+
+def _vector(text, dim):
+    seed = int(hashlib.md5(text.encode("utf-8")).hexdigest()[:8], 16)
+    return np.random.default_rng(seed).standard_normal(dim).tolist()
+
+
+def _expected(texts, dim=8):
+    X = np.array([_vector(t, dim) for t in texts], dtype=np.float32)
+    return X / (np.linalg.norm(X, axis=1, keepdims=True) + 1e-12)
+
+
+def _engine(client, **kwargs):
+    kwargs.setdefault("checkpoint_dir", None)
+    return EmbeddingEngine(client=client, batch_size=4, max_in_flight=1, backoff_s=0.0, max_retries=3, **kwargs)
+
+
+TEXTS = [f"text {i}" for i in range(10)]
+
+
+@pytest.mark.parametrize("status", [429, 500, 503])
+def test_retries_then_succeeds(status):
+    client = StubClient(failures=[status, status])
+    X = _engine(client).embed(TEXTS[:4])
+    np.testing.assert_allclose(X, _expected(TEXTS[:4]), rtol=1e-6)
+    assert len(client.inputs) == 3
+
+
+def test_gives_up_after_max_retries():
+    client = StubClient(failures=[500] * 10)
+    with pytest.raises(ApiError):
+        _engine(client).embed(TEXTS[:4])
+    assert len(client.inputs) == 4
+
+
+@pytest.mark.parametrize("status", [400, 401, 403, 404, 422])
+def test_fails_fast_on_client_errors(status):
+    client = StubClient(failures=[status])
+    with pytest.raises(ApiError):
+        _engine(client).embed(TEXTS[:4])
+    assert len(client.inputs) == 1
+
+
+def test_resumes_from_partial_checkpoint(tmp_path):
+    ckpt = str(tmp_path / "ckpt")
+    # The third batch (texts 8-9) fails; the first two are checkpointed
+    with pytest.raises(ApiError):
+        _engine(StubClient(fail_on="text 8"), checkpoint_dir=ckpt).embed(TEXTS)
+    (job,) = os.listdir(ckpt)
+    assert sorted(os.listdir(os.path.join(ckpt, job))) == ["000000.npy", "000001.npy"]
+
+    client = StubClient()
+    X = _engine(client, checkpoint_dir=ckpt).embed(TEXTS)
+    assert client.inputs == [TEXTS[8:]]
+    np.testing.assert_allclose(X, _expected(TEXTS), rtol=1e-6)
+    assert os.listdir(ckpt) == []
+
+
+def test_token_bucket_paces_past_capacity(monkeypatch):
+    clock = [0.0]
+    monkeypatch.setattr(embed_engine.time, "monotonic", lambda: clock[0])
+    monkeypatch.setattr(embed_engine.time, "sleep", lambda s: clock.__setitem__(0, clock[0] + s))
+    bucket = TokenBucket(tokens_per_minute=600)
+    bucket.acquire(600)
+    assert clock[0] == 0.0
+    bucket.acquire(50)
+    assert clock[0] == pytest.approx(5.0)
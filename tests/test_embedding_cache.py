@@ -0,0 +1,67 @@
+import os
+
+import numpy as np
+
+from src.retrieval.embedders import HashEmbedder
+from src.retrieval.embedding import EmbeddingCache, embed_with_cache
+
+TEXTS = [f"how do I reset password number {i}" for i in range(6)]
+
+
+class CountingEmbed:
+    def __init__(self, dim=16):
+        self.embedder = HashEmbedder(dim)
+        self.texts = []
+
+    def __call__(self, texts):
+        self.texts.extend(texts)
+        return self.embedder.embed(texts)
+
+
+def test_lru_eviction_and_reopening_from_disk(tmp_path):
+    path = str(tmp_path / "cache" / "query_vecs")
+    embed = CountingEmbed()
+    cache = EmbeddingCache(path, max_items=3, model="m")
+    expected = embed_with_cache(embed, TEXTS, cache)
+    assert embed.texts == TEXTS
+    stats = cache.stats()
+    assert (stats["memory_items"], stats["disk_items"], stats["evictions"]) == (3, 6, 3)
+
+    # The three newest are in memory; the evicted ones come back from disk
+    again = embed_with_cache(embed, TEXTS[::-1], cache)
+    np.testing.assert_array_equal(again, expected[::-1])
+    assert len(embed.texts) == 6
+    assert cache.stats()["disk_hits"] == 3
+
+    reopened = EmbeddingCache(path, max_items=3, model="m")
+    assert reopened.stats()["disk_items"] == 6
+    # Whitespace variants share a key
+    np.testing.assert_array_equal(embed_with_cache(embed, [f"  {t} " for t in TEXTS], reopened), expected)
+    assert len(embed.texts) == 6
+    assert reopened.stats()["disk_hits"] == 6
+    assert reopened.stats()["evictions"] == 3
+
+
+def test_unpaired_key_after_a_crash_is_dropped(tmp_path):
+    path = str(tmp_path / "query_vecs")
+    cache = EmbeddingCache(path, model="m")
+    embed_with_cache(CountingEmbed(), TEXTS[:3], cache)
+    with open(path + ".f32", "r+b") as f:
+        f.truncate(2 * 16 * 4)
+    reopened = EmbeddingCache(path, model="m")
+    assert reopened.stats()["disk_items"] == 2
+    assert reopened.get(TEXTS[2]) is None and reopened.get(TEXTS[1]) is not None
+
+
+def test_new_embedding_width_discards_the_cache(tmp_path):
+    path = str(tmp_path / "query_vecs")
+    cache = EmbeddingCache(path, model="m")
+    embed_with_cache(CountingEmbed(16), TEXTS[:2], cache)
+    embed = CountingEmbed(8)
+    vecs = embed_with_cache(embed, TEXTS[:3], cache)
+    np.testing.assert_array_equal(vecs, HashEmbedder(8).embed(TEXTS[:3]))
+    # The new text first, then the two hits cached at the old width
+    assert embed.texts == TEXTS[2:3] + TEXTS[:2]
+    reopened = EmbeddingCache(path, model="m")
+    assert (reopened.dim, reopened.stats()["disk_items"]) == (8, 3)
+    assert os.path.getsize(path + ".f32") == 3 * 8 * 4
@@ -0,0 +1,131 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.config.settings import INDEX_SNAPSHOT_DIR
+from src.ingestion.chunk_store import read_chunk_store, read_manifest
+from src.ingestion.indexer import build_index
+from src.retrieval.embedders import HashEmbedder
+
+SENTENCES = {
+    "en": "Please reset your password before the billing cycle ends.",
+    "ms": "Sila tetapkan semula kata laluan anda sebelum kitaran bil tamat.",
+    "zh": "请在账单周期结束前重置您的密码。",
+}
+
+
+class CountingEmbedder(HashEmbedder):
+    def __init__(self, dim: int = 32):
+        super().__init__(dim)
+        self.corpus_texts = 0
+
+    def embed_corpus(self, texts):
+        self.corpus_texts += len(texts)
+        return super().embed_corpus(texts)
+
+
+def _kb(n_docs: int = 30) -> pd.DataFrame:
+    rows = []
+    for i in range(n_docs):
+        lang = list(SENTENCES)[i % len(SENTENCES)]
+        body = " ".join(f"{SENTENCES[lang]} {i}-{j}" for j in range(1 + (i * 11) % 120))
+        rows.append({"doc_id": f"doc_{i}", "base_id": f"base_{i // 3}", "lang": lang,
+                     "region": ["SG", "MY", "ID"][i % 3], "kb_text": f"Title {i}\n\n{body}"})
+    return pd.DataFrame(rows)
+
+
+def _build(workdir, kb_df, embedder, **kwargs):
+    kb_df.to_parquet(workdir / "kb.parquet")
+    kwargs.setdefault("snapshot", False)
+    build_index("", source=str(workdir / "kb.parquet"), batch_rows=7, embedder=embedder, **kwargs)
+
+
+def _live(path):
+    meta, vecs, _ = read_chunk_store(str(path))
+    df = meta.to_pandas()
+    live = np.flatnonzero(~df["deleted"].to_numpy())
+    df = df.iloc[live].drop(columns=["deleted"]).assign(vector=list(vecs[live]))
+    return df.sort_values("chunk_id").reset_index(drop=True)
+
+
+def _edit_few(kb_df):
+    kb_df = kb_df.drop(index=[4]).copy()
+    kb_df.loc[3, "kb_text"] += " An extra closing sentence."
+    kb_df.loc[7, "base_id"] = "base_moved"
+    added = _kb(33).iloc[30:].assign(doc_id=lambda d: d["doc_id"] + "_new")
+    return pd.concat([kb_df, added], ignore_index=True)
+
+
+def _drop_most(kb_df):
+    # Enough tombstones to trigger compaction
+    return kb_df.iloc[::4].reset_index(drop=True)
+
+
+@pytest.mark.parametrize("change", [_edit_few, _drop_most])
+def test_incremental_build_equals_scratch_build(tmp_path, monkeypatch, change):
+    before, after = _kb(), change(_kb())
+    (tmp_path / "incremental").mkdir()
+    (tmp_path / "scratch").mkdir()
+
+    monkeypatch.chdir(tmp_path / "incremental")
+    _build(tmp_path / "incremental", before, CountingEmbedder())
+    first = _live(tmp_path / "incremental" / "chunk_store.arrow")
+    embedder = CountingEmbedder()
+    _build(tmp_path / "incremental", after, embedder)
+    incremental = _live(tmp_path / "incremental" / "chunk_store.arrow")
+
+    monkeypatch.chdir(tmp_path / "scratch")
+    _build(tmp_path / "scratch", after, CountingEmbedder())
+    scratch = _live(tmp_path / "scratch" / "chunk_store.arrow")
+
+    pd.testing.assert_frame_equal(incremental.drop(columns=["vector"]), scratch.drop(columns=["vector"]))
+    np.testing.assert_array_equal(np.stack(incremental["vector"]), np.stack(scratch["vector"]))
+    # Only chunks the first build did not have were embedded again
+    assert embedder.corpus_texts == len(set(scratch["chunk_id"]) - set(first["chunk_id"]))
+
+
+def test_unchanged_rebuild_embeds_nothing(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    _build(tmp_path, _kb(), CountingEmbedder())
+    embedder = CountingEmbedder()
+    _build(tmp_path, _kb(), embedder)
+    assert embedder.corpus_texts == 0
+
+
+@pytest.mark.parametrize("dedup_threshold", [None, 0.8])
+def test_unchanged_rebuild_keeps_version_and_snapshot(tmp_path, monkeypatch, dedup_threshold):
+    monkeypatch.chdir(tmp_path)
+    kb_df = pd.concat([_kb(), _kb().iloc[:5].assign(doc_id=lambda d: d["doc_id"] + "_copy")], ignore_index=True)
+    _build(tmp_path, kb_df, CountingEmbedder(), snapshot=True, dedup_threshold=dedup_threshold)
+    manifest, snapshots = read_manifest(), sorted(os.listdir(INDEX_SNAPSHOT_DIR))
+    mtime = os.path.getmtime("chunk_store.arrow")
+
+    _build(tmp_path, kb_df, CountingEmbedder(), snapshot=True, dedup_threshold=dedup_threshold)
+    assert read_manifest() == manifest
+    assert sorted(os.listdir(INDEX_SNAPSHOT_DIR)) == snapshots
+    assert os.path.getmtime("chunk_store.arrow") == mtime
+
+    # A metadata-only change still writes a new version
+    kb_df.loc[0, "base_id"] = "base_moved"
+    _build(tmp_path, kb_df, CountingEmbedder(), snapshot=True, dedup_threshold=dedup_threshold)
+    assert read_manifest()["version"] == manifest["version"] + 1
+    if dedup_threshold:
+        # Another copy only adds aliases to a kept chunk
+        kb_df = pd.concat([kb_df, kb_df.iloc[[6]].assign(doc_id="doc_6_copy")], ignore_index=True)
+        _build(tmp_path, kb_df, CountingEmbedder(), snapshot=True, dedup_threshold=dedup_threshold)
+        assert read_manifest()["version"] == manifest["version"] + 2
+
+
+def test_removing_every_document_leaves_a_searchable_empty_store(tmp_path, monkeypatch):
+    from src.pipeline import SingAIRAGPipeline
+    monkeypatch.chdir(tmp_path)
+    _build(tmp_path, _kb(), CountingEmbedder())
+    _build(tmp_path, _kb().iloc[:0], CountingEmbedder(), snapshot=True)
+    assert read_manifest()["dim"] == 32
+
+    pipeline = SingAIRAGPipeline("", embedder=CountingEmbedder())
+    scores, ids = pipeline.retriever.search(["reset my password"], ["en"])
+    assert (ids == -1).all()
+    assert pipeline.run("reset my password", "en")["reason"] == "NO_CONTEXT_FOUND"
@@ -0,0 +1,68 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.ingestion.indexer import build_index
+from src.retrieval.embedders import HashEmbedder
+from src.retrieval.search import RiskAwareRetriever
+
+TEXTS = {
+    "en": ["Please reset your password before the billing cycle ends.",
+           "Refunds for a cancelled plan are paid to the original card.",
+           "Roaming charges apply when you use data outside the country."],
+    "zh": ["请在账单周期结束前重置您的密码。",
+           "取消套餐的退款将退回原卡。"],
+}
+REGIONS = ["SG", "MY", ""]
+
+
+def _kb():
+    rows = []
+    for lang, texts in TEXTS.items():
+        for i, text in enumerate(texts):
+            for region in REGIONS:
+                rows.append({"doc_id": f"{lang}_{i}_{region or 'any'}", "base_id": f"{lang}_{i}_{region}",
+                             "lang": lang, "region": region, "kb_text": f"Title {i}\n\n{text} ({region or 'all'})"})
+    return pd.DataFrame(rows)
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    _kb().to_parquet("kb.parquet")
+    build_index("", source="kb.parquet", embedder=HashEmbedder(32), snapshot=False)
+
+
+def _retriever(shard_by, lexical_mode="off"):
+    return RiskAwareRetriever("", embedder=HashEmbedder(32), snapshot_root=None, shard_by=shard_by,
+                              lexical_mode=lexical_mode)
+
+
+def _doc_ids(retriever, global_ids):
+    doc_ids = retriever.chunk_meta.column("doc_id").to_pylist()
+    return [{doc_ids[g] for g in row if g >= 0} for row in global_ids]
+
+
+@pytest.mark.parametrize("lexical_mode", ["off", "hybrid"])
+def test_region_shards_and_region_filter_return_the_same_hits(store, lexical_mode):
+    queries = [text for texts in TEXTS.values() for text in texts] + ["how do I get my money back"]
+    langs = [lang for lang, texts in TEXTS.items() for _ in texts] + ["ms"]
+    for region in ["SG", "MY", "ID", None]:
+        regions = [region] * len(queries)
+        by_region = _retriever("lang_region", lexical_mode).search(queries, langs, top_k=4, regions=regions)
+        by_lang = _retriever("lang", lexical_mode).search(queries, langs, top_k=4, regions=regions)
+        np.testing.assert_array_equal(by_region[1], by_lang[1])
+        np.testing.assert_allclose(by_region[0], by_lang[0], rtol=1e-6)
+
+
+@pytest.mark.parametrize("shard_by", ["lang", "lang_region"])
+def test_region_less_chunks_are_returned_for_every_region(store, shard_by):
+    retriever = _retriever(shard_by)
+    n_docs = len(TEXTS["en"]) * len(REGIONS)
+    for region in ["SG", "MY", "ID"]:
+        _, ids = retriever.search([TEXTS["en"][0]], ["en"], top_k=n_docs, regions=[region])
+        (found,) = _doc_ids(retriever, ids)
+        expected = {f"en_{i}_{r or 'any'}" for i in range(len(TEXTS["en"])) for r in (region, "") if r in REGIONS}
+        assert found == expected
+    _, ids = retriever.search([TEXTS["en"][0]], ["en"], top_k=n_docs)
+    assert len(_doc_ids(retriever, ids)[0]) == n_docs
@@ -0,0 +1,60 @@
+import gc
+import os
+
+import pandas as pd
+
+from src.config.settings import INDEX_SNAPSHOT_DIR
+from src.ingestion.indexer import build_index
+from src.retrieval.embedders import HashEmbedder
+from src.retrieval.partitions import lease_snapshot
+from src.serving import attach
+
+TEXTS = {
+    "en": "Please reset your password before the billing cycle ends.",
+    "zh": "请在账单周期结束前重置您的密码。",
+}
+
+
+def _build(n_docs):
+    rows = [{"doc_id": f"doc_{i}", "base_id": f"base_{i}", "lang": lang, "region": "SG",
+             "kb_text": f"Title {i}\n\n{TEXTS[lang]} {i}"}
+            for i in range(n_docs) for lang in TEXTS]
+    pd.DataFrame(rows).to_parquet("kb.parquet")
+    build_index("", source="kb.parquet", embedder=HashEmbedder(32))
+
+
+def _snapshots():
+    return sorted(d for d in os.listdir(INDEX_SNAPSHOT_DIR) if d.startswith("v"))
+
+
+def test_attached_retriever_survives_later_builds(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    _build(4)
+    pipeline = attach(embedder=HashEmbedder(32), shard_workers=0, warm=False)
+    retriever = pipeline.retriever
+    retriever.search([TEXTS["en"]], ["en"])
+    assert set(retriever.partitions) == {"en"}
+
+    _build(5)
+    _build(6)
+    assert os.path.basename(retriever.snapshot_dir) in _snapshots()
+    # "zh" is first loaded now, from the snapshot the retriever attached to
+    scores, ids = retriever.search([TEXTS["zh"]], ["zh"])
+    assert (ids >= 0).any()
+
+    del pipeline, retriever
+    gc.collect()
+    _build(7)
+    assert len(_snapshots()) == 2
+
+
+def test_leases_of_exited_processes_do_not_block_pruning(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    _build(4)
+    (first,) = _snapshots()
+    lease = lease_snapshot(os.path.join(INDEX_SNAPSHOT_DIR, first))
+    # No process has this pid
+    os.rename(lease, os.path.join(os.path.dirname(lease), ".lease-999999999-dead"))
+    _build(5)
+    _build(6)
+    assert first not in _snapshots()